@@ -0,0 +1,87 @@
+""" benchmark_imports.py
+    Import-time benchmark of main.py, guarding its startup time.
+
+    The explainer libraries (captum, pgmpy, the explainer.* implementations) and the plotting libraries
+    (matplotlib, seaborn, pandas) are imported lazily, when an explainer is dispatched or a figure is
+    drawn. This script imports main in fresh interpreters and fails if any of them is loaded at startup,
+    or if importing main takes more than --max_overhead seconds on top of torch, torch_geometric,
+    numpy, scipy and networkx.
+
+    python3 code/benchmark_imports.py --repeats 5 --max_overhead 0.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# modules that main must not import at startup
+LAZY_MODULES = [
+    "captum", "pgmpy", "matplotlib", "seaborn", "pandas", "sklearn", "sympy", "zmq", "importlib_metadata",
+    "explainer.gnnexplainer", "explainer.gnnlrp", "explainer.graphsvx", "explainer.pgexplainer",
+    "explainer.pgmexplainer", "explainer.subgraphx", "explainer.zorro", "explainer.graph_explainer",
+    "dataset.mutag_utils", "torch_geometric.datasets",
+]
+
+# libraries every run needs, whose import time is not counted against main
+BASE_IMPORTS = "import torch, torch_geometric, numpy, scipy.sparse, networkx"
+
+TIMER = "import time; start = time.perf_counter(); {}; print(time.perf_counter() - start)"
+
+
+def run_python(code, *options):
+    result = subprocess.run(
+        [sys.executable, *options, "-c", code], cwd=CODE_DIR, capture_output=True, text=True, check=True
+    )
+    return result.stdout, result.stderr
+
+
+def import_seconds(statement, repeats):
+    """Best wall time of the statement over fresh interpreters"""
+    return min(float(run_python(TIMER.format(statement))[0].split()[-1]) for _ in range(repeats))
+
+
+def loaded_lazy_modules():
+    code = "import sys, main; print(' '.join(sorted(sys.modules)))"
+    modules = set(run_python(code)[0].split())
+    return [name for name in LAZY_MODULES if name in modules]
+
+
+def slowest_imports(num_modules):
+    """Modules of main with the largest self import time, from python -X importtime"""
+    _, stderr = run_python("import main", "-X", "importtime")
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times.append((int(self_us), name.strip()))
+    return [{"module": name, "self_ms": round(us / 1000, 1)} for us, name in sorted(times, reverse=True)[:num_modules]]
+
+
+def benchmark(args):
+    base = import_seconds(BASE_IMPORTS, args.repeats)
+    total = import_seconds(BASE_IMPORTS + "; import main", args.repeats)
+    loaded = loaded_lazy_modules()
+    results = {"base_s": round(base, 3), "main_s": round(total, 3), "overhead_s": round(total - base, 3), "lazy_loaded": loaded}
+    print("__import_time:" + json.dumps(results))
+    print("__slowest_imports:" + json.dumps(slowest_imports(args.num_modules)))
+    failures = []
+    if loaded:
+        failures.append(f"modules imported at startup: {', '.join(loaded)}")
+    if total - base > args.max_overhead:
+        failures.append(f"importing main takes {total - base:.3f}s on top of the base libraries (> {args.max_overhead}s)")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time benchmark of main.py")
+    parser.add_argument("--repeats", type=int, default=5, help="Number of fresh interpreters per measure.")
+    parser.add_argument("--max_overhead", type=float, default=0.5, help="Import time budget of main, in seconds.")
+    parser.add_argument("--num_modules", type=int, default=15, help="Number of slowest modules to report.")
+    failures = benchmark(parser.parse_args())
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
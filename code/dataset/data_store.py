@@ -0,0 +1,59 @@
+""" data_store.py
+    On-disk storage of generated datasets as one .npy shard per tensor, loaded back through memory maps.
+
+    A dataset directory holds a versioned header.json and a <key>.npy file for each tensor of the Data
+    object. Tensors whose entries are all equal (constant node features, unit edge weights) are only
+    recorded in the header. Shards are memory-mapped copy-on-write when loading, so that training and
+    explaining read the data lazily and several processes share the page cache.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import torch
+from torch_geometric.data import Data
+
+FORMAT_VERSION = 1
+
+
+def save_data(data, path):
+    """Write the Data object to the directory path, atomically: the directory is only visible complete."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    header = {"version": FORMAT_VERSION, "shards": [], "constants": {}, "attrs": {}}
+    for key, value in data:
+        if torch.is_tensor(value):
+            array = value.detach().cpu().numpy()
+            if array.size > 0 and (array.flat[0] == array).all():
+                header["constants"][key] = {"shape": list(array.shape), "dtype": str(array.dtype), "value": array.flat[0].item()}
+            else:
+                np.save(os.path.join(tmp_path, key + ".npy"), np.ascontiguousarray(array))
+                header["shards"].append(key)
+        else:
+            header["attrs"][key] = value
+    with open(os.path.join(tmp_path, "header.json"), "w") as f:
+        json.dump(header, f)
+    if os.path.isdir(path):
+        # generated concurrently by another process from the same inputs
+        shutil.rmtree(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+
+
+def load_data(path, mmap=True):
+    """Data object of a directory written by save_data, with memory-mapped tensors if mmap."""
+    with open(os.path.join(path, "header.json")) as f:
+        header = json.load(f)
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: data store version {header.get('version')}, expected {FORMAT_VERSION}")
+    tensors = {}
+    for key in header["shards"]:
+        tensors[key] = torch.from_numpy(np.load(os.path.join(path, key + ".npy"), mmap_mode="c" if mmap else None))
+    for key, constant in header["constants"].items():
+        tensors[key] = torch.from_numpy(np.full(constant["shape"], constant["value"], dtype=constant["dtype"]))
+    data = Data(**tensors)
+    for key, value in header["attrs"].items():
+        data[key] = value
+    return data
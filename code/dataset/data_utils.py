@@ -1,7 +1,6 @@
 import numpy as np
 import scipy.sparse as sp
 import torch
-from sklearn.model_selection import train_test_split
 
 
 def split_data(data, args):
@@ -14,6 +13,8 @@ def split_data(data, args):
     Returns:
         data: data object with train, val, test splits
     """
+    from sklearn.model_selection import train_test_split
+
     n = data.num_nodes
     data.train_mask, data.val_mask, data.test_mask = (
         torch.zeros(n, dtype=torch.bool),
@@ -1,32 +1,67 @@
+import os
+
 import networkx as nx
 import numpy as np
 import torch
-from sklearn.model_selection import train_test_split
-from torch_geometric.utils import from_networkx
+from torch_geometric.data import Data
 
+from dataset.data_store import load_data, save_data
+from dataset.syn_utils import arraygen, gengraph
 from dataset.syn_utils.gengraph import *
+from dataset.syn_utils.gengroundtruth import add_motif_index
+from utils.io_utils import create_data_filename
+
+
+def networkx_to_data(G):
+    """Convert a networkx graph whose nodes carry a "feat" attribute into a Data object (as
+    from_networkx(G, all)), reading the edge lists directly into tensors."""
+    nodes = list(G.nodes())
+    index = {u: i for i, u in enumerate(nodes)}
+    edge_index = np.array([(index[u], index[v]) for u, nbrs in G.adj.items() for v in nbrs], dtype=np.int64).reshape(-1, 2).T
+    x = np.stack([G.nodes[u]["feat"] for u in nodes])
+    return Data(x=torch.from_numpy(x), edge_index=torch.from_numpy(np.ascontiguousarray(edge_index)))
+
+
+def build_syndata_arrays(args):
+    """Generate the synthetic graph with the array-native generator (see dataset.syn_utils.arraygen)."""
+    generate_function = getattr(arraygen, "gen_" + args.dataset, None)
+    if generate_function is None:
+        raise NotImplementedError(f"No array generator for {args.dataset}")
+    edge_index, labels, name, feat = generate_function(
+        nb_shapes=args.num_shapes, width_basis=args.width_basis, rng=np.random.default_rng(args.seed)
+    )
+    x = torch.ones(len(labels), args.input_dim) if feat is None else torch.from_numpy(feat)
+    return Data(x=x, edge_index=torch.from_numpy(edge_index)), labels
 
 
 def build_syndata(args):
     """Generate synthetic graohs and convert them into Pytorch geometric Data object.
 
+    The graph is only stored as a sparse edge_index (no dense adjacency matrix). The motif of each node
+    and of each edge is indexed for the ground truth (see gengroundtruth.add_motif_index).
+
     Returns:
         Data: converted synthetic Pytorch geometric Data object
     """
-    generate_function = "gen_" + args.dataset
+    from sklearn.model_selection import train_test_split
 
-    G, labels, name = eval(generate_function)(
-        nb_shapes=args.num_shapes,
-        width_basis=args.width_basis,
-        feature_generator=featgen.ConstFeatureGen(np.ones(args.input_dim, dtype=float)),
-    )
+    if args.syn_backend == "array":
+        data, labels = build_syndata_arrays(args)
+    else:
+        generate_function = getattr(gengraph, "gen_" + args.dataset)
+
+        G, labels, name = generate_function(
+            nb_shapes=args.num_shapes,
+            width_basis=args.width_basis,
+            feature_generator=featgen.ConstFeatureGen(np.ones(args.input_dim, dtype=float)),
+        )
+        data = networkx_to_data(G.to_undirected())
 
-    data = from_networkx(G.to_undirected(), all)
-    data.adj = torch.LongTensor(nx.to_numpy_matrix(G))
     data.num_classes = len(np.unique(labels))
     data.y = torch.LongTensor(labels)
     data.x = data.x.float()
     data.edge_weight = torch.ones(data.edge_index.size(1))
+    data = add_motif_index(data, args)
     n = data.num_nodes
     data.train_mask, data.val_mask, data.test_mask = (
         torch.zeros(n, dtype=torch.bool),
@@ -41,3 +76,11 @@ def build_syndata(args):
     data.test_mask[test_ids] = 1
 
     return data
+
+
+def load_syndata(args):
+    """Memory-mapped synthetic dataset of args, generated and saved to the data directory if needed."""
+    data_filename = create_data_filename(args)
+    if not os.path.isdir(data_filename):
+        save_data(build_syndata(args), data_filename)
+    return load_data(data_filename)
@@ -0,0 +1,231 @@
+""" arraygen.py
+
+    Array-native generation of the synthetic graphs: edges are built as NumPy arrays, without networkx
+    graphs, so that graphs with millions of nodes fit in bounded memory.
+    Edge arrays are undirected, of shape (num_edges, 2); use to_edge_index to get both directions.
+"""
+import numpy as np
+
+# motif edge templates (node ids relative to the first node of the motif, which is attached to the basis) and roles
+HOUSE_EDGES = np.array([[0, 1], [1, 2], [2, 3], [3, 0], [4, 0], [4, 1]])
+HOUSE_ROLES = np.array([0, 0, 1, 1, 2])
+BOTTLE_EDGES = np.array([[0, 1], [1, 2], [2, 0], [3, 0], [4, 0]])
+BOTTLE_ROLES = np.array([0, 1, 1, 2, 2])
+
+
+def grid_template(dim=3):
+    ids = np.arange(dim * dim).reshape(dim, dim)
+    edges = np.concatenate([
+        np.stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()], axis=1),
+        np.stack([ids[:-1, :].ravel(), ids[1:, :].ravel()], axis=1),
+    ])
+    return edges, np.zeros(dim * dim, dtype=np.int64)
+
+
+def cycle_template(len_cycle=6):
+    ids = np.arange(len_cycle)
+    return np.stack([ids, np.roll(ids, -1)], axis=1), np.zeros(len_cycle, dtype=np.int64)
+
+
+MOTIFS = {
+    "house": lambda: (HOUSE_EDGES, HOUSE_ROLES),
+    "bottle": lambda: (BOTTLE_EDGES, BOTTLE_ROLES),
+    "grid": grid_template,
+    "cycle": cycle_template,
+}
+
+
+def ba_edges(width, m, rng, start=0, block_ratio=0.01):
+    """Barabasi-Albert preferential attachment graph on nodes start..start+width-1.
+
+    As networkx.barabasi_albert_graph, it starts from a star on m + 1 nodes and each new node is
+    attached to m distinct nodes sampled proportionally to their degree. New nodes are added by
+    blocks of block_ratio * (current number of nodes) that sample their targets from the degrees at
+    the start of the block, which leaves the degree distribution unchanged for small block_ratio.
+    """
+    num_edges = m + (width - m - 1) * m
+    edges = np.empty((num_edges, 2), dtype=np.int64)
+    edges[:m, 0] = np.arange(1, m + 1)
+    edges[:m, 1] = 0
+    # every node appears in repeated_nodes once per incident edge
+    repeated_nodes = np.empty(2 * num_edges, dtype=np.int64)
+    repeated_nodes[: 2 * m] = edges[:m].ravel()
+    num_filled, num_edges_filled = 2 * m, m
+
+    node = m + 1
+    while node < width:
+        block = min(max(1, int(node * block_ratio)), width - node)
+        targets = repeated_nodes[rng.integers(0, num_filled, size=(block, m))]
+        # resample the targets of new nodes that drew the same node twice
+        while True:
+            sorted_targets = np.sort(targets, axis=1)
+            duplicated = (sorted_targets[:, 1:] == sorted_targets[:, :-1]).any(axis=1)
+            if not duplicated.any():
+                break
+            targets[duplicated] = repeated_nodes[rng.integers(0, num_filled, size=(duplicated.sum(), m))]
+        sources = np.repeat(np.arange(node, node + block), m)
+        edges[num_edges_filled : num_edges_filled + block * m, 0] = sources
+        edges[num_edges_filled : num_edges_filled + block * m, 1] = targets.ravel()
+        repeated_nodes[num_filled : num_filled + 2 * block * m] = np.concatenate([sources, targets.ravel()])
+        num_filled += 2 * block * m
+        num_edges_filled += block * m
+        node += block
+    return edges + start
+
+
+def tree_edges(height, r=2, start=0):
+    """Balanced r-tree of the given height, numbered as networkx.balanced_tree"""
+    num_nodes = (r ** (height + 1) - 1) // (r - 1)
+    children = np.arange(1, num_nodes)
+    return np.stack([(children - 1) // r, children], axis=1) + start
+
+
+def attach_motifs(n_basis, nb_shapes, motif_edges, motif_roles, role_start, rng, shape_type=None):
+    """Tile nb_shapes copies of a motif after the basis, each attached by its first node to a basis node
+    regularly spaced along the basis (as build_graph with rdm_basis_plugins=False). As in build_graph,
+    each cycle gets, with probability 1/2, a second random edge to its basis node's neighbourhood.
+
+    Returns:
+        edges     :  motif and attachment edges
+        roles     :  roles of the motif nodes
+        plugins   :  basis node of each motif
+    """
+    n_s = len(motif_roles)
+    starts = n_basis + n_s * np.arange(nb_shapes)
+    edges = (motif_edges[None, :, :] + starts[:, None, None]).reshape(-1, 2)
+    spacing = n_basis // nb_shapes
+    plugins = spacing * np.arange(nb_shapes)
+    attach = [np.stack([starts, plugins], axis=1)]
+    if shape_type == "cycle":
+        extra = rng.random(nb_shapes) > 0.5
+        a, b = rng.integers(1, 4, size=(2, nb_shapes))
+        attach.append(np.stack([starts + a, plugins + b], axis=1)[extra])
+    roles = np.tile(motif_roles + role_start, nb_shapes)
+    return np.concatenate([edges] + attach), roles, plugins
+
+
+def build_graph(width_basis, basis_type, shape, nb_shapes, rng, m=5):
+    """Array version of synthetic_structsim.build_graph, for nb_shapes copies of a single shape.
+
+    Args:
+        width_basis  :  number of nodes of the BA basis, or height of the tree basis
+        basis_type   :  "ba" or "tree"
+        shape        :  [shape type, shape args...], e.g. ["grid", 3]
+        nb_shapes    :  number of attached shapes
+        rng          :  np.random.Generator
+        m            :  number of edges to attach to existing node (for BA graph)
+
+    Returns:
+        edges        :  undirected (num_edges, 2) edge array
+        role_id      :  label of each node
+        plugins      :  basis node of each shape
+    """
+    if basis_type == "ba":
+        basis, n_basis = ba_edges(width_basis, m, rng), width_basis
+    else:
+        basis = tree_edges(width_basis)
+        n_basis = len(basis) + 1
+    motif_edges, motif_roles = MOTIFS[shape[0]](*shape[1:])
+    motifs, roles, plugins = attach_motifs(n_basis, nb_shapes, motif_edges, motif_roles, 1, rng, shape[0])
+    role_id = np.concatenate([np.zeros(n_basis, dtype=np.int64), roles])
+    return np.concatenate([basis, motifs]), role_id, plugins
+
+
+def canonical_ids(edges, num_nodes):
+    """Id of each undirected edge, independent of the direction"""
+    return np.minimum(edges[:, 0], edges[:, 1]) * num_nodes + np.maximum(edges[:, 0], edges[:, 1])
+
+
+def perturb_edges(edges, num_nodes, p, rng):
+    """Add int(p * number of edges) random edges between distinct pairs of nodes that are not already
+    linked, as gengraph.perturb, by sampling the candidate pairs in bulk and deduplicating them."""
+    edge_count = int(len(edges) * p)
+    existing = np.unique(canonical_ids(edges, num_nodes))
+    new_edges = np.zeros((0, 2), dtype=np.int64)
+    while len(new_edges) < edge_count:
+        candidates = rng.integers(0, num_nodes, size=(2 * (edge_count - len(new_edges)) + 16, 2))
+        candidates = candidates[candidates[:, 0] != candidates[:, 1]]
+        ids = canonical_ids(candidates, num_nodes)
+        keep = ~np.isin(ids, existing)
+        candidates, ids = candidates[keep], ids[keep]
+        _, first = np.unique(ids, return_index=True)
+        candidates = candidates[np.sort(first)][: edge_count - len(new_edges)]
+        new_edges = np.concatenate([new_edges, candidates])
+        existing = np.union1d(existing, canonical_ids(candidates, num_nodes))
+    return np.concatenate([edges, new_edges])
+
+
+def to_edge_index(edges, num_nodes):
+    """Undirected edges to a (2, 2 * num_edges) edge index with both directions, sorted by source node"""
+    edge_index = np.concatenate([edges, edges[:, ::-1]]).T
+    order = np.argsort(edge_index[0] * num_nodes + edge_index[1], kind="stable")
+    return np.ascontiguousarray(edge_index[:, order])
+
+
+def gen_syn_graph(basis_type, shape, nb_shapes, width_basis, p, rng, m=5):
+    edges, role_id, _ = build_graph(width_basis, basis_type, shape, nb_shapes, rng, m=m)
+    num_nodes = len(role_id)
+    edges = perturb_edges(edges, num_nodes, p, rng)
+    name = basis_type + "_" + str(width_basis) + "_" + str(nb_shapes)
+    return to_edge_index(edges, num_nodes), role_id, name, None
+
+
+# Array versions of the gengraph.gen_* generators. They return the (2, num_edges) edge index with both
+# directions of each edge, the label of each node, a graph identifier, and the node features (None for
+# constant features).
+
+
+def gen_ba_house(nb_shapes=80, width_basis=300, rng=None, m=5):
+    return gen_syn_graph("ba", ["house"], nb_shapes, width_basis, 0.01, np.random.default_rng() if rng is None else rng, m)
+
+
+def gen_ba_grid(nb_shapes=80, width_basis=300, rng=None, m=5):
+    return gen_syn_graph("ba", ["grid", 3], nb_shapes, width_basis, 0.01, np.random.default_rng() if rng is None else rng, m)
+
+
+def gen_ba_bottle(nb_shapes=80, width_basis=300, rng=None, m=5):
+    return gen_syn_graph("ba", ["bottle"], nb_shapes, width_basis, 0.01, np.random.default_rng() if rng is None else rng, m)
+
+
+def gen_tree_cycle(nb_shapes=60, width_basis=8, rng=None):
+    return gen_syn_graph("tree", ["cycle", 6], nb_shapes, width_basis, 0.01, np.random.default_rng() if rng is None else rng)
+
+
+def gen_tree_grid(nb_shapes=80, width_basis=8, rng=None):
+    return gen_syn_graph("tree", ["grid", 3], nb_shapes, width_basis, 0.1, np.random.default_rng() if rng is None else rng)
+
+
+def gaussian_features(mu, sigma, num_nodes, rng):
+    """Features of featgen.GaussianFeatureGen with diagonal covariance"""
+    feat = rng.normal(mu, sigma, size=(num_nodes, len(mu)))
+    return (feat + np.max(np.abs(feat))) / np.max(np.abs(feat)) / 2
+
+
+def community_sizes(nb_shapes=100, width_basis=350):
+    """Basis width and number of houses of each of the two BA-house graphs of ba_community: 300 and 80
+    for the default nb_shapes and width_basis, scaled with them."""
+    return width_basis * 300 // 350, nb_shapes * 80 // 100
+
+
+def gen_ba_community(nb_shapes=100, width_basis=350, rng=None):
+    """Two BA-house graphs (of community_sizes, as gengraph.gen_ba_community) with Gaussian features of
+    different means, joined by width_basis random edges. The roles of the second graph are shifted."""
+    rng = np.random.default_rng() if rng is None else rng
+    house_basis, house_shapes = community_sizes(nb_shapes, width_basis)
+    random_mu, random_sigma = [0.0] * 8, [1.0] * 8
+    edges, features, labels = [], [], []
+    offset = 0
+    for mean in [-1.0, 1.0]:
+        edge_index, role_id, _, _ = gen_ba_house(nb_shapes=house_shapes, width_basis=house_basis, rng=rng)
+        num_nodes = len(role_id)
+        edges.append(edge_index[:, edge_index[0] < edge_index[1]].T + offset)
+        mu, sigma = np.array([mean] * 2 + random_mu), np.array([0.5] * 2 + random_sigma)
+        features.append(gaussian_features(mu, sigma, num_nodes, rng))
+        labels.append(role_id + (labels[0].max() + 1 if labels else 0))
+        offset += num_nodes
+    n_1 = len(labels[0])
+    join = np.stack([rng.integers(0, n_1, size=width_basis), rng.integers(n_1, offset, size=width_basis)], axis=1)
+    edges = np.concatenate(edges + [join])
+    edges = edges[np.unique(canonical_ids(edges, offset), return_index=True)[1]]
+    name = "ba_" + str(width_basis) + "_" + str(nb_shapes) + "_2comm"
+    return to_edge_index(edges, offset), np.concatenate(labels), name, np.concatenate(features)
@@ -3,15 +3,12 @@
    Generating and manipulaton the synthetic graphs needed for the paper's experiments.
 """
 
-from matplotlib import pyplot as plt
-
-# Set matplotlib backend to file writing
-plt.switch_backend("agg")
-
 import networkx as nx
 import numpy as np
+import scipy.sparse as sp
 
 from . import featgen
+from .arraygen import community_sizes
 from . import synthetic_structsim
 
 
@@ -69,12 +66,12 @@ def preprocess_input_graph(G, labels, normalize_adj=False):
         labels: Associated node labels.
         normalize_adj: Should the method return a normalized adjacency matrix.
     Returns:
-        A dictionary containing adjacency, node features and labels
+        A dictionary containing adjacency (scipy CSR matrix, without batch dim), node features and labels
     """
-    adj = np.array(nx.to_numpy_matrix(G))
+    adj = nx.to_scipy_sparse_array(G, format="csr", dtype=float)
     if normalize_adj:
-        sqrt_deg = np.diag(1.0 / np.sqrt(np.sum(adj, axis=0, dtype=float).squeeze()))
-        adj = np.matmul(np.matmul(sqrt_deg, adj), sqrt_deg)
+        sqrt_deg = sp.diags(1.0 / np.sqrt(np.asarray(adj.sum(axis=0)).squeeze()))
+        adj = (sqrt_deg @ adj @ sqrt_deg).tocsr()
 
     existing_node = list(G.nodes)[-1]
     feat_dim = G.nodes[existing_node]["feat"].shape[0]
@@ -83,7 +80,6 @@ def preprocess_input_graph(G, labels, normalize_adj=False):
         f[i, :] = G.nodes[u]["feat"]
 
     # add batch dim
-    adj = np.expand_dims(adj, axis=0)
     f = np.expand_dims(f, axis=0)
     labels = np.expand_dims(labels, axis=0)
     return {"adj": adj, "feat": f, "labels": labels}
@@ -133,8 +129,8 @@ def gen_ba_community(nb_shapes=100, width_basis=350, feature_generator=None):
     Start with Barabasi-Albert graph and add node features indicative of a community label.
 
     Args:
-        nb_shapes         :  The number of shapes (here 'houses') that should be added to the base graph.
-        width_basis       :  The width of the basis graph (here 'Barabasi-Albert' random graph).
+        nb_shapes         :  Scales the number of houses of both BA-house graphs (see arraygen.community_sizes).
+        width_basis       :  Number of random edges joining the two graphs; also scales their basis width.
         feature_generator :  Dummy input
 
     Returns:
@@ -152,8 +148,9 @@ def gen_ba_community(nb_shapes=100, width_basis=350, feature_generator=None):
     mu_2, sigma_2 = np.array([1.0] * 2 + random_mu), np.array([0.5] * 2 + random_sigma)
     feat_gen_G1 = featgen.GaussianFeatureGen(mu=mu_1, sigma=sigma_1)
     feat_gen_G2 = featgen.GaussianFeatureGen(mu=mu_2, sigma=sigma_2)
-    G1, role_id1, name = gen_ba_house(feature_generator=feat_gen_G1, m=4)
-    G2, role_id2, name = gen_ba_house(feature_generator=feat_gen_G2, m=4)
+    house_basis, house_shapes = community_sizes(nb_shapes, width_basis)
+    G1, role_id1, name = gen_ba_house(nb_shapes=house_shapes, width_basis=house_basis, feature_generator=feat_gen_G1, m=4)
+    G2, role_id2, name = gen_ba_house(nb_shapes=house_shapes, width_basis=house_basis, feature_generator=feat_gen_G2, m=4)
     G1_size = G1.number_of_nodes()
     num_roles = max(role_id1) + 1
     role_id2 = [r + num_roles for r in role_id2]
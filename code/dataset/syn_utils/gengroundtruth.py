@@ -1,76 +1,73 @@
-import os
+""" gengroundtruth.py
+    Ground-truth explanations of the synthetic datasets.
 
+    Motifs are appended one after the other after the basis nodes, so the motif of each node follows from
+    its index. At build time, data.motif_id holds the motif of each node (-1 for basis nodes) and
+    data.edge_motif_id the motif of each edge (-1 for edges that are not inside a motif): the ground-truth
+    edge mask of motif m is data.edge_motif_id == m.
+"""
 import networkx as nx
 import numpy as np
-from dataset.syn_utils.synthetic_structsim import bottle, cycle, grid, house
-from explainer.node_explainer import node_attr_to_edge
+import torch
 
+from dataset.syn_utils.arraygen import community_sizes
 
-def get_ground_truth(node, data, args):
-    gt = []
-    if args.dataset == "ba_house":
-        gt = get_ground_truth_ba_house(node)  # correct
-        graph, role = house(gt[0], role_start=1)
-    elif args.dataset == "ba_community":
-        gt = get_ground_truth_ba_house(node)  # correct
-        role = data.y[gt]
-    elif args.dataset == "ba_grid":
-        gt = get_ground_truth_ba_grid(node)  # correct
-        graph, role = grid(gt[0], dim=3, role_start=1)
-    elif args.dataset == "tree_cycle":
-        gt = get_ground_truth_tree_cycle(node)  # correct
-        graph, role = cycle(gt[0], 6, role_start=1)
-    elif args.dataset == "tree_grid":
-        gt = get_ground_truth_tree_grid(node)  # correct
-        graph, role = grid(gt[0], dim=3, role_start=1)
-    elif args.dataset == "ba_bottle":
-        gt = get_ground_truth_ba_house(node)  # correct
-        graph, role = bottle(gt[0], role_start=1)
+MOTIF_SIZES = {"ba_house": 5, "ba_community": 5, "ba_grid": 9, "tree_cycle": 6, "tree_grid": 9, "ba_bottle": 5}
 
-    true_node_mask = np.zeros(data.x.shape[0])
-    true_node_mask[gt] = 1
-    true_edge_mask = node_attr_to_edge(data.edge_index, true_node_mask)
-    true_edge_mask = np.where(true_edge_mask == 2, 1, 0)
 
+def get_motif_ids(num_nodes, args):
+    """Motif of each node, -1 for the basis nodes"""
+    nodes = np.arange(num_nodes)
+    motif_size = MOTIF_SIZES[args.dataset]
     if args.dataset == "ba_community":
-        graph = nx.Graph()
-        graph.add_nodes_from(gt)
-        new_edges = np.array(data.edge_index[:, np.where(true_edge_mask > 0)[0]].T)
-        graph.add_edges_from(new_edges)
+        # two BA-house graphs of the sizes the generators build them with
+        house_basis, house_shapes = community_sizes(args.num_shapes, args.width_basis)
+        graph_size = house_basis + house_shapes * motif_size
+        local, graph = nodes % graph_size, nodes // graph_size
+        return np.where(local >= house_basis, (local - house_basis) // motif_size + graph * house_shapes, -1)
+    n_basis = 2 ** (args.width_basis + 1) - 1 if args.dataset.startswith("tree") else args.width_basis
+    return np.where(nodes >= n_basis, (nodes - n_basis) // motif_size, -1)
 
-    return graph, role, true_edge_mask
 
+def get_edge_motif_ids(edge_index, motif_id):
+    """Motif of each edge whose both ends are in the same motif, -1 for the other edges"""
+    src, dst = motif_id[edge_index[0]], motif_id[edge_index[1]]
+    return np.where(src == dst, src, -1)
 
-def get_ground_truth_ba_house(node):
-    base = [0, 1, 2, 3, 4]
-    ground_truth = []
-    offset = node % 5
-    ground_truth = [node - offset + val for val in base]
-    return ground_truth
 
+def add_motif_index(data, args):
+    """Store the motif of each node and of each edge in the synthetic Data object."""
+    edge_index = data.edge_index.cpu().numpy()
+    motif_id = get_motif_ids(data.num_nodes, args)
+    data.motif_id = torch.from_numpy(motif_id)
+    data.edge_motif_id = torch.from_numpy(get_edge_motif_ids(edge_index, motif_id))
+    return data
 
-def get_ground_truth_ba_grid(node):
-    base = [0, 1, 2, 3, 4, 5, 6, 7, 8]
-    buff = node - 3
-    ground_truth = []
-    offset = buff % 9
-    ground_truth = [buff - offset + val + 3 for val in base]
-    return ground_truth
 
+def get_ground_truth_edges(data, list_node_idx):
+    """Indices of the ground-truth edges of each node, as array lookups in the motif index.
 
-def get_ground_truth_tree_cycle(node):
-    buff = node - 1
-    base = [0, 1, 2, 3, 4, 5]
-    ground_truth = []
-    offset = buff % 6
-    ground_truth = [buff - offset + val + 1 for val in base]
-    return ground_truth
+    Returns:
+        list of int arrays, one per node (empty for basis nodes)
+    """
+    edge_motif_id = data.edge_motif_id.cpu().numpy()
+    order = np.argsort(edge_motif_id, kind="stable")
+    motifs = data.motif_id.cpu().numpy()[np.asarray(list_node_idx, dtype=np.int64)]
+    starts = np.searchsorted(edge_motif_id[order], motifs, side="left")
+    ends = np.searchsorted(edge_motif_id[order], motifs, side="right")
+    ends[motifs < 0] = starts[motifs < 0]
+    return [order[start:end] for start, end in zip(starts, ends)]
 
 
-def get_ground_truth_tree_grid(node):
-    base = [0, 1, 2, 3, 4, 5, 6, 7, 8]
-    buff = node - 7
-    ground_truth = []
-    offset = buff % 9
-    ground_truth = [buff - offset + val + 7 for val in base]
-    return ground_truth
+def get_ground_truth(node, data, args):
+    """Ground-truth graph, roles of its nodes and ground-truth edge mask of the explained node"""
+    motif = data.motif_id[node].item()
+    true_edge_mask = ((data.edge_motif_id == motif) & (motif >= 0)).long().cpu().numpy()
+    edges = data.edge_index[:, true_edge_mask > 0].cpu().numpy()
+    gt = np.flatnonzero(data.motif_id.cpu().numpy() == motif) if motif >= 0 else np.array([node])
+
+    graph = nx.Graph()
+    graph.add_nodes_from(gt.tolist())
+    graph.add_edges_from(edges.T.tolist())
+    role = data.y[gt]
+    return graph, role, true_edge_mask
@@ -4,11 +4,12 @@
 
 import networkx as nx
 import numpy as np
+import scipy.sparse as sp
 import torch
 from utils.plot_utils import plot_expl_nc
-from dataset.syn_utils.gengroundtruth import get_ground_truth
-from utils.gen_utils import list_to_dict
-from evaluate.mask_utils import mask_to_shape
+from dataset.syn_utils.gengroundtruth import get_ground_truth, get_ground_truth_edges
+from evaluate.mask_utils import mask_to_shape, topk_edges_unique
+from utils.mask_store import SparseMasks
 
 
 def get_explanation(data, edge_mask, args, top_acc):
@@ -54,54 +55,174 @@ def get_explanation(data, edge_mask, args, top_acc):
     return G_masked
 
 
-def get_scores(G1, G2):
-    """Compute recall, precision, and f1 score of a graph.
+def get_undirected_edge_ids(edge_index):
+    """Id of the undirected edge of each edge, the same for both directions, in [0, number of undirected edges)"""
+    edge_index = edge_index.cpu().numpy()
+    num_nodes = edge_index.max() + 1 if edge_index.size > 0 else 0
+    keys = np.minimum(edge_index[0], edge_index[1]) * num_nodes + np.maximum(edge_index[0], edge_index[1])
+    _, ids = np.unique(keys, return_inverse=True)
+    return ids
 
-    Args:
-        G1 (networkx graph): ground truth graph
-        G2 (networkx graph): explanation graph
-    """
-    G1, G2 = G1.to_undirected(), G2.to_undirected()
-    g_int = nx.intersection(G1, G2)
-    g_int.remove_nodes_from(list(nx.isolates(g_int)))
 
-    n_tp = g_int.number_of_edges()
-    n_fp = len(G1.edges() - g_int.edges())
-    n_fn = len(G2.edges() - g_int.edges())
+def get_explanation_edges(data, edge_masks, args, top_acc):
+    """(mask row, edge index) of the edges of each explanation, the edges with positive mask values.
 
-    if n_tp == 0:
-        precision, recall = 0, 0
-        f1_score = 0
+    If top_acc, only the args.num_top_edges edges with the highest mask values are kept.
+    """
+    num_masks = args.num_test_final
+    if top_acc:
+        rows, cols = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        for i in range(num_masks):
+            edge_mask = torch.Tensor(edge_masks[i])
+            indices = topk_edges_unique(edge_mask, data.edge_index, args.num_top_edges)
+            indices = indices[edge_mask.numpy()[indices] > 0]
+            rows.append(np.full(len(indices), i))
+            cols.append(indices)
+        return np.concatenate(rows).astype(np.int64), np.concatenate(cols).astype(np.int64)
+    if isinstance(edge_masks, SparseMasks):
+        masks = edge_masks.to_csr(0, num_masks)
     else:
-        precision = n_tp / (n_tp + n_fp)
-        recall = n_tp / (n_tp + n_fn)
-        f1_score = 2 * (precision * recall) / (precision + recall)
-
+        masks = sp.csr_matrix(np.stack([np.asarray(edge_masks[i], dtype=float) for i in range(num_masks)]))
+    masks = masks.tocoo()
+    positive = masks.data > 0
+    return masks.row[positive].astype(np.int64), masks.col[positive].astype(np.int64)
+
+
+def get_scores(n_tp, n_expl, n_true):
+    """Recall, precision and f1 score of each explanation from its numbers of true positive, explanation
+    and ground-truth edges (all zero when there is no true positive)."""
+    has_tp = n_tp > 0
+    precision = np.divide(n_tp, n_expl, out=np.zeros(len(n_tp)), where=has_tp)
+    recall = np.divide(n_tp, n_true, out=np.zeros(len(n_tp)), where=has_tp)
+    f1_score = np.divide(2 * precision * recall, precision + recall, out=np.zeros(len(n_tp)), where=has_tp)
     return recall, precision, f1_score
 
 
-def get_accuracy(data, edge_mask, node_idx, args, top_acc):
-    """_summary_accuracy_scores: Compute accuracy scores when groundtruth is avaiable (synthetic datasets) """
+def draw_explanation(data, edge_mask, node_idx, args, top_acc):
     G_true, role, true_edge_mask = get_ground_truth(node_idx, data, args)
     G_expl = get_explanation(data, edge_mask, args, top_acc)
-    if eval(args.draw_graph):
-        plot_expl_nc(G_expl, G_true, role, node_idx, args, top_acc)
-    recall, precision, f1_score = get_scores(G_expl, G_true)
-    # fpr, tpr, thresholds = metrics.roc_curve(true_edge_mask, edge_mask, pos_label=1)
-    # auc = metrics.auc(fpr, tpr)
-    return {"recall": recall, "precision": precision, "f1_score": f1_score}
+    plot_expl_nc(G_expl, G_true, role, node_idx, args, top_acc)
 
 
 def eval_accuracy(data, edge_masks, list_node_idx, args, top_acc=False):
-    """_summary_accuracy_scores: Compute accuracy scores when groundtruth is avaiable (synthetic datasets) for all masks"""
-    scores = []
-
-    for i in range(args.num_test_final):
-        edge_mask = torch.Tensor(edge_masks[i])
-        node_idx = list_node_idx[i]
-        entry = get_accuracy(data, edge_mask, node_idx, args, top_acc)
-        scores.append(entry)
-
-    scores = list_to_dict(scores)
-    accuracy_scores = {k: np.mean(v) for k, v in scores.items()}
-    return accuracy_scores
+    """_summary_accuracy_scores: Compute accuracy scores when groundtruth is avaiable (synthetic datasets) for all masks
+
+    Explanation and ground-truth edges of all the masks are compared at once, as sorted keys
+    (mask row, undirected edge id).
+    """
+    num_masks = args.num_test_final
+    list_node_idx = list_node_idx[:num_masks]
+    undirected_ids = get_undirected_edge_ids(data.edge_index)
+    num_undirected = undirected_ids.max() + 1 if len(undirected_ids) > 0 else 1
+
+    rows, cols = get_explanation_edges(data, edge_masks, args, top_acc)
+    expl_keys = np.unique(rows * num_undirected + undirected_ids[cols])
+
+    true_edges = get_ground_truth_edges(data, list_node_idx)
+    true_rows = np.repeat(np.arange(num_masks), [len(edges) for edges in true_edges])
+    true_cols = np.concatenate([np.zeros(0, dtype=np.int64)] + true_edges).astype(np.int64)
+    true_keys = np.unique(true_rows * num_undirected + undirected_ids[true_cols])
+
+    tp_keys = np.intersect1d(expl_keys, true_keys, assume_unique=True)
+    n_tp = np.bincount(tp_keys // num_undirected, minlength=num_masks)
+    n_expl = np.bincount(expl_keys // num_undirected, minlength=num_masks)
+    n_true = np.bincount(true_keys // num_undirected, minlength=num_masks)
+    recall, precision, f1_score = get_scores(n_tp, n_expl, n_true)
+
+    if args.draw_graph:
+        for i in range(num_masks):
+            draw_explanation(data, torch.Tensor(edge_masks[i]), list_node_idx[i], args, top_acc)
+
+    return {"recall": np.mean(recall), "precision": np.mean(precision), "f1_score": np.mean(f1_score)}
+
+
+def get_ranking_entries(data, edge_masks, list_node_idx, num_masks):
+    """(mask row, score, positive weight, negative weight) of the entries to rank for every mask.
+
+    Entries are the edges with a non-zero mask value and the ground-truth edges. The other edges of a
+    mask all have score 0 and are not in the ground truth: they are counted by one entry of score 0
+    whose negative weight is their number.
+    """
+    num_edges = data.edge_index.size(1)
+    if isinstance(edge_masks, SparseMasks):
+        masks = edge_masks.to_csr(0, num_masks)
+    else:
+        masks = sp.csr_matrix(np.stack([np.asarray(edge_masks[i], dtype=float) for i in range(num_masks)]))
+    masks = masks.tocoo()
+    mask_keys = masks.row.astype(np.int64) * num_edges + masks.col
+    order = np.argsort(mask_keys)
+    mask_keys, mask_values = mask_keys[order], masks.data[order].astype(float)
+
+    true_edges = get_ground_truth_edges(data, list_node_idx)
+    true_rows = np.repeat(np.arange(num_masks), [len(edges) for edges in true_edges])
+    true_keys = np.unique(true_rows * num_edges + np.concatenate([np.zeros(0, dtype=np.int64)] + true_edges))
+
+    keys = np.union1d(mask_keys, true_keys)
+    scores = np.zeros(len(keys))
+    in_mask = np.isin(keys, mask_keys, assume_unique=True)
+    scores[in_mask] = mask_values
+    labels = np.isin(keys, true_keys, assume_unique=True).astype(float)
+    rows = keys // num_edges
+
+    # one score-0 negative entry for the remaining edges of each mask
+    rest = num_edges - np.bincount(rows, minlength=num_masks)
+    rows = np.concatenate([rows, np.arange(num_masks)])
+    scores = np.concatenate([scores, np.zeros(num_masks)])
+    pos_weights = np.concatenate([labels, np.zeros(num_masks)])
+    neg_weights = np.concatenate([1 - labels, rest.astype(float)])
+    return rows, scores, pos_weights, neg_weights
+
+
+def get_ranking_scores(rows, scores, pos_weights, neg_weights, num_masks):
+    """AUROC, average precision and precision@k of each mask from its weighted entries (see
+    get_ranking_entries), with k the number of ground-truth edges of the mask.
+
+    Entries are sorted once by (mask, decreasing score) and entries of equal score are merged: ties count
+    for one half in the AUROC and are shared in proportion in precision@k. Scores of masks without
+    ground-truth (or without negative) edges are nan.
+    """
+    order = np.lexsort((-scores, rows))
+    rows, scores = rows[order], scores[order]
+    new_group = np.ones(len(rows), dtype=bool)
+    new_group[1:] = (rows[1:] != rows[:-1]) | (scores[1:] != scores[:-1])
+    groups = np.cumsum(new_group) - 1
+    group_rows = rows[new_group]
+    P_g = np.bincount(groups, weights=pos_weights[order])
+    N_g = np.bincount(groups, weights=neg_weights[order])
+
+    def row_cumsum(values):
+        """Cumulative sum over the groups of each mask, from its highest score down"""
+        cumsum = np.cumsum(values)
+        first = np.searchsorted(group_rows, group_rows, side="left")
+        return cumsum - cumsum[first] + values[first]
+
+    P = np.bincount(group_rows, weights=P_g, minlength=num_masks)
+    N = np.bincount(group_rows, weights=N_g, minlength=num_masks)
+    tp, fp = row_cumsum(P_g), row_cumsum(N_g)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        neg_below = N[group_rows] - fp
+        auroc = np.bincount(group_rows, weights=P_g * (neg_below + 0.5 * N_g), minlength=num_masks) / (P * N)
+        average_precision = np.bincount(group_rows, weights=P_g * tp / (tp + fp), minlength=num_masks) / P
+
+        k = P[group_rows]
+        size = P_g + N_g
+        slots = np.clip(k - (tp + fp - size), 0, size)
+        precision_at_k = np.bincount(group_rows, weights=P_g * slots / size, minlength=num_masks) / P
+    undefined = (P == 0) | (N == 0)
+    auroc[undefined] = np.nan
+    average_precision[P == 0] = np.nan
+    precision_at_k[P == 0] = np.nan
+    return auroc, average_precision, precision_at_k
+
+
+def eval_ranking(data, edge_masks, list_node_idx, args):
+    """Ranking scores of the soft masks against the ground-truth edge masks (synthetic datasets), for all
+    masks in one vectorized pass: mean AUROC, average precision and precision@k over the masks."""
+    num_masks = args.num_test_final
+    entries = get_ranking_entries(data, edge_masks, list_node_idx[:num_masks], num_masks)
+    auroc, average_precision, precision_at_k = get_ranking_scores(*entries, num_masks)
+    return {
+        "auroc": np.nanmean(auroc) if np.isfinite(auroc).any() else None,
+        "average_precision": np.nanmean(average_precision) if np.isfinite(average_precision).any() else None,
+        "precision_at_k": np.nanmean(precision_at_k) if np.isfinite(precision_at_k).any() else None,
+    }
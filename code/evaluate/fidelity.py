@@ -3,11 +3,11 @@
 """
 
 import numpy as np
-from sympy import re
 import torch
-from utils.gen_utils import list_to_dict, get_proba
+from torch_geometric.utils import k_hop_subgraph
+from utils.gen_utils import get_proba
 
-def eval_related_pred_nc(model, data, edge_masks, node_feat_masks, list_node_idx, device, args):
+def eval_related_pred_nc(model, data, edge_masks, node_feat_masks, list_node_idx, device, args, ori_ypred=None):
     """ Evaluate related predictions for a single node.
 
     Args:
@@ -16,16 +16,27 @@ def eval_related_pred_nc(model, data, edge_masks, node_feat_masks, list_node_idx
         edge_masks: edge masks for the testing node
         node_feat_masks: node features masks for the testing node
         list_node_idx: list of testing nodes
+        ori_ypred: model output on the initial graph, computed if None
 
     Returns:
         related_pred: dictionary of related predictions with masked and maskout predictions
     """
-    related_preds = []
     data = data.to(device)
-    ori_ypred = model(data.x, data.edge_index, edge_weight=data.edge_weight).cpu().detach().numpy()
+    if ori_ypred is None:
+        ori_ypred = model(data.x, data.edge_index, edge_weight=data.edge_weight).cpu().detach().numpy()
     ori_yprob = get_proba(ori_ypred)
-    
+    hard_mask = args.hard_mask
+
     num_test = args.num_test_final if args.E else args.num_test
+    node_idx = np.array(list_node_idx[:num_test])
+    related_preds = {
+        "node_idx": node_idx,
+        "masked": np.zeros((num_test, ori_yprob.shape[1])),
+        "maskout": np.zeros((num_test, ori_yprob.shape[1])),
+        "origin": ori_yprob[node_idx],
+        "true_label": data.y[node_idx].cpu().numpy(),
+        "pred_label": np.argmax(ori_yprob[node_idx], axis=1),
+    }
 
     for i in range(num_test):
 
@@ -42,153 +53,176 @@ def eval_related_pred_nc(model, data, edge_masks, node_feat_masks, list_node_idx
                 x_maskout = data.x * (1 - node_feat_mask)
         
         if not args.E:
-            if eval(args.hard_mask):
-                masked_ypred = model(x_masked, data.edge_index).cpu().detach().numpy()
-                maskout_ypred = model(x_maskout, data.edge_index).cpu().detach().numpy()
+            if hard_mask:
+                masked_ypred = model(x_masked, data.edge_index)
+                maskout_ypred = model(x_maskout, data.edge_index)
             else:
-                masked_ypred = model(x_masked, data.edge_index, edge_weight=data.edge_weight).cpu().detach().numpy()
-                maskout_ypred = model(x_maskout, data.edge_index, edge_weight=data.edge_weight).cpu().detach().numpy()
+                masked_ypred = model(x_masked, data.edge_index, edge_weight=data.edge_weight)
+                maskout_ypred = model(x_maskout, data.edge_index, edge_weight=data.edge_weight)
 
         else:
             edge_mask = torch.Tensor(edge_masks[i]).to(device)
-            if eval(args.hard_mask):
+            if hard_mask:
                 masked_edge_index = data.edge_index[:, edge_mask > 0].to(device)
                 maskout_edge_index = data.edge_index[:, edge_mask <= 0].to(device)
-                masked_ypred = model(x_masked, masked_edge_index).cpu().detach().numpy()
-                maskout_ypred = model(x_maskout, maskout_edge_index).cpu().detach().numpy()
+                masked_ypred = model(x_masked, masked_edge_index)
+                maskout_ypred = model(x_maskout, maskout_edge_index)
             else:
-                masked_ypred = model(x_masked, data.edge_index, edge_weight=data.edge_weight*edge_mask).cpu().detach().numpy()
-                maskout_ypred = model(x_maskout, data.edge_index, edge_weight=data.edge_weight*(1-edge_mask)).cpu().detach().numpy()
-            edge_mask = edge_mask.cpu().detach().numpy()
-        
-        
-        node_idx = list_node_idx[i]
-        masked_yprob = get_proba(masked_ypred)
-        maskout_yprob = get_proba(maskout_ypred)
-
-        ori_probs = ori_yprob[node_idx]
-        masked_probs = masked_yprob[node_idx]
-        maskout_probs = maskout_yprob[node_idx]
-        true_label = data.y[node_idx].cpu().numpy()
-        pred_label = np.argmax(ori_probs)
-       
-
-        # assert true_label == pred_label, "The label predicted by the GCN does not match the true label."\
-        related_preds.append(
-            {
-                "node_idx": node_idx,
-                "masked": masked_probs,
-                "maskout": maskout_probs,
-                "origin": ori_probs,
-                "true_label": true_label,
-                "pred_label": pred_label,
-            }
+                masked_ypred = model(x_masked, data.edge_index, edge_weight=data.edge_weight*edge_mask)
+                maskout_ypred = model(x_maskout, data.edge_index, edge_weight=data.edge_weight*(1-edge_mask))
+
+        # only the row of the explained node is needed
+        related_preds["masked"][i] = get_proba(masked_ypred[[node_idx[i]]].cpu().detach().numpy())[0]
+        related_preds["maskout"][i] = get_proba(maskout_ypred[[node_idx[i]]].cpu().detach().numpy())[0]
+
+    return related_preds
+
+
+def get_masked_features(data, node_feat_masks, i, subset, args):
+    """Masked and maskout node features of the subgraph nodes subset for the i-th testing node"""
+    x = data.x[subset]
+    if not args.NF:
+        return x, x
+    node_feat_mask = torch.Tensor(node_feat_masks[i]).to(x.device)
+    if node_feat_mask.dim() == 2:
+        node_feat_mask = node_feat_mask[subset]
+        return node_feat_mask, 1 - node_feat_mask
+    return x * node_feat_mask, x * (1 - node_feat_mask)
+
+
+def eval_related_pred_curve(model, data, edge_masks, node_feat_masks, list_node_idx, device, args, sparsities, ori_ypred=None):
+    """Related predictions of the masks transformed with the sparsity strategy, for every sparsity level.
+
+    Each mask is sorted once: the edges kept at sparsity s are its int((1 - s) * num_edges) edges of highest
+    value, as in control_sparsity, so the levels give a nested sequence of edge sets. The prediction of a
+    node only depends on its num_gc_layers-hop subgraph: the masked and maskout graphs of all levels are
+    copies of that subgraph that only differ by their edge weights, and copies of several nodes are
+    evaluated together as one disjoint union of at most args.curve_batch_nodes nodes.
+
+    Returns:
+        list of related predictions (as eval_related_pred_nc) per sparsity level
+    """
+    data = data.to(device)
+    if ori_ypred is None:
+        ori_ypred = model(data.x, data.edge_index, edge_weight=data.edge_weight).cpu().detach().numpy()
+    ori_yprob = get_proba(ori_ypred)
+    num_test = args.num_test_final
+    num_edges = data.edge_index.size(1)
+    split_points = np.array([int((1 - sparsity) * num_edges) for sparsity in sparsities])
+    hard_mask = args.hard_mask
+    num_classes = ori_yprob.shape[1]
+    masked_probs = np.zeros((len(sparsities), num_test, num_classes))
+    maskout_probs = np.zeros((len(sparsities), num_test, num_classes))
+
+    def run(batch):
+        """Forward of a batch of (test index, masked or maskout, x, edge_index, edge_weight, center) copies"""
+        num_levels = len(sparsities)
+        xs, edge_indices, edge_weights, centers = [], [], [], []
+        offset = 0
+        for _, _, x, sub_edge_index, edge_weight, center in batch:
+            # one copy of the subgraph per level, levels in the order of the rows of edge_weight
+            level_offsets = torch.arange(num_levels, device=device).repeat_interleave(sub_edge_index.size(1)) * len(x)
+            xs.append(x.repeat(num_levels, 1))
+            edge_indices.append(sub_edge_index.repeat(1, num_levels) + level_offsets + offset)
+            edge_weights.append(edge_weight.reshape(-1))
+            centers.append(center + offset + np.arange(num_levels) * len(x))
+            offset += num_levels * len(x)
+        ypred = model(torch.cat(xs), torch.cat(edge_indices, dim=1), edge_weight=torch.cat(edge_weights)).cpu().detach().numpy()
+        yprob = get_proba(ypred[np.concatenate(centers)]).reshape(len(batch), num_levels, num_classes)
+        for (i, is_masked, *_), probs in zip(batch, yprob):
+            (masked_probs if is_masked else maskout_probs)[:, i] = probs
+
+    batch, batch_nodes = [], 0
+    for i in range(num_test):
+        subset, sub_edge_index, mapping, hop_edge_mask = k_hop_subgraph(
+            list_node_idx[i], args.num_gc_layers, data.edge_index, relabel_nodes=True, num_nodes=data.num_nodes
         )
-        
-    related_preds = list_to_dict(related_preds)
+        mask = np.asarray(edge_masks[i], dtype=float)
+        rank = np.empty(num_edges, dtype=np.int64)
+        rank[(-mask).argsort()] = np.arange(num_edges)
+        sub_edges = hop_edge_mask.nonzero().view(-1).cpu().numpy()
+        # (levels x subgraph edges) transformed mask values
+        values = mask[sub_edges][None, :] * (rank[sub_edges][None, :] < split_points[:, None])
+        values = torch.Tensor(values).to(device)
+        if hard_mask:
+            masked_weight = (values > 0).float()
+            maskout_weight = 1 - masked_weight
+        else:
+            edge_weight = data.edge_weight[hop_edge_mask]
+            masked_weight = edge_weight * values
+            maskout_weight = edge_weight * (1 - values)
+        x_masked, x_maskout = get_masked_features(data, node_feat_masks, i, subset, args)
+        center = int(mapping)
+        for copy in [(i, True, x_masked, sub_edge_index, masked_weight, center), (i, False, x_maskout, sub_edge_index, maskout_weight, center)]:
+            n = len(sparsities) * len(subset)
+            if batch and batch_nodes + n > args.curve_batch_nodes:
+                run(batch)
+                batch, batch_nodes = [], 0
+            batch.append(copy)
+            batch_nodes += n
+    if batch:
+        run(batch)
+
+    related_preds = []
+    node_idx = np.array(list_node_idx[:num_test])
+    origin = ori_yprob[node_idx]
+    for j in range(len(sparsities)):
+        related_preds.append({
+            "node_idx": node_idx,
+            "masked": masked_probs[j],
+            "maskout": maskout_probs[j],
+            "origin": origin,
+            "true_label": data.y[node_idx].cpu().numpy(),
+            "pred_label": np.argmax(origin, axis=1),
+        })
     return related_preds
 
 
+def eval_fidelity_curve(related_preds_curve, sparsities, args):
+    """Fidelity scores at every sparsity level, and the area under each fidelity curve over the sparsity levels."""
+    curve = [eval_fidelity(related_preds, args) for related_preds in related_preds_curve]
+    order = np.argsort(sparsities)
+    x = np.array(sparsities, dtype=float)[order]
+    auc = {key + "_auc": trapezoid(np.array([scores[key] for scores in curve])[order], x) for key in curve[0]}
+    return curve, auc
+
 
-def fidelity_acc(related_preds):
-    labels = related_preds["true_label"]
-    ori_labels = np.argmax(related_preds["origin"], axis=1)
-    unimportant_labels = np.argmax(related_preds["maskout"], axis=1)
-    p_1 = np.array(ori_labels == labels).astype(int)
-    p_2 = np.array(unimportant_labels == labels).astype(int)
-    drop_probability = np.abs(p_1 - p_2)
-    return drop_probability.mean().item()
-
-
-def fidelity_acc_inv(related_preds):
-    labels = related_preds["true_label"]
-    ori_labels = np.argmax(related_preds["origin"], axis=1)
-    important_labels = np.argmax(related_preds["masked"], axis=1)
-    p_1 = np.array([ori_labels == labels]).astype(int)
-    p_2 = np.array([important_labels == labels]).astype(int)
-    drop_probability = np.abs(p_1 - p_2)
-    return drop_probability.mean().item()
-
-
-def fidelity_gnn_acc(related_preds):
-    labels = related_preds["pred_label"]
-    ori_labels = np.argmax(related_preds["origin"], axis=1)
-    unimportant_labels = np.argmax(related_preds["maskout"], axis=1)
-    p_1 = np.array(ori_labels == labels).astype(int)
-    p_2 = np.array(unimportant_labels == labels).astype(int)
-    drop_probability = np.abs(p_1 - p_2)
-    return drop_probability.mean().item()
-
-
-def fidelity_gnn_acc_inv(related_preds):
-    labels = related_preds["pred_label"]
-    ori_labels = np.argmax(related_preds["origin"], axis=1)
-    important_labels = np.argmax(related_preds["masked"], axis=1)
-    p_1 = np.array([ori_labels == labels]).astype(int)
-    p_2 = np.array([important_labels == labels]).astype(int)
-    drop_probability = np.abs(p_1 - p_2)
-    return drop_probability.mean().item()
-
-
-# Fidelity+  metric  studies  the  prediction  change  by
-# removing  important  nodes/edges/node  features.
-# Higher fidelity+ value indicates good explanations -->1
-def fidelity_prob(related_preds):
-    labels = related_preds["true_label"]
-    ori_probs = np.choose(labels, related_preds["origin"].T)
-    unimportant_probs = np.choose(labels, related_preds["maskout"].T)
-    drop_probability = ori_probs - unimportant_probs
-    return drop_probability.mean().item()
-
-
-# Fidelity-  metric  studies  the  prediction  change  by
-# removing  unimportant  nodes/edges/node  features.
-# Lower fidelity- value indicates good explanations -->0
-def fidelity_prob_inv(related_preds):
-    labels = related_preds["true_label"]
-    ori_probs = np.choose(labels, related_preds["origin"].T)
-    important_probs = np.choose(labels, related_preds["masked"].T)
-    drop_probability = ori_probs - important_probs
-    return drop_probability.mean().item()
-
-
-# Fidelity+  metric  studies  the  prediction  change  by
-# removing  important  nodes/edges/node  features.
-# Higher fidelity+ value indicates good explanations -->1
-def fidelity_gnn_prob(related_preds):
-    labels = related_preds["pred_label"]
-    ori_probs = np.choose(labels, related_preds["origin"].T)
-    unimportant_probs = np.choose(labels, related_preds["maskout"].T)
-    drop_probability = np.abs(ori_probs - unimportant_probs)
-    return drop_probability.mean().item()
-
-
-# Fidelity-  metric  studies  the  prediction  change  by
-# removing  unimportant  nodes/edges/node  features.
-# Lower fidelity- value indicates good explanations -->0
-def fidelity_gnn_prob_inv(related_preds):
-    labels = related_preds["pred_label"]
-    ori_probs = np.choose(labels, related_preds["origin"].T)
-    important_probs = np.choose(labels, related_preds["masked"].T)
-    drop_probability = np.abs(ori_probs - important_probs)
-    return drop_probability.mean().item()
+def trapezoid(y, x):
+    """Area under the piecewise linear curve through the points (x, y) (np.trapz is removed in NumPy 2)"""
+    return float(np.sum((x[1:] - x[:-1]) * (y[1:] + y[:-1]) / 2))
 
 
+def fidelity_all(related_preds):
+    """All fidelity scores of the related predictions in one vectorized pass, for the true labels
+    (fidelity_acc, fidelity_prob) and the labels predicted by the model (fidelity_gnn_acc, fidelity_gnn_prob).
+
+    Fidelity+ studies the prediction change by removing important nodes/edges/node features (maskout
+    predictions): higher fidelity+ indicates good explanations -->1.
+    Fidelity- studies the prediction change by removing unimportant nodes/edges/node features (masked
+    predictions): lower fidelity- indicates good explanations -->0.
+    """
+    # (origin, masked, maskout) x testing nodes x classes
+    probs = np.stack([related_preds["origin"], related_preds["masked"], related_preds["maskout"]])
+    pred_labels = np.argmax(probs, axis=2)
+    rows = np.arange(probs.shape[1])
+    scores = {}
+    for name, labels in [("fidelity", related_preds["true_label"]), ("fidelity_gnn", related_preds["pred_label"])]:
+        correct = (pred_labels == labels).astype(int)
+        label_probs = probs[:, rows, labels]
+        prob_drop = label_probs[0] - label_probs[1:]
+        if name == "fidelity_gnn":
+            prob_drop = np.abs(prob_drop)
+        acc_drop = np.abs(correct[0] - correct[1:])
+        scores.update({
+            name + "_acc+": acc_drop[1].mean().item(),
+            name + "_acc-": acc_drop[0].mean().item(),
+            name + "_prob+": prob_drop[1].mean().item(),
+            name + "_prob-": prob_drop[0].mean().item(),
+        })
+    return scores
+
 
 def eval_fidelity(related_preds, args):
-    if eval(args.true_label_as_target):
-        fidelity_scores = {
-            "fidelity_acc+": fidelity_acc(related_preds),
-            "fidelity_acc-": fidelity_acc_inv(related_preds),
-            "fidelity_prob+": fidelity_prob(related_preds),
-            "fidelity_prob-": fidelity_prob_inv(related_preds)
-        }
-    else:
-        fidelity_scores = {
-            "fidelity_gnn_acc+": fidelity_gnn_acc(related_preds),
-            "fidelity_gnn_acc-": fidelity_gnn_acc_inv(related_preds),
-            "fidelity_gnn_prob+": fidelity_gnn_prob(related_preds),
-            "fidelity_gnn_prob-": fidelity_gnn_prob_inv(related_preds)
-        }
-
-    return fidelity_scores
+    scores = fidelity_all(related_preds)
+    prefix = "fidelity_" if args.true_label_as_target else "fidelity_gnn_"
+    return {prefix + key: scores[prefix + key] for key in ["acc+", "acc-", "prob+", "prob-"]}
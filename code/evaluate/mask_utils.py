@@ -1,10 +1,10 @@
 import numpy as np
-from scipy.stats import entropy, gaussian_kde
-import matplotlib.pyplot as plt
+from scipy.stats import entropy
 import torch
 from scipy.sparse import csr_matrix
 from scipy.sparse.csgraph import connected_components
 from torch_geometric.utils import to_scipy_sparse_matrix
+from utils.mask_store import SparseMasks
 
 
 
@@ -41,13 +41,19 @@ def normalize_all_masks(masks):
     return masks
 
 
+def clean_mask(mask):
+    mask = np.nan_to_num(mask, copy=True, nan=0.0, posinf=10, neginf=-10)
+    mask = np.clip(mask, -10, 10)
+    mask = normalize_mask(mask)
+    return np.where(mask < 0.001, 0, mask)
+
+
 def clean_masks(masks):
     """Clean masks by removing NaN, inf and too small values and normalizing"""
+    if isinstance(masks, SparseMasks):
+        return masks.map(clean_mask)
     for i in range(len(masks)):
-        masks[i] = np.nan_to_num(masks[i], copy=True, nan=0.0, posinf=10, neginf=-10)
-        masks[i] = np.clip(masks[i], -10, 10)
-        masks[i] = normalize_mask(masks[i])
-        masks[i] = np.where(masks[i] < 0.001, 0, masks[i])
+        masks[i] = clean_mask(masks[i])
     return masks
 
 def get_ratio_connected_components(edge_masks, edge_index):
@@ -69,6 +75,8 @@ def get_ratio_connected_components(edge_masks, edge_index):
     return np.mean(cc_ratio)
 
 def get_sparsity(masks):
+    if isinstance(masks, SparseMasks):
+        return 1.0 - np.mean(np.diff(masks.indptr)) / masks.num_edges
     sparsity = 0
     for i in range(len(masks)):
         sparsity += 1.0 - (masks[i] != 0).sum() / len(masks[i])
@@ -76,6 +84,8 @@ def get_sparsity(masks):
 
 
 def get_size(masks):
+    if isinstance(masks, SparseMasks):
+        return np.mean(np.diff(masks.indptr))
     size = 0
     for i in range(len(masks)):
         size += (masks[i] != 0).sum()
@@ -104,7 +114,7 @@ def get_avg_max(masks):
         #kde = gaussian_kde(np.array(pos_mask))
         #density = kde(pos_mask) 
         #index = np.argmax(density)
-        ys, xs, _ = plt.hist(pos_mask, bins=100)
+        ys, xs = np.histogram(pos_mask, bins=100)
         index = np.argmax(ys)
         max_avg += xs[index] 
         k += 1
@@ -125,11 +135,11 @@ def get_mask_info(masks, edge_index):
 
 def transform_mask(masks, data, param, args):
     """Transform masks according to the given strategy (topk, threshold, sparsity) and level."""
-    new_masks = []
+    new_masks = SparseMasks(data.edge_index.size(1))
     for mask_ori in masks:
         mask = mask_ori.copy()
         if args.strategy == 'topk':
-            if eval(args.directed):
+            if args.directed:
                 unimportant_indices = (-mask).argsort()[param :]
                 mask[unimportant_indices] = 0
             else:
@@ -140,7 +150,7 @@ def transform_mask(masks, data, param, args):
         if args.strategy == 'threshold':
             mask = np.where(mask > param, mask, 0)
         new_masks.append(mask)
-    return np.array(new_masks, dtype=np.float64)
+    return new_masks
 
 
 def mask_to_shape(mask, edge_index, num_top_edges):
@@ -1,36 +1,150 @@
+""" genmask.py
+    Scheduler of the explanations of the testing nodes.
+
+    The capabilities an explainer declares in the registry (see explainer.registry) pick how its nodes
+    are explained: all at once by the batch function of batchable explainers, in worker processes for
+    CPU-heavy explainers, one after the other otherwise. Masks are saved to the mask cache for
+    cacheable explainers. In worker processes, which are forked with the same random state, the
+    random generators of the worker are seeded per node for non-deterministic explainers.
+"""
+import multiprocessing
+import random
 import time
-from utils.gen_utils import get_labels
 
+import numpy as np
 import torch
 
-from explainer.graph_explainer import *
-from explainer.node_explainer import *
+from explainer.registry import get_explainer
+from explainer.session import ExplainerSession
+from utils.gen_utils import get_labels
+from utils.io_utils import create_mask_filename
+from utils.mask_store import MaskCache, SparseMasks
 
+# session and targets of the worker processes, inherited from the parent process when they are forked
+_worker_job = None
 
-def compute_edge_masks_nc(list_test_nodes, model, data, device, args):
-    explain_function = eval("explain_" + args.explainer_name + "_node")
-    Time = []
-    edge_masks, node_feat_masks = [], []
-    if eval(args.true_label_as_target):
-        targets = data.y
-    else:
-        out = model(data.x, data.edge_index, edge_weight=data.edge_weight)
-        targets = torch.LongTensor(get_labels(out.detach().cpu().numpy())).to(device)
+
+def get_mask_cache(data, args):
+    """MaskCache of the run if masks are saved and the explainer's masks are cacheable, else None"""
+    if args.save_mask and get_explainer(args.explainer_name).cacheable:
+        return MaskCache(create_mask_filename(args), data.edge_index.size(1))
+    return None
+
+
+def seed_node(node_idx, args):
+    """Seed the random generators of a worker process for node_idx, so that forked workers do not
+    draw the same random numbers and the masks do not depend on the worker explaining the node"""
+    seed = args.seed + int(node_idx)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def explain_node(session, node_idx, target):
+    """Explain one node; returns (node_idx, edge_mask, node_feat_mask, duration in seconds)."""
+    start_time = time.time()
+    edge_mask, node_feat_mask = session.explain(node_idx, target)
+    return node_idx, edge_mask, node_feat_mask, time.time() - start_time
+
+
+def init_worker():
+    # one thread per worker, the workers already use all cores
+    torch.set_num_threads(1)
+
+
+def explain_node_worker(node_idx):
+    session, targets = _worker_job
+    if not session.spec.deterministic:
+        seed_node(node_idx, session.args)
+    return explain_node(session, node_idx, targets[node_idx])
+
+
+def use_workers(session, list_test_nodes, args):
+    """Whether to explain the nodes in worker processes: CPU-heavy explainers, when CUDA is not in use
+    (forking a process that initialized CUDA is not supported)"""
+    return session.spec.cpu_heavy and args.num_workers > 1 and len(list_test_nodes) > 1 and not torch.cuda.is_initialized()
+
+
+def compute_edge_masks_nc_batch(list_test_nodes, session, targets, args, cache=None):
+    """Explain the testing nodes with the batch function of the explainer, args.explain_chunk_size nodes
+    per call. The time limit is checked between chunks, and each node is timed as the average of its chunk."""
+    num_edges = session.data.edge_index.size(1)
+    edge_masks, node_feat_masks, Time = SparseMasks(num_edges), [], []
     t0 = time.time()
-    for node_idx in list_test_nodes:
+    for start in range(0, len(list_test_nodes), args.explain_chunk_size):
+        chunk = list_test_nodes[start : start + args.explain_chunk_size]
         start_time = time.time()
-        edge_mask, node_feat_mask = explain_function(
-            model, data, node_idx, targets[node_idx], device, args
-        )
-        end_time = time.time()
-        duration_seconds = end_time - start_time
-        Time.append(duration_seconds)
-        edge_masks.append(edge_mask)
-        node_feat_masks.append(node_feat_mask)
-        t1 = time.time()
-        if t1 - t0 > args.time_limit:
+        chunk_edge_masks, chunk_node_feat_masks = session.explain_all(chunk, targets[chunk])
+        duration_seconds = (time.time() - start_time) / len(chunk)
+        chunk_edge_masks = SparseMasks.from_masks(chunk_edge_masks, num_edges)
+        if chunk_node_feat_masks is None:
+            chunk_node_feat_masks = [None] * len(chunk)
+        if cache is not None:
+            for node_idx, edge_mask, node_feat_mask in zip(chunk, chunk_edge_masks, chunk_node_feat_masks):
+                cache.append(node_idx, edge_mask, node_feat_mask, duration_seconds)
+        else:
+            edge_masks.extend(chunk_edge_masks.to_csr())
+            node_feat_masks.extend(chunk_node_feat_masks)
+            Time.extend([duration_seconds] * len(chunk))
+        if time.time() - t0 > args.time_limit:
             print("Time limit reached")
             break
-    args.num_test_final = len(edge_masks)
+    if cache is not None:
+        return cache.masks()
     return edge_masks, node_feat_masks, Time
 
+
+def compute_edge_masks_nc(list_test_nodes, model, data, device, args, cache=None):
+    """Explain the testing nodes. With a MaskCache, the nodes it already holds are not explained again,
+    each new explanation is appended to it as soon as it is computed, and the masks are read back from it."""
+    global _worker_job
+    if cache is not None:
+        list_test_nodes = cache.remaining(list_test_nodes)
+        if len(list_test_nodes) == 0:
+            edge_masks, node_feat_masks, Time = cache.masks()
+            args.num_test_final = len(Time)
+            return edge_masks, node_feat_masks, Time
+    session = ExplainerSession(model, data, device, args)
+    if args.true_label_as_target:
+        targets = data.y
+    else:
+        targets = torch.LongTensor(get_labels(session.ori_pred.cpu().numpy())).to(device)
+    # prepare the explainer once, outside of the per-node timing
+    session.prepare()
+    if session.spec.batchable:
+        edge_masks, node_feat_masks, Time = compute_edge_masks_nc_batch(list_test_nodes, session, targets, args, cache)
+        args.num_test_final = len(Time)
+        return edge_masks, node_feat_masks, Time
+    Time = []
+    edge_masks, node_feat_masks = SparseMasks(data.edge_index.size(1)), []
+    t0 = time.time()
+    if use_workers(session, list_test_nodes, args):
+        _worker_job = (session, targets)
+        pool = multiprocessing.get_context("fork").Pool(min(args.num_workers, len(list_test_nodes)), init_worker)
+        explanations = pool.imap(explain_node_worker, list_test_nodes)
+    else:
+        pool = None
+        explanations = (explain_node(session, node_idx, targets[node_idx]) for node_idx in list_test_nodes)
+    try:
+        for node_idx, edge_mask, node_feat_mask, duration_seconds in explanations:
+            Time.append(duration_seconds)
+            if cache is not None:
+                cache.append(node_idx, edge_mask, node_feat_mask, duration_seconds)
+            else:
+                if edge_mask is not None:
+                    edge_masks.append(edge_mask)
+                node_feat_masks.append(node_feat_mask)
+            t1 = time.time()
+            if t1 - t0 > args.time_limit:
+                print("Time limit reached")
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            _worker_job = None
+    if cache is not None:
+        edge_masks, node_feat_masks, Time = cache.masks()
+    elif len(edge_masks) == 0:
+        edge_masks = [None] * len(node_feat_masks)
+    args.num_test_final = len(edge_masks)
+    return edge_masks, node_feat_masks, Time
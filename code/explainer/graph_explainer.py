@@ -97,27 +97,30 @@ def explain_gradcam_graph(model, x, edge_index, target, device, args, include_ed
     return edge_mask
 
 
-def explain_occlusion_graph(model, x, edge_index, target, device, args, include_edges=None):
-    depth_limit = args.num_gc_layers + 1
-    data = Data(x=x, edge_index=edge_index)
+def explain_occlusion_graph(model, x, edge_index, target, device, args, include_edges=None, batch_size=32):
     if target is None:
         pred_probs = model(x, edge_index).cpu().detach().numpy()
         pred_prob = pred_probs[target]
     else:
         pred_prob = 1
-    g = to_networkx(data)
-    edge_occlusion_mask = np.ones(data.num_edges, dtype=bool)
-    edge_mask = np.zeros(data.num_edges)
-    edge_index_numpy = data.edge_index.cpu().numpy()
-    for i in range(data.num_edges):
-        if include_edges is not None and not include_edges[i].item():
-            continue
-        u, v = list(edge_index_numpy[:, i])
-        if (u, v) in g.edges():
-            edge_occlusion_mask[i] = False
-            prob = model(data.x, data.edge_index[:, edge_occlusion_mask])[0][target].item()
-            edge_mask[i] = pred_prob - prob
-            edge_occlusion_mask[i] = True
+    num_nodes, num_edges = x.size(0), edge_index.size(1)
+    occluded_edges = np.arange(num_edges)
+    if include_edges is not None:
+        occluded_edges = occluded_edges[include_edges.cpu().numpy().astype(bool)]
+    # build the adjacency once and remove one edge per graph of the batch;
+    # batch normalization statistics are shared across a batch, so only batch graphs without it
+    adj = from_edge_index_to_adj(edge_index, torch.ones(num_edges), num_nodes).to(device)
+    batch_size = batch_size if not model.bn else 1
+    src, dst = edge_index.cpu().numpy()
+    edge_mask = np.zeros(num_edges)
+    for start in range(0, len(occluded_edges), batch_size):
+        chunk = occluded_edges[start : start + batch_size]
+        b = len(chunk)
+        adj_occluded = adj.expand(b, -1, -1).clone()
+        adj_occluded[np.arange(b), src[chunk], dst[chunk]] -= 1
+        with torch.no_grad():
+            pred, _ = model.forward_batch(x.expand(b, -1, -1), adj_occluded)
+        edge_mask[chunk] = pred_prob - pred[:, target].cpu().numpy()
     return edge_mask
 
 
@@ -133,7 +136,7 @@ def explain_gnnexplainer_graph(model, x, edge_index, target, device, args, inclu
         edge_size=args.edge_size,
         allow_node_mask=False,
     )
-    if eval(args.explain_graph):
+    if args.explain_graph:
         edge_mask = explainer.explain_graph_with_target(
             x=x, edge_index=edge_index, edge_weights=kwargs["edge_weights"], target=target
         )
@@ -2,19 +2,14 @@ import os
 import networkx as nx
 import numpy as np
 import torch
-from captum.attr import IntegratedGradients, LayerGradCam, Saliency
 from gnn.model import GraphConv, GraphConvolution
-from torch_geometric.data import Data
-from torch_geometric.utils import to_networkx
+from torch_geometric.utils import k_hop_subgraph
 from utils.gen_utils import sample_large_graph
+from utils.graph_utils import bfs_distances_to, get_csr_adjacency, personalized_pagerank
+from utils.io_utils import create_explainer_model_filename
 
-from explainer.gnnexplainer import GNNExplainer, TargetedGNNExplainer
-from explainer.gnnlrp import GNN_LRP
-from explainer.graphsvx import LIME, SHAP, GraphLIME, GraphSVX
-from explainer.pgexplainer import PGExplainer
-from explainer.pgmexplainer import Node_Explainer
-from explainer.subgraphx import SubgraphX
-from explainer.zorro import Zorro
+# The explainer libraries (captum, pgmpy, the explainer.* implementations) are imported by the functions
+# that use them, so that importing this module, and running the basic or cached explainers, does not load them.
 
 
 def balance_mask_undirected(edge_mask, edge_index):
@@ -67,33 +62,35 @@ def explain_random_node(model, data, node_idx, target, device, args):
     return edge_mask, node_feat_mask
 
 
-def explain_distance_node(model, data, node_idx, target, device, args):
-    data = Data(x=data.x, edge_index=data.edge_index)
-    g = to_networkx(data)
-    length = nx.shortest_path_length(g, target=node_idx)
+def explain_distance_node(model, data, node_idx, target, device, args, csr=None):
+    edge_masks, _ = explain_distance_nodes(model, data, [node_idx], None, device, args, csr=csr)
+    return edge_masks[0], None
 
-    def get_attr(node):
-        if node in length:
-            return 1 / (length[node] + 1)
-        return 0
 
+def explain_distance_nodes(model, data, list_node_idx, targets, device, args, csr=None):
+    """Each edge gets 1 / (d + 1), d the hop distance from its target node to the explained node."""
+    adj = get_csr_adjacency(data.edge_index, data.num_nodes) if csr is None else csr
+    length = bfs_distances_to(adj, list_node_idx)
+    node_attr = np.where(np.isfinite(length), 1 / (length + 1), 0)
     edge_sources = data.edge_index[1].cpu().numpy()
-    return np.array([get_attr(node) for node in edge_sources]), None
+    return node_attr[:, edge_sources], None
 
 
-def explain_pagerank_node(model, data, node_idx, target, device, args):
-    data = Data(x=data.x, edge_index=data.edge_index)
-    g = to_networkx(data)
-    pagerank = nx.pagerank(g, personalization={node_idx: 1})
+def explain_pagerank_node(model, data, node_idx, target, device, args, csr=None):
+    edge_masks, _ = explain_pagerank_nodes(model, data, [node_idx], None, device, args, csr=csr)
+    return edge_masks[0], None
 
-    node_attr = np.zeros(data.x.shape[0])
-    for node, value in pagerank.items():
-        node_attr[node] = value
-    edge_mask = node_attr_to_edge(data.edge_index, node_attr)
-    return edge_mask, None
+
+def explain_pagerank_nodes(model, data, list_node_idx, targets, device, args, csr=None):
+    """Personalized PageRank of each explained node, summed over the two ends of every edge."""
+    adj = get_csr_adjacency(data.edge_index, data.num_nodes) if csr is None else csr
+    node_attr = personalized_pagerank(adj, list_node_idx).T
+    edge_index = data.edge_index.cpu().numpy()
+    return node_attr[:, edge_index[0]] + node_attr[:, edge_index[1]], None
 
 
 def explain_basic_gnnexplainer_node(model, data, node_idx, target, device, args):
+    from explainer.gnnexplainer import GNNExplainer
     explainer = GNNExplainer(
         model, num_hops=args.num_gc_layers, epochs=1000, edge_ent=args.edge_ent, edge_size=args.edge_size
     )
@@ -106,22 +103,58 @@ def explain_basic_gnnexplainer_node(model, data, node_idx, target, device, args)
 
 
 def explain_gradcam_node(model, data, node_idx, target, device, args):
-    # Captum default implementation of LayerGradCam does not average over nodes for different channels because of
-    # different assumptions on tensor shapes
-    input_mask = data.x.clone().requires_grad_(True).to(device)
+    edge_masks, _ = explain_gradcam_nodes(model, data, [node_idx], torch.stack([torch.as_tensor(target)]), device, args)
+    return edge_masks[0], None
+
+
+def explain_gradcam_nodes(model, data, list_node_idx, targets, device, args):
+    """Grad-CAM of all convolution layers, averaged over layers, from a single forward and backward
+    per batch of nodes: forward hooks capture the activations of every layer and one backward of the
+    summed target outputs gives their gradients. As in captum's LayerGradCam on node x channel
+    activations, the attribution of a node is the sum over channels of gradient times activation.
+    Each node is evaluated on its own copy of its num_gc_layers-hop subgraph, as in batched_input_gradients.
+    """
     layers = get_all_convolution_layers(model, args)
-    node_attrs = []
-    for layer in layers:
-        layer_gc = LayerGradCam(model_forward_node, layer)
-        node_attr = layer_gc.attribute(input_mask, target=target, additional_forward_args=(model, data.edge_index, data.edge_weight, node_idx))
-        node_attr = node_attr.cpu().detach().numpy().ravel()
-        node_attrs.append(node_attr)
-    node_attr = np.array(node_attrs).mean(axis=0)
-    edge_mask = node_attr_to_edge(data.edge_index, node_attr)
-    return edge_mask, None
+    subgraphs = get_computation_subgraphs(data, list_node_idx, args)
+    node_attrs = [torch.zeros(len(subset), device=data.x.device) for subset, _, _, _ in subgraphs]
+
+    activations = []
+
+    def save_activation(module, inputs, output):
+        activations.append(output[0] if isinstance(output, tuple) else output)
+
+    handles = [layer.register_forward_hook(save_activation) for layer in layers]
+    try:
+        for batch in split_copies([(i,) for i in range(len(subgraphs))], subgraphs, args):
+            indices = [i for i, in batch]
+            x, edge_index, edge_weight, centers, offsets = collate_copies(data, subgraphs, indices)
+            del activations[:]
+            out = model(x, edge_index, edge_weight=edge_weight)
+            copy_targets = torch.stack([targets[i] for i in indices]).to(out.device)
+            objective = out[centers, copy_targets].sum()
+            gradients = torch.autograd.grad(objective, activations)
+            # activations are node x channel, with a leading batch dimension for GraphConv
+            layer_attrs = [
+                (gradient.reshape(-1, gradient.size(-1)) * activation.reshape(-1, activation.size(-1))).sum(dim=1)
+                for gradient, activation in zip(gradients, activations)
+            ]
+            attr = torch.stack(layer_attrs).mean(dim=0).detach()
+            for i, offset in zip(indices, offsets):
+                node_attrs[i] = attr[offset : offset + len(subgraphs[i][0])]
+    finally:
+        for handle in handles:
+            handle.remove()
+
+    edge_masks = []
+    for (subset, _, _, _), attr in zip(subgraphs, node_attrs):
+        node_attr = np.zeros(data.x.shape[0])
+        node_attr[subset.cpu().numpy()] = attr.cpu().numpy()
+        edge_masks.append(node_attr_to_edge(data.edge_index, node_attr))
+    return np.array(edge_masks), None
 
 
 def explain_sa_node(model, data, node_idx, target, device, args):
+    from captum.attr import Saliency
     saliency = Saliency(model_forward_node)
     input_mask = data.x.clone().requires_grad_(True).to(device)
     saliency_mask = saliency.attribute(
@@ -135,6 +168,7 @@ def explain_sa_node(model, data, node_idx, target, device, args):
 
 
 def explain_ig_node(model, data, node_idx,target, device, args):
+    from captum.attr import IntegratedGradients
     ig = IntegratedGradients(model_forward_node)
     input_mask = data.x.clone().requires_grad_(True).to(device)
     ig_mask = ig.attribute(
@@ -149,32 +183,145 @@ def explain_ig_node(model, data, node_idx,target, device, args):
     return edge_mask, node_feat_mask
 
 
+def get_computation_subgraphs(data, list_node_idx, args):
+    """num_gc_layers-hop subgraph of each node as (subset, edge_index, center, edge_weight), relabeled."""
+    subgraphs = []
+    for node_idx in list_node_idx:
+        subset, sub_edge_index, mapping, hop_edge_mask = k_hop_subgraph(
+            node_idx, args.num_gc_layers, data.edge_index, relabel_nodes=True, num_nodes=data.num_nodes
+        )
+        subgraphs.append((subset, sub_edge_index, int(mapping), data.edge_weight[hop_edge_mask]))
+    return subgraphs
+
+
+def split_copies(copies, subgraphs, args):
+    """Split (subgraph index, ...) copies into passes of at most args.grad_batch_size copies
+    and args.grad_batch_nodes nodes."""
+    batch, num_nodes = [], 0
+    for copy in copies:
+        n = len(subgraphs[copy[0]][0])
+        if batch and (len(batch) >= args.grad_batch_size or num_nodes + n > args.grad_batch_nodes):
+            yield batch
+            batch, num_nodes = [], 0
+        batch.append(copy)
+        num_nodes += n
+    if batch:
+        yield batch
+
+
+def collate_copies(data, subgraphs, indices, scales=None):
+    """Disjoint union of the subgraphs at indices, node features of copy k scaled by scales[k].
+    Returns x, edge_index, edge_weight, the position of each copy's center and the node offset of each copy."""
+    xs, edge_indices, edge_weights, centers, offsets = [], [], [], [], []
+    offset = 0
+    for k, i in enumerate(indices):
+        subset, sub_edge_index, center, edge_weight = subgraphs[i]
+        xs.append(data.x[subset] if scales is None else scales[k] * data.x[subset])
+        edge_indices.append(sub_edge_index + offset)
+        edge_weights.append(edge_weight)
+        centers.append(center + offset)
+        offsets.append(offset)
+        offset += len(subset)
+    return torch.cat(xs), torch.cat(edge_indices, dim=1), torch.cat(edge_weights), centers, offsets
+
+
+def batched_input_gradients(model, data, list_node_idx, targets, args, alphas=(1.0,), step_sizes=(1.0,)):
+    """For each node, sum_i step_sizes[i] * d out[node_idx, target] / dx evaluated at alphas[i] * x.
+
+    The prediction of a node only depends on its num_gc_layers-hop subgraph, so every (node, step)
+    pair is evaluated on its own copy of that subgraph; the copies of a pass form a disjoint union
+    and a single backward of the summed outputs yields all their gradients at once.
+
+    Returns:
+        list of (subset, grad) per node: the subgraph nodes and the gradient on their features
+    """
+    subgraphs = get_computation_subgraphs(data, list_node_idx, args)
+    grads = [torch.zeros(len(subset), data.x.size(1), device=data.x.device) for subset, _, _, _ in subgraphs]
+    copies = [(i, alpha, step) for i in range(len(subgraphs)) for alpha, step in zip(alphas, step_sizes)]
+    for batch in split_copies(copies, subgraphs, args):
+        indices = [i for i, _, _ in batch]
+        x, edge_index, edge_weight, centers, offsets = collate_copies(
+            data, subgraphs, indices, scales=[alpha for _, alpha, _ in batch]
+        )
+        x = x.detach().requires_grad_(True)
+        out = model(x, edge_index, edge_weight=edge_weight)
+        copy_targets = torch.stack([targets[i] for i in indices]).to(out.device)
+        copy_steps = torch.tensor([step for _, _, step in batch], dtype=out.dtype, device=out.device)
+        objective = (out[centers, copy_targets] * copy_steps).sum()
+        grad = torch.autograd.grad(objective, x)[0]
+        for i, offset in zip(indices, offsets):
+            grads[i] += grad[offset : offset + len(subgraphs[i][0])]
+    return [(subset, grad) for (subset, _, _, _), grad in zip(subgraphs, grads)]
+
+
+def explain_sa_nodes(model, data, list_node_idx, targets, device, args):
+    """Saliency of all nodes at once; matches explain_sa_node."""
+    edge_masks, node_feat_masks = [], []
+    for subset, grad in batched_input_gradients(model, data, list_node_idx, targets, args):
+        node_feat_mask = np.zeros(tuple(data.x.shape))
+        node_feat_mask[subset.cpu().numpy()] = grad.cpu().numpy()
+        node_attr = node_feat_mask.sum(axis=1)
+        edge_masks.append(node_attr_to_edge(data.edge_index, node_attr))
+        node_feat_masks.append(node_feat_mask)
+    return np.array(edge_masks), node_feat_masks
+
+
+def explain_ig_nodes(model, data, list_node_idx, targets, device, args, n_steps=50):
+    """Integrated gradients of all nodes at once with a zero baseline and captum's default
+    Gauss-Legendre approximation; matches explain_ig_node."""
+    from captum.attr._utils.approximation_methods import approximation_parameters
+    step_sizes_func, alphas_func = approximation_parameters("gausslegendre")
+    alphas, step_sizes = alphas_func(n_steps), step_sizes_func(n_steps)
+    edge_masks, node_feat_masks = [], []
+    for subset, grad in batched_input_gradients(model, data, list_node_idx, targets, args, alphas, step_sizes):
+        node_feat_mask = np.zeros(tuple(data.x.shape))
+        node_feat_mask[subset.cpu().numpy()] = (grad * data.x[subset]).detach().cpu().numpy()
+        node_attr = node_feat_mask.sum(axis=1)
+        edge_masks.append(node_attr_to_edge(data.edge_index, node_attr))
+        node_feat_masks.append(node_feat_mask)
+    return np.array(edge_masks), node_feat_masks
+
+
+def batched_edge_occlusion(model, x, edge_index, edge_weight, node_idx, target, occluded_edges, batch_size=32):
+    """Model output at node_idx for target when each edge in occluded_edges is removed.
+
+    Occlusions are evaluated batch_size at a time on a disjoint union of copies of the graph,
+    copy b having the weight of its occluded edge set to zero.
+    """
+    num_nodes, num_edges = x.size(0), edge_index.size(1)
+    if edge_weight is None:
+        edge_weight = torch.ones(num_edges, device=edge_index.device)
+    probs = []
+    for start in range(0, len(occluded_edges), batch_size):
+        chunk = occluded_edges[start : start + batch_size]
+        b = len(chunk)
+        offsets = torch.arange(b, device=edge_index.device).repeat_interleave(num_edges) * num_nodes
+        batch_edge_index = edge_index.repeat(1, b) + offsets
+        batch_edge_weight = edge_weight.repeat(b, 1)
+        batch_edge_weight[torch.arange(b), chunk] = 0
+        out = model(x.repeat(b, 1), batch_edge_index, edge_weight=batch_edge_weight.reshape(-1))
+        probs.append(out[torch.arange(b, device=out.device) * num_nodes + node_idx, target])
+    return torch.cat(probs)
+
+
 def explain_occlusion_node(model, data, node_idx, target, device, args):
-    depth_limit = args.num_gc_layers + 1
-    data = Data(x=data.x, edge_index=data.edge_index)
     if target is None:
         pred_probs = model(data.x, data.edge_index, data.edge_weight)[node_idx].cpu().detach().numpy()
         pred_prob = pred_probs[target]
     else:
         pred_prob = 1
-    g = to_networkx(data)
-    subgraph_nodes = []
-    for k, v in nx.shortest_path_length(g, target=node_idx).items():
-        if v < depth_limit:
-            subgraph_nodes.append(k)
-    subgraph = g.subgraph(subgraph_nodes)
-    edge_occlusion_mask = np.ones(data.num_edges, dtype=bool)
+    # the prediction of node_idx only depends on its num_gc_layers-hop computation subgraph
+    subset, sub_edge_index, mapping, hop_edge_mask = k_hop_subgraph(
+        node_idx, args.num_gc_layers, data.edge_index, relabel_nodes=True, num_nodes=data.num_nodes
+    )
+    edge_weight = data.edge_weight[hop_edge_mask] if data.edge_weight is not None else None
+    with torch.no_grad():
+        probs = batched_edge_occlusion(
+            model, data.x[subset], sub_edge_index, edge_weight, int(mapping), target,
+            torch.arange(sub_edge_index.size(1), device=sub_edge_index.device),
+        )
     edge_mask = np.zeros(data.num_edges)
-    edge_index_numpy = data.edge_index.cpu().numpy()
-    for i in range(data.num_edges):
-        #if include_edges is not None and not include_edges[i].item():
-            #continue
-        u, v = list(edge_index_numpy[:, i])
-        if (u, v) in subgraph.edges():
-            edge_occlusion_mask[i] = False
-            prob = model(data.x, data.edge_index[:, edge_occlusion_mask], data.edge_weight[edge_occlusion_mask])[node_idx][target].item()
-            edge_mask[i] = pred_prob - prob
-            edge_occlusion_mask[i] = True
+    edge_mask[hop_edge_mask.cpu().numpy()] = pred_prob - probs.cpu().numpy()
     return edge_mask, None
 
 def gpu_to_cpu(data, device):
@@ -183,10 +330,9 @@ def gpu_to_cpu(data, device):
     data.edge_weight = torch.FloatTensor(data.edge_weight.cpu().numpy().copy()).to(device)
     return data
         
-def explain_gnnexplainer_node(model, data, node_idx, target, device, args):
-    data = gpu_to_cpu(data, device)
-    
-    explainer = TargetedGNNExplainer(
+def build_gnnexplainer(model, data, device, args):
+    from explainer.gnnexplainer import TargetedGNNExplainer
+    return TargetedGNNExplainer(
         model,
         num_hops=args.num_gc_layers,
         epochs=1000,
@@ -196,6 +342,12 @@ def explain_gnnexplainer_node(model, data, node_idx, target, device, args):
         allow_node_mask=True,
         device=device
     )
+
+
+def explain_gnnexplainer_node(model, data, node_idx, target, device, args, explainer=None):
+    if explainer is None:
+        data = gpu_to_cpu(data, device)
+        explainer = build_gnnexplainer(model, data, device, args)
     node_feat_mask, edge_mask = explainer.explain_node_with_target(
         node_idx, x=data.x, edge_index=data.edge_index, edge_weight=data.edge_weight, target=target
     )
@@ -205,8 +357,14 @@ def explain_gnnexplainer_node(model, data, node_idx, target, device, args):
     return edge_mask, node_feat_mask
 
 
-def explain_pgmexplainer_node(model, data, node_idx, target, device, args):
-    explainer = Node_Explainer(model, data.edge_index, data.edge_weight, data.x, args.num_gc_layers, device=device, print_result=0)
+def build_pgmexplainer(model, data, device, args):
+    from explainer.pgmexplainer import Node_Explainer
+    return Node_Explainer(model, data.edge_index, data.edge_weight, data.x, args.num_gc_layers, device=device, print_result=0)
+
+
+def explain_pgmexplainer_node(model, data, node_idx, target, device, args, explainer=None):
+    if explainer is None:
+        explainer = build_pgmexplainer(model, data, device, args)
     explanation = explainer.explain(
         node_idx, target, num_samples=100, top_node=None, p_threshold=0.05, pred_threshold=0.1
     )
@@ -217,13 +375,19 @@ def explain_pgmexplainer_node(model, data, node_idx, target, device, args):
     return edge_mask, None
 
 
-def explain_subgraphx_node(model, data, node_idx, target, device, args):
-    subgraphx = SubgraphX(model, args.num_classes, device, num_hops=args.num_gc_layers, explain_graph=False, rollout= 20, min_atoms = 4, expand_atoms=14, high2low=True,  sample_num=50, reward_method="mc_shapley", subgraph_building_method="zero_filling", local_radius=4)
+def build_subgraphx(model, data, device, args):
+    from explainer.subgraphx import SubgraphX
+    return SubgraphX(model, args.num_classes, device, num_hops=args.num_gc_layers, explain_graph=False, rollout= 20, min_atoms = 4, expand_atoms=14, high2low=True,  sample_num=50, reward_method="mc_shapley", subgraph_building_method="zero_filling", local_radius=4)
+
+
+def explain_subgraphx_node(model, data, node_idx, target, device, args, explainer=None):
+    subgraphx = build_subgraphx(model, data, device, args) if explainer is None else explainer
     edge_mask = subgraphx.explain(data.x, data.edge_index, data.edge_weight, max_nodes=args.num_top_edges, label=target, node_idx=node_idx)
     return edge_mask, None
 
 
 def explain_zorro_node(model, data, node_idx, target, device, args):
+    from explainer.zorro import Zorro
     zorro = Zorro(model, device, num_hops = args.num_gc_layers)
     print('explain node', zorro.explain_node(node_idx, data.x, data.edge_index))
     explanation = zorro.explain_node(node_idx, data.x, data.edge_index, tau=0.85, recursion_depth=3)
@@ -242,31 +406,64 @@ def explain_zorro_node(model, data, node_idx, target, device, args):
 
 
 
-def explain_pgexplainer_node(model, data, node_idx, target, device, args):
+def get_pgexplainer_settings(pgexplainer):
+    """Settings a PGExplainer is built and trained with, which its trained weights depend on"""
+    names = [
+        "in_channels", "num_hops", "full_graph_emb", "epochs", "lr", "coff_size", "coff_ent", "t0", "t1",
+        "sample_bias", "batch_size",
+    ]
+    return {name: getattr(pgexplainer, name) for name in names}
+
+
+def load_pgexplainer(model, data, device, args):
+    """Load the trained PGExplainer of the dataset, training and saving it first if needed."""
+    from explainer.pgexplainer import PGExplainer
     if args.dataset.startswith(tuple(["ba", "tree"])):
         coef = 3*3
     else:
         coef = 3
-    pgexplainer = PGExplainer(model, in_channels = args.hidden_dim * coef, device = device, num_hops = args.num_gc_layers)
-    subdir = os.path.join(args.model_save_dir, args.dataset)
-    pgexplainer_saving_path = os.path.join(subdir, f'pgexplainer_{args.dataset}.pth')
+    pgexplainer = PGExplainer(model, in_channels = args.hidden_dim * coef, device = device, num_hops = args.num_gc_layers,
+                              full_graph_emb = args.pgexplainer_full_emb)
+    pgexplainer_saving_path = create_explainer_model_filename(args, "pgexplainer", get_pgexplainer_settings(pgexplainer))
     if os.path.isfile(pgexplainer_saving_path):
         print("Load saved PGExplainer model...")
         state_dict = torch.load(pgexplainer_saving_path)
         pgexplainer.load_state_dict(state_dict)
     else:
-        data = sample_large_graph(data)
-        pgexplainer.train_explanation_network(data)
+        train_data = sample_large_graph(data)
+        pgexplainer.train_explanation_network(train_data)
         print("Save PGExplainer model...")
         torch.save(pgexplainer.state_dict(), pgexplainer_saving_path)
         state_dict = torch.load(pgexplainer_saving_path)
         pgexplainer.load_state_dict(state_dict)
-        
+
+    if pgexplainer.full_graph_emb:
+        emb_saving_path = create_explainer_model_filename(args, "pgexplainer_emb", get_pgexplainer_settings(pgexplainer))
+        if os.path.isfile(emb_saving_path):
+            emb = torch.load(emb_saving_path, map_location=device)
+        else:
+            emb = pgexplainer.compute_full_graph_emb(data.x, data.edge_index)
+            torch.save(emb.cpu(), emb_saving_path)
+        pgexplainer.set_full_graph(data.x, data.edge_index, emb)
+    return pgexplainer
+
+
+def explain_pgexplainer_node(model, data, node_idx, target, device, args, explainer=None):
+    pgexplainer = load_pgexplainer(model, data, device, args) if explainer is None else explainer
     edge_mask = pgexplainer.explain_node(model, node_idx, data.x, data.edge_index)
     edge_mask = edge_mask.cpu().detach().numpy()
     return edge_mask, None
 
+
+def explain_pgexplainer_nodes(model, data, list_node_idx, targets, device, args, explainer=None):
+    """Explain all nodes at once, in disjoint unions of at most args.grad_batch_nodes subgraph nodes:
+    returns a sparse (len(list_node_idx) x num_edges) edge mask tensor."""
+    pgexplainer = load_pgexplainer(model, data, device, args) if explainer is None else explainer
+    edge_masks = pgexplainer.explain_nodes(list_node_idx, data.x, data.edge_index, max_batch_nodes=args.grad_batch_nodes)
+    return edge_masks, None
+
 def explain_gnnlrp_node(model, data, node_idx, target, device, args):
+    from explainer.gnnlrp import GNN_LRP
     gnnlrp = GNN_LRP(model)
     walks, edge_mask = gnnlrp(data.x, data.edge_index, args)
     edge_mask = edge_mask.cpu().detach().numpy()
@@ -277,6 +474,7 @@ def explain_gnnlrp_node(model, data, node_idx, target, device, args):
 
 
 def explain_graphsvx_node(model, data, node_idx, target, device, args):
+    from explainer.graphsvx import GraphSVX
     graphsvx = GraphSVX(data, model, device, args)
     node_feat_mask = graphsvx.explain(node_indexes = [node_idx], multiclass=False)
     coefs = node_feat_mask[0].T[graphsvx.F:]
@@ -289,17 +487,21 @@ def explain_graphsvx_node(model, data, node_idx, target, device, args):
     return None, node_feat_mask
 
 def explain_graphlime_node(model, data, node_idx, target, device, args):
+    from explainer.graphsvx import GraphLIME
     graphlime = GraphLIME(data, model, device, args, hop=2, rho=0.1, cached=True)
     node_feat_mask = graphlime.explain(node_idx, hops=None, num_samples=None, info=False, multiclass=False)
     return None, node_feat_mask
 
 def explain_lime_node(model, data, node_idx, target, device, args):
+    from explainer.graphsvx import LIME
     graphlime = LIME(data, model, device, args)
     node_feat_mask = graphlime.explain(node_idx, hops=None, num_samples=10, info=False, multiclass=False)
     return None, node_feat_mask
 
 def explain_shap_node(model, data, node_idx, target, device, args):
     ":return: shapley values for features that influence node v's pred"
+    from explainer.graphsvx import SHAP
     shap = SHAP(data, model, device, args)
     node_feat_mask = shap.explain()
     return None, node_feat_mask
+
@@ -118,6 +118,37 @@ def calculate_selected_nodes(data, edge_mask, top_k):
     return selected_nodes
 
 
+def reverse_edge_perm(edge_index, num_nodes=None):
+    r"""Computes for every edge :math:`(i, j)` the position of its reverse edge :math:`(j, i)` in
+    :obj:`edge_index`, or :obj:`-1` if the reverse edge does not exist. Self-loops map to themselves.
+
+    Args:
+        edge_index (LongTensor): The edge indices.
+        num_nodes (int, optional): The number of nodes, *i.e.*
+            :obj:`max_val + 1` of :attr:`edge_index`. (default: :obj:`None`)
+    :rtype: :class:`LongTensor`
+    """
+    num_nodes = maybe_num_nodes(edge_index, num_nodes)
+    row, col = edge_index
+    key = row * num_nodes + col
+    rev_key = col * num_nodes + row
+    sorted_key, perm = key.sort()
+    pos = torch.searchsorted(sorted_key, rev_key).clamp(max=max(key.numel() - 1, 0))
+    found = sorted_key[pos] == rev_key
+    return torch.where(found, perm[pos], torch.full_like(pos, -1))
+
+
+def symmetric_edge_values(values, rev_perm):
+    r"""Averages every edge value with the value of its reverse edge, a missing reverse edge counting
+    as zero. Equivalent to :math:`(M + M^T) / 2` gathered at :obj:`edge_index` for the sparse matrix
+    :math:`M` built from :obj:`values`, without materializing it. For duplicated edges, which the
+    explanation network scores alike, every copy gets the value of the deduplicated graph, where
+    :math:`M` would sum the copies.
+    """
+    rev_values = torch.where(rev_perm >= 0, values[rev_perm.clamp(min=0)], torch.zeros_like(values))
+    return (values + rev_values) / 2
+
+
 class PGExplainer(nn.Module):
     r"""
     An implementation of PGExplainer in
@@ -135,6 +166,10 @@ class PGExplainer(nn.Module):
         t1(:obj:`float`): The temperature at the final epoch
         num_hops (:obj:`int`, :obj:`None`): The number of hops to extract neighborhood of target node
         (default: :obj:`None`)
+        batch_size (:obj:`int`): Number of training subgraphs merged into one disjoint-union batch
+          when training the explanation network (default: :obj:`32`)
+        full_graph_emb (:obj:`bool`): Whether to gather edge features from embeddings computed once on the
+          full graph instead of recomputing them on every extracted subgraph (default: :obj:`False`)
 
     .. note: For node classification model, the :attr:`explain_graph` flag is False.
       If :attr:`num_hops` is set to :obj:`None`, it will be automatically calculated by calculating the
@@ -143,7 +178,8 @@ class PGExplainer(nn.Module):
     """
     def __init__(self, model, in_channels: int, device, explain_graph: bool = True, epochs: int = 10,
                  lr: float = 0.005, coff_size: float = 0.05, coff_ent: float = 1.0,
-                 t0: float = 5.0, t1: float = 1.0, sample_bias: float = 0.0, num_hops: Optional[int] = None):
+                 t0: float = 5.0, t1: float = 1.0, sample_bias: float = 0.0, num_hops: Optional[int] = None,
+                 batch_size: int = 32, full_graph_emb: bool = False):
         super(PGExplainer, self).__init__()
         self.model = model
         self.device = device
@@ -159,6 +195,10 @@ class PGExplainer(nn.Module):
         self.t0 = t0
         self.t1 = t1
         self.sample_bias = sample_bias
+        self.batch_size = batch_size
+        self.full_graph_emb = full_graph_emb
+        self.full_emb = None
+        self.full_rev_perm = None
 
         self.num_hops = self.update_num_hops(num_hops)
         self.init_bias = 0.0
@@ -245,6 +285,32 @@ class PGExplainer(nn.Module):
         loss = pred_loss + size_loss + mask_ent_loss
         return loss
 
+    def __batch_loss__(self, probs: Tensor, node_idx: Tensor, ori_preds: Tensor, edge_batch: Tensor):
+        r""" Sum of the per-subgraph losses of :meth:`__loss__` over a disjoint-union batch
+
+        Args:
+            probs (:obj:`torch.Tensor`): Probabilities of the batched graph with shape :obj:`[num_nodes, num_classes]`
+            node_idx (:obj:`torch.Tensor`): Position of each target node in the batched graph
+            ori_preds (:obj:`torch.Tensor`): Original model prediction of each target node
+            edge_batch (:obj:`torch.Tensor`): Subgraph index of each edge in the batched graph
+        """
+        num_graphs = node_idx.size(0)
+        logit = probs[node_idx, ori_preds] + EPS
+        pred_loss = - torch.log(logit)
+
+        # size
+        edge_mask = self.sparse_mask_values
+        size_loss = self.coff_size * edge_mask.new_zeros(num_graphs).index_add_(0, edge_batch, edge_mask)
+
+        # entropy
+        edge_mask = edge_mask * 0.99 + 0.005
+        mask_ent = - edge_mask * torch.log(edge_mask) - (1 - edge_mask) * torch.log(1 - edge_mask)
+        num_edges = torch.bincount(edge_batch, minlength=num_graphs).clamp(min=1)
+        mask_ent_loss = self.coff_ent * mask_ent.new_zeros(num_graphs).index_add_(0, edge_batch, mask_ent) / num_edges
+
+        loss = pred_loss + size_loss + mask_ent_loss
+        return loss.sum()
+
     def get_subgraph(self,
                      node_idx: int,
                      x: Tensor,
@@ -269,16 +335,10 @@ class PGExplainer(nn.Module):
 
         """
         num_nodes, num_edges = x.size(0), edge_index.size(1)
-        graph = to_networkx(data=Data(x=x, edge_index=edge_index), to_undirected=True)
-
         subset, edge_index, _, edge_mask = k_hop_subgraph_with_default_whole_graph(
             edge_index, node_idx, self.num_hops, relabel_nodes=True,
             num_nodes=num_nodes, flow=self.__flow__())
 
-        mapping = {int(v): k for k, v in enumerate(subset)}
-        subgraph = graph.subgraph(subset.tolist())
-        nx.relabel_nodes(subgraph, mapping)
-
         x = x[subset]
         for key, item in kwargs.items():
             if torch.is_tensor(item) and item.size(0) == num_nodes:
@@ -290,6 +350,72 @@ class PGExplainer(nn.Module):
             y = y[subset]
         return x, edge_index, y, subset, edge_mask, kwargs
 
+    def compute_full_graph_emb(self, x: Tensor, edge_index: Tensor) -> Tensor:
+        r""" Node embeddings of the frozen GNN on the full graph """
+        with torch.no_grad():
+            self.model.eval()
+            return self.model.get_emb(x, edge_index).detach()
+
+    def set_full_graph(self, x: Tensor, edge_index: Tensor, emb: Optional[Tensor] = None):
+        r""" Store the full-graph embeddings and reverse-edge permutation used when
+        :attr:`full_graph_emb` is set. The embeddings are computed if not given. """
+        if emb is None:
+            emb = self.compute_full_graph_emb(x, edge_index)
+        self.full_emb = emb.to(self.device)
+        self.full_rev_perm = reverse_edge_perm(edge_index, x.size(0))
+
+    def iter_subgraphs(self, data, node_idx_list: List[int]):
+        r""" Extract the k-hop subgraph and embeddings of each node in turn.
+
+        Args:
+            data (:class:`torch_geometric.data.Data`): The graph holding :obj:`x` and :obj:`edge_index`
+            node_idx_list (:obj:`List[int]`): The nodes whose subgraphs are extracted
+
+        :rtype: Generator of ((:class:`torch.Tensor`, :class:`torch.Tensor`, :class:`torch.Tensor`, :obj:`int`),
+          :class:`torch.Tensor`) holding the subgraph features, edge index, embeddings and the position of
+          the node in the subgraph, and the indices in :obj:`data.edge_index` of the edges of the subgraph
+        """
+        with torch.no_grad():
+            for node_idx in tqdm.tqdm(node_idx_list):
+                x, edge_index, _, subset, edge_mask, _ = self.get_subgraph(node_idx=node_idx, x=data.x, edge_index=data.edge_index)
+                if self.full_graph_emb:
+                    emb = self.full_emb[subset]
+                else:
+                    emb = self.model.get_emb(x, edge_index)
+                new_node_idx = int(torch.where(subset == node_idx)[0])
+                yield (x, edge_index, emb, new_node_idx), torch.where(edge_mask)[0]
+
+    def prepare_subgraphs(self, data, node_idx_list: List[int]):
+        r""" Extract the k-hop subgraph and embeddings of every node once (see :meth:`iter_subgraphs`).
+        The GNN is frozen while the explanation network is trained, so these do not change across epochs.
+
+        :rtype: List of (:class:`torch.Tensor`, :class:`torch.Tensor`, :class:`torch.Tensor`, :obj:`int`)
+          holding the subgraph features, edge index, embeddings and the position of the node in the subgraph
+        """
+        return [subgraph for subgraph, _ in self.iter_subgraphs(data, node_idx_list)]
+
+    @staticmethod
+    def collate_subgraphs(subgraphs: List[Tuple[Tensor, Tensor, Tensor, int]]) \
+            -> Tuple[Tensor, Tensor, Tensor, Tensor, Tensor]:
+        r""" Merge subgraphs from :meth:`prepare_subgraphs` into one disjoint-union graph
+
+        :rtype: (:class:`torch.Tensor`, :class:`torch.Tensor`, :class:`torch.Tensor`, :class:`torch.Tensor`,
+          :class:`torch.Tensor`) holding the node features, edge index, embeddings, the position of each
+          target node and the subgraph index of each edge
+        """
+        xs, edge_indices, embs, node_idx, edge_batch = [], [], [], [], []
+        offset = 0
+        for graph_idx, (x, edge_index, emb, new_node_idx) in enumerate(subgraphs):
+            xs.append(x)
+            edge_indices.append(edge_index + offset)
+            embs.append(emb)
+            node_idx.append(new_node_idx + offset)
+            edge_batch.append(torch.full((edge_index.size(1),), graph_idx, dtype=torch.long, device=edge_index.device))
+            offset += x.size(0)
+        device = xs[0].device
+        return torch.cat(xs, dim=0), torch.cat(edge_indices, dim=1), torch.cat(embs, dim=0), \
+            torch.tensor(node_idx, dtype=torch.long, device=device), torch.cat(edge_batch)
+
     def concrete_sample(self, log_alpha: Tensor, beta: float = 1.0, training: bool = True):
         r""" Sample from the instantiation of concrete distribution when training """
         if training:
@@ -304,6 +430,8 @@ class PGExplainer(nn.Module):
         return gate_inputs
 
     def explain_node(self, model, node_idx, x, edge_index, **kwargs):
+        if self.full_graph_emb:
+            return self.explain_node_full_graph(node_idx, x, edge_index)
         select_edge_index = torch.arange(0, edge_index.shape[1])
         subgraph_x, subgraph_edge_index, _, subset, subgraph_edge_mask, kwargs = \
         self.get_subgraph(node_idx, x, edge_index, select_edge_index=select_edge_index)
@@ -326,14 +454,101 @@ class PGExplainer(nn.Module):
                                                         tmp=1.0,
                                                         training=False,
                                                         node_idx=self.new_node_idx)
-        subgraph_edge_mask = subgraph_edge_mask.cpu().detach().numpy()
-        subindices = np.where(subgraph_edge_mask>0)[0]
         edge_mask_full = torch.zeros(len(subgraph_edge_mask))
-        for i in range(len(subindices)):
-            edge_mask_full[subindices[i]] = edge_mask[i]
+        edge_mask_full[subgraph_edge_mask.cpu()] = edge_mask.cpu()
         return edge_mask_full
-        
 
+    def explain_nodes(self, node_idx_list: List[int], x: Tensor, edge_index: Tensor,
+                      max_batch_nodes: Optional[int] = None) -> Tensor:
+        r""" Edge masks of many target nodes, scored with one call of the explanation network per
+        disjoint union of their k-hop subgraphs.
+
+        Args:
+            node_idx_list (:obj:`List[int]`): The nodes to explain
+            x (:obj:`torch.Tensor`): Node feature matrix with shape
+              :obj:`[num_nodes, dim_node_feature]`
+            edge_index (:obj:`torch.Tensor`): Graph connectivity in COO format
+              with shape :obj:`[2, num_edges]`
+            max_batch_nodes (:obj:`int`, :obj:`None`): Maximum number of nodes of a disjoint union, a
+              larger subgraph is scored alone (default: :obj:`None`, all subgraphs in one union)
+
+        Returns:
+            edge_masks (:obj:`torch.Tensor`): Sparse COO tensor with shape :obj:`[len(node_idx_list), num_edges]`,
+              row :obj:`i` holding the edge mask of :obj:`node_idx_list[i]`
+        """
+        if self.full_graph_emb and (self.full_emb is None or self.full_emb.size(0) != x.size(0)):
+            self.set_full_graph(x, edge_index)
+        all_indices, all_values = [], []
+
+        def score(subgraphs, edge_ids, row_offset):
+            _, batch_edge_index, embed, node_idx, edge_batch = self.collate_subgraphs(subgraphs)
+            with torch.no_grad():
+                values = self.edge_values(embed, batch_edge_index, node_idx, edge_batch=edge_batch)
+                rev_perm = reverse_edge_perm(batch_edge_index, embed.size(0))
+                values = symmetric_edge_values(values, rev_perm.to(values.device))
+            all_indices.append(torch.stack([edge_batch.cpu() + row_offset, torch.cat(edge_ids).cpu()]))
+            all_values.append(values.cpu())
+
+        subgraphs, edge_ids, row_offset, batch_nodes = [], [], 0, 0
+        for subgraph, subgraph_edge_ids in self.iter_subgraphs(Data(x=x, edge_index=edge_index), node_idx_list):
+            num_nodes = subgraph[0].size(0)
+            if subgraphs and max_batch_nodes is not None and batch_nodes + num_nodes > max_batch_nodes:
+                score(subgraphs, edge_ids, row_offset)
+                row_offset += len(subgraphs)
+                subgraphs, edge_ids, batch_nodes = [], [], 0
+            subgraphs.append(subgraph)
+            edge_ids.append(subgraph_edge_ids)
+            batch_nodes += num_nodes
+        if subgraphs:
+            score(subgraphs, edge_ids, row_offset)
+        indices = torch.cat(all_indices, dim=1) if all_indices else torch.zeros((2, 0), dtype=torch.long)
+        values = torch.cat(all_values) if all_values else torch.zeros(0)
+        return torch.sparse_coo_tensor(indices, values, (len(node_idx_list), edge_index.size(1))).coalesce()
+
+
+    def edge_values(self, embed: Tensor, edge_index: Tensor, node_idx, edge_batch: Optional[Tensor] = None,
+                    tmp: float = 1.0, training: bool = False) -> Tensor:
+        r""" Score every edge of :obj:`edge_index` from the features :obj:`[emb[src], emb[dst], emb[target]]`
+        with the explanation network, before symmetrization.
+
+        Args:
+            embed (:obj:`torch.Tensor`): Node embedding matrix with shape :obj:`[num_nodes, dim_embedding]`
+            edge_index (:obj:`torch.Tensor`): Edges to score with shape :obj:`[2, num_edges]`
+            node_idx (:obj:`int`, :obj:`torch.Tensor`): The target node, or one target node per
+              subgraph when :obj:`edge_batch` is given
+            edge_batch (:obj:`torch.Tensor`, :obj:`None`): Index in :obj:`node_idx` of the target node of each edge
+            tmp (:obj`float`): The temperature parameter fed to the sample procedure
+            training (:obj:`bool`): Whether in training procedure or not
+        """
+        col, row = edge_index
+        f1 = embed[col]
+        f2 = embed[row]
+        if edge_batch is not None:
+            self_embed = embed[node_idx][edge_batch]
+        else:
+            self_embed = embed[node_idx].repeat(f1.shape[0], 1)
+        f12self = torch.cat([f1, f2, self_embed], dim=-1)
+
+        # using the node embedding to calculate the edge weight
+        h = f12self.to(self.device)
+        for elayer in self.elayers:
+            h = elayer(h)
+        values = h.reshape(-1)
+        return self.concrete_sample(values, beta=tmp, training=training)
+
+    def explain_node_full_graph(self, node_idx, x, edge_index):
+        r""" Edge mask of :obj:`node_idx` over all edges, scoring the edges of its k-hop subgraph
+        from the cached full-graph embeddings. Edges outside the subgraph get zero. """
+        if self.full_emb is None or self.full_emb.size(0) != x.size(0):
+            self.set_full_graph(x, edge_index)
+        _, _, _, hop_edge_mask = k_hop_subgraph_with_default_whole_graph(
+            edge_index, node_idx, self.num_hops, num_nodes=x.size(0), flow=self.__flow__())
+        with torch.no_grad():
+            values = self.edge_values(self.full_emb, edge_index[:, hop_edge_mask], node_idx)
+            full_values = values.new_zeros(edge_index.size(1))
+            full_values[hop_edge_mask.to(values.device)] = values
+            edge_mask = symmetric_edge_values(full_values, self.full_rev_perm.to(values.device))
+        return edge_mask.cpu()
 
     def explain(self,
                 x: Tensor,
@@ -353,33 +568,26 @@ class PGExplainer(nn.Module):
             embed (:obj:`torch.Tensor`): Node embedding matrix with shape :obj:`[num_nodes, dim_embedding]`
             tmp (:obj`float`): The temperature parameter fed to the sample procedure
             training (:obj:`bool`): Whether in training procedure or not
+            edge_batch (:obj:`torch.Tensor`, :obj:`None`): Subgraph index of each edge when :obj:`x`
+              is a disjoint union of subgraphs; :obj:`node_idx` then holds one target node per subgraph
+              (default: :obj:`None`)
+            rev_perm (:obj:`torch.Tensor`, :obj:`None`): Precomputed :func:`reverse_edge_perm` of
+              :obj:`edge_index`, computed on the fly if not given (default: :obj:`None`)
 
         Returns:
             probs (:obj:`torch.Tensor`): The classification probability for graph with edge mask
             edge_mask (:obj:`torch.Tensor`): The probability mask for graph edges
         """
         node_idx = kwargs.get('node_idx')
+        edge_batch = kwargs.get('edge_batch')
         nodesize = embed.shape[0]
-        col, row = edge_index
-        f1 = embed[col]
-        f2 = embed[row]
-        self_embed = embed[node_idx].repeat(f1.shape[0], 1)
-        f12self = torch.cat([f1, f2, self_embed], dim=-1)
-
-        # using the node embedding to calculate the edge weight
-        h = f12self.to(self.device)
-        for elayer in self.elayers:
-            h = elayer(h)
-        values = h.reshape(-1)
-        values = self.concrete_sample(values, beta=tmp, training=training)
+        values = self.edge_values(embed, edge_index, node_idx, edge_batch=edge_batch, tmp=tmp, training=training)
         self.sparse_mask_values = values
-        mask_sparse = torch.sparse_coo_tensor(
-            edge_index, values, (nodesize, nodesize)
-        )
-        mask_sigmoid = mask_sparse.to_dense()
         # set the symmetric edge weights
-        sym_mask = (mask_sigmoid + mask_sigmoid.transpose(0, 1)) / 2
-        edge_mask = sym_mask[edge_index[0], edge_index[1]]
+        rev_perm = kwargs.get('rev_perm')
+        if rev_perm is None:
+            rev_perm = reverse_edge_perm(edge_index, nodesize)
+        edge_mask = symmetric_edge_values(values, rev_perm.to(values.device))
 
         # inverse the weights before sigmoid in MessagePassing Module
         self.__clear_masks__()
@@ -400,10 +608,19 @@ class PGExplainer(nn.Module):
             data.to(self.device)
             self.model.eval()
             explain_node_index_list = torch.where(data.train_mask)[0].tolist()
-            pred_dict = {}
             logits = self.model(data.x, data.edge_index)
-            for node_idx in tqdm.tqdm(explain_node_index_list):
-                pred_dict[node_idx] = logits[node_idx].argmax(-1).item()
+            pred_labels = logits.argmax(-1)
+
+        # the GNN is frozen: extract subgraphs and embeddings once and group them into batches
+        if self.full_graph_emb:
+            self.set_full_graph(data.x, data.edge_index)
+        subgraphs = self.prepare_subgraphs(data, explain_node_index_list)
+        batches = []
+        for start in range(0, len(subgraphs), self.batch_size):
+            batch_node_index = explain_node_index_list[start:start + self.batch_size]
+            batch = self.collate_subgraphs(subgraphs[start:start + self.batch_size])
+            rev_perm = reverse_edge_perm(batch[1], batch[0].size(0))
+            batches.append((batch, rev_perm, pred_labels[batch_node_index]))
 
         # train the mask generator
         duration = 0.0
@@ -413,14 +630,10 @@ class PGExplainer(nn.Module):
             tmp = float(self.t0 * np.power(self.t1 / self.t0, epoch / self.epochs))
             self.elayers.train()
             tic = time.perf_counter()
-            for iter_idx, node_idx in tqdm.tqdm(enumerate(explain_node_index_list)):
-                with torch.no_grad():
-                    x, edge_index, y, subset, _, _ = \
-                        self.get_subgraph(node_idx=node_idx, x=data.x, edge_index=data.edge_index, y=data.y)
-                    emb = self.model.get_emb(x, edge_index)
-                    new_node_index = int(torch.where(subset == node_idx)[0])
-                pred, edge_mask = self.explain(x, edge_index, emb, tmp, training=True, node_idx=new_node_index)
-                loss_tmp = self.__loss__(pred[new_node_index], pred_dict[node_idx])
+            for (x, edge_index, emb, node_idx, edge_batch), rev_perm, ori_preds in batches:
+                pred, edge_mask = self.explain(x, edge_index, emb, tmp, training=True,
+                                               node_idx=node_idx, edge_batch=edge_batch, rev_perm=rev_perm)
+                loss_tmp = self.__batch_loss__(pred, node_idx, ori_preds, edge_batch)
                 loss_tmp.backward()
                 loss += loss_tmp.item()
 
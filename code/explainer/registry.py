@@ -0,0 +1,126 @@
+""" registry.py
+    Registry of the node explainers and of what each of them supports.
+
+    Every explainer is registered under its --explainer_name with its per-node function, its batch
+    function if it can explain all testing nodes at once, the state it prepares once per run, and the
+    capabilities the scheduler of genmask.py picks batching, parallelism and caching from. A new
+    explainer is plugged in with register_explainer, without touching the scheduler.
+"""
+from explainer.node_explainer import *
+
+EDGE, NODE_FEAT = "edge", "node_feat"
+
+
+class ExplainerSpec:
+    """Functions and capabilities of a registered explainer.
+
+    Args:
+        name: explainer name
+        explain_node: explain_function(model, data, node_idx, target, device, args, **state) -> (edge_mask, node_feat_mask)
+        explain_nodes: explain_function(model, data, list_node_idx, targets, device, args, **state) ->
+            (edge_masks, node_feat_masks) for all nodes at once, or None if the explainer is not batchable
+        prepare: prepare(session) -> state, the keyword arguments prepared once per run, or None
+        deterministic: whether the masks only depend on the data, the model and the arguments. Otherwise,
+            worker processes seed their random generators for each node, so that forked workers do not
+            draw the same random numbers. Nodes explained in the main process use its random state as is.
+        cacheable: whether the masks are worth saving to and resuming from the mask cache
+        cpu_heavy: whether explaining a node is a long CPU computation (search, sampling, optimization
+            on the CPU), worth spreading over worker processes
+        mask_types: types of the masks it returns, among EDGE and NODE_FEAT
+    """
+
+    def __init__(
+        self, name, explain_node, explain_nodes=None, prepare=None, deterministic=True, cacheable=True,
+        cpu_heavy=False, mask_types=(EDGE,),
+    ):
+        self.name = name
+        self.explain_node = explain_node
+        self.explain_nodes = explain_nodes
+        self.prepare = prepare
+        self.deterministic = deterministic
+        self.cacheable = cacheable
+        self.cpu_heavy = cpu_heavy
+        self.mask_types = tuple(mask_types)
+
+    @property
+    def batchable(self):
+        return self.explain_nodes is not None
+
+    def __repr__(self):
+        capabilities = [c for c in ["batchable", "deterministic", "cacheable", "cpu_heavy"] if getattr(self, c)]
+        return f"ExplainerSpec({self.name}: {', '.join(capabilities)}; masks: {', '.join(self.mask_types)})"
+
+
+EXPLAINERS = {}
+
+
+def register_explainer(name, explain_node, **capabilities):
+    """Register an explainer under name (see ExplainerSpec for the capabilities) and return its spec."""
+    EXPLAINERS[name] = ExplainerSpec(name, explain_node, **capabilities)
+    return EXPLAINERS[name]
+
+
+def get_explainer(name):
+    if name not in EXPLAINERS:
+        raise ValueError(f"Unknown explainer {name}")
+    return EXPLAINERS[name]
+
+
+#### State prepared once per run ####
+
+
+def prepare_csr_state(session):
+    return {"csr": session.csr}
+
+
+def prepare_gnnexplainer_state(session):
+    session.data = gpu_to_cpu(session.data, session.device)
+    return {"explainer": build_gnnexplainer(session.model, session.data, session.device, session.args)}
+
+
+def prepare_pgexplainer_state(session):
+    return {"explainer": load_pgexplainer(session.model, session.data, session.device, session.args)}
+
+
+def prepare_pgmexplainer_state(session):
+    return {"explainer": build_pgmexplainer(session.model, session.data, session.device, session.args)}
+
+
+def prepare_subgraphx_state(session):
+    return {"explainer": build_subgraphx(session.model, session.data, session.device, session.args)}
+
+
+#### Explainers ####
+
+# basic methods
+register_explainer("random", explain_random_node, deterministic=False, mask_types=(EDGE, NODE_FEAT))
+register_explainer("distance", explain_distance_node, explain_nodes=explain_distance_nodes, prepare=prepare_csr_state)
+register_explainer("pagerank", explain_pagerank_node, explain_nodes=explain_pagerank_nodes, prepare=prepare_csr_state)
+
+# gradient-based methods: one batched pass over all nodes, cheaper to recompute than to store as dense masks
+register_explainer("gradcam", explain_gradcam_node, explain_nodes=explain_gradcam_nodes)
+register_explainer("sa", explain_sa_node, explain_nodes=explain_sa_nodes, cacheable=False, mask_types=(EDGE, NODE_FEAT))
+register_explainer("ig", explain_ig_node, explain_nodes=explain_ig_nodes, cacheable=False, mask_types=(EDGE, NODE_FEAT))
+register_explainer("occlusion", explain_occlusion_node)
+register_explainer("gnnlrp", explain_gnnlrp_node)
+
+# perturbation, search and surrogate methods
+register_explainer("basic_gnnexplainer", explain_basic_gnnexplainer_node, deterministic=False)
+register_explainer(
+    "gnnexplainer", explain_gnnexplainer_node, prepare=prepare_gnnexplainer_state, deterministic=False, cpu_heavy=True,
+    mask_types=(EDGE, NODE_FEAT),
+)
+register_explainer(
+    "pgexplainer", explain_pgexplainer_node, explain_nodes=explain_pgexplainer_nodes, prepare=prepare_pgexplainer_state,
+)
+register_explainer(
+    "pgmexplainer", explain_pgmexplainer_node, prepare=prepare_pgmexplainer_state, deterministic=False, cpu_heavy=True,
+)
+register_explainer(
+    "subgraphx", explain_subgraphx_node, prepare=prepare_subgraphx_state, deterministic=False, cpu_heavy=True,
+)
+register_explainer("zorro", explain_zorro_node, deterministic=False, cpu_heavy=True, mask_types=(EDGE, NODE_FEAT))
+register_explainer("graphsvx", explain_graphsvx_node, deterministic=False, cpu_heavy=True, mask_types=(NODE_FEAT,))
+register_explainer("graphlime", explain_graphlime_node, cpu_heavy=True, mask_types=(NODE_FEAT,))
+register_explainer("lime", explain_lime_node, deterministic=False, cpu_heavy=True, mask_types=(NODE_FEAT,))
+register_explainer("shap", explain_shap_node, deterministic=False, cpu_heavy=True, mask_types=(NODE_FEAT,))
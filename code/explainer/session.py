@@ -0,0 +1,69 @@
+""" session.py
+    Explainer state prepared once per run and reused for every explained node.
+"""
+
+import torch
+
+from explainer.registry import get_explainer
+from utils.graph_utils import get_csr_adjacency
+
+
+class ExplainerSession:
+    """Holds the model, the data and everything an explainer needs to prepare once per run
+    (trained explainer models, CSR adjacency, original predictions),
+    so that explaining each testing node only pays for the explanation itself.
+
+    Args:
+        model: trained GNN model
+        data: initial data object
+        device: torch device
+        args: arguments from command line
+    """
+
+    def __init__(self, model, data, device, args):
+        self.model = model
+        self.data = data
+        self.device = device
+        self.args = args
+        self.spec = get_explainer(args.explainer_name)
+        self._csr = None
+        self._ori_pred = None
+        self._state = None
+
+    @property
+    def csr(self):
+        """binary scipy CSR adjacency matrix of the data, row = source node"""
+        if self._csr is None:
+            self._csr = get_csr_adjacency(self.data.edge_index, self.data.num_nodes)
+        return self._csr
+
+    @property
+    def ori_pred(self):
+        """model output on the initial graph"""
+        if self._ori_pred is None:
+            with torch.no_grad():
+                self._ori_pred = self.model(self.data.x, self.data.edge_index, edge_weight=self.data.edge_weight).detach()
+        return self._ori_pred
+
+    @property
+    def state(self):
+        """keyword arguments prepared for the explainer's per-node function"""
+        if self._state is None:
+            self._state = self.spec.prepare(self) if self.spec.prepare is not None else {}
+        return self._state
+
+    def prepare(self):
+        """Prepare the explainer's state now rather than at the first explained node."""
+        return self.state
+
+    def explain(self, node_idx, target):
+        """Explain node_idx for target class. Returns (edge_mask, node_feat_mask)."""
+        return self.spec.explain_node(
+            self.model, self.data, node_idx, target, self.device, self.args, **self.state
+        )
+
+    def explain_all(self, list_node_idx, targets):
+        """Explain the nodes of list_node_idx in one call of the batch function of a batchable explainer."""
+        return self.spec.explain_nodes(
+            self.model, self.data, list_node_idx, targets, self.device, self.args, **self.state
+        )
@@ -0,0 +1,46 @@
+""" gen_datasets.py
+    Generate the synthetic datasets of many seeds and sizes in parallel worker processes.
+
+    Each (seed, scale) dataset is generated by its own process from its own random generator, and saved
+    to the data directory as memory-mappable shards keyed by its generation arguments (see
+    dataset.data_store), where main.py and sweep.py load it from.
+
+    python3 code/gen_datasets.py --dataset ba_house --syn_backend array --gen_seeds 0,1,2 --gen_scales 1,10 --num_workers 4
+"""
+import copy
+from multiprocessing import Pool
+import random
+
+import numpy as np
+
+from dataset.gen_syn import load_syndata
+from utils.io_utils import check_dir, create_data_filename
+from utils.parser_utils import arg_parse, get_graph_size_args
+
+
+def gen_dataset(args):
+    """Generate and save the dataset of args if it is not in the data directory yet."""
+    # the networkx generators draw from the global generators, which are private to the worker process
+    np.random.seed(args.seed)
+    random.seed(args.seed)
+    args = get_graph_size_args(args)
+    data = load_syndata(args)
+    return args.seed, args.syn_scale, data.num_nodes, data.num_edges, create_data_filename(args)
+
+
+def gen_datasets(args):
+    check_dir(args.data_save_dir)
+    jobs = []
+    for seed in args.gen_seeds:
+        for scale in args.gen_scales:
+            job_args = copy.deepcopy(args)
+            job_args.seed, job_args.syn_scale = seed, scale
+            jobs.append(job_args)
+    with Pool(min(args.num_workers, len(jobs))) as pool:
+        for seed, scale, num_nodes, num_edges, filename in pool.imap_unordered(gen_dataset, jobs):
+            print(f"_dataset: seed {seed}, scale {scale}, {num_nodes} nodes, {num_edges} edges -> {filename}")
+
+
+if __name__ == "__main__":
+    args = arg_parse()
+    gen_datasets(args)
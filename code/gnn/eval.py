@@ -1,10 +1,7 @@
 import numpy as np
 import torch
-from dataset.mutag_utils import prepare_data
-from sklearn import metrics
 from torch.autograd import Variable
 from torch_geometric.loader import ClusterData, ClusterLoader, NeighborLoader
-from tqdm import tqdm
 from utils.gen_utils import from_adj_to_edge_index, get_labels
 from utils.graph_utils import get_edge_index_batch
 
@@ -16,6 +13,8 @@ def gnn_accuracy(output, labels):
     return correct / len(labels)
 
 def gnn_scores_nc(model, data, args, device):
+    from sklearn import metrics
+
     model.eval()
 
     if data.num_nodes > args.sample_size:
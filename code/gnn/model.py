@@ -1,11 +1,8 @@
-from importlib_metadata import requires
-from numpy import require
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from torch.nn import init
 from torch_geometric.nn import GCNConv
-from zmq import device
 from utils.gen_utils import from_adj_to_edge_index, from_edge_index_to_adj, init_weights
 from torch.autograd import Variable
 
@@ -117,7 +114,7 @@ class GraphConv(nn.Module):
         add_self=False,
         normalize_embedding=False,
         dropout=0.0,
-        device=device,
+        device=None,
         bias=True,
         att=False,
     ):
@@ -185,7 +182,7 @@ class GcnEncoderGraph(nn.Module):
         concat=True,
         bn=True,
         dropout=0.0,
-        device=device,
+        device=None,
         add_self=False,
         args=None,
     ):
@@ -236,7 +233,7 @@ class GcnEncoderGraph(nn.Module):
                     init.constant_(m.bias.data, 0.0)
 
     def build_conv_layers(
-        self, input_dim, hidden_dim, embedding_dim, num_layers, add_self, normalize=False, dropout=0.0, device=device
+        self, input_dim, hidden_dim, embedding_dim, num_layers, add_self, normalize=False, dropout=0.0, device=None
     ):
         conv_first = GraphConv(
             input_dim=input_dim,
@@ -244,7 +241,7 @@ class GcnEncoderGraph(nn.Module):
             add_self=add_self,
             normalize_embedding=normalize,
             bias=self.bias,
-            device=device,
+            device=None,
             att=self.att,
         )
         conv_block = nn.ModuleList(
@@ -256,7 +253,7 @@ class GcnEncoderGraph(nn.Module):
                     normalize_embedding=normalize,
                     dropout=dropout,
                     bias=self.bias,
-                    device=device,
+                    device=None,
                     att=self.att,
                 )
                 for i in range(num_layers - 2)
@@ -268,7 +265,7 @@ class GcnEncoderGraph(nn.Module):
             add_self=add_self,
             normalize_embedding=normalize,
             bias=self.bias,
-            device=device,
+            device=None,
             att=self.att,
         )
         return conv_first, conv_block, conv_last
@@ -490,7 +487,7 @@ class GcnEncoderNode(GcnEncoderGraph):
         bn=True,
         dropout=0.0,
         args=None,
-        device=device,
+        device=None,
     ):
         super(GcnEncoderNode, self).__init__(
             input_dim,
@@ -503,7 +500,7 @@ class GcnEncoderNode(GcnEncoderGraph):
             bn,
             dropout,
             args=args,
-            device=device,
+            device=None,
         )
         # if hasattr(args, "loss_weight"):
         # print("Loss weight: ", args.loss_weight)
@@ -1,8 +1,6 @@
 import json
 import time
 
-import matplotlib
-import matplotlib.pyplot as plt
 import torch
 import torch.optim as optim
 import torch.nn.functional as F
@@ -139,6 +137,9 @@ def train_syn_nc(model, data, device, args):
             loss.backward()
             optimizer.step()
 
+    import matplotlib
+    import matplotlib.pyplot as plt
+
     matplotlib.style.use("seaborn")
     plt.switch_backend("agg")
     plt.figure()
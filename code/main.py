@@ -1,27 +1,27 @@
-from hashlib import new
 import json
 import os
 import random
 import shutil
-import pickle
 
 import numpy as np
 import torch
-from torch_geometric.datasets import Planetoid, WikipediaNetwork, WebKB
 import torch.nn.functional as F
 
-from dataset.gen_syn import build_syndata
+from dataset.gen_syn import load_syndata
 from dataset.gen_real import load_data_real
 from dataset.data_utils import get_split, split_data
-from evaluate.accuracy import eval_accuracy
-from evaluate.fidelity import eval_fidelity, eval_related_pred_nc
+from evaluate.accuracy import eval_accuracy, eval_ranking
+from evaluate.fidelity import eval_fidelity, eval_fidelity_curve, eval_related_pred_curve, eval_related_pred_nc
 from evaluate.mask_utils import clean_masks, get_mask_info, get_ratio_connected_components, get_size, get_sparsity, normalize_all_masks, transform_mask
-from explainer.genmask import compute_edge_masks_nc
+from explainer.genmask import compute_edge_masks_nc, get_mask_cache
 from gnn.eval import gnn_scores_nc, gnn_accuracy
 from gnn.model import GCN, GcnEncoderNode
 from gnn.train import train_real_nc, train_syn_nc
+from utils.cache_utils import data_digest, model_digest
 from utils.gen_utils import get_test_nodes
-from utils.io_utils import check_dir, create_data_filename, create_mask_filename, create_model_filename, load_ckpt, save_checkpoint
+from utils.io_utils import check_dir, create_model_filename, create_results_filename, load_ckpt, save_checkpoint
+from utils.mask_store import SparseMasks
+from utils.results_store import ResultsWriter
 from utils.parser_utils import arg_parse, get_data_args, get_graph_size_args
 from utils.plot_utils import plot_feat_importance, plot_masks_density
 
@@ -33,18 +33,16 @@ PLANETOIDS = {"cora": "Cora", "citeseer": "CiteSeer", "pubmed": "PubMed"}
 WEBKB = {"texas": "Texas", "cornell": "Cornell", "wisconsin": "Wisconsin"}
 
 
-def main_real(args):
-
-    np.random.seed(args.seed)
-    if torch.cuda.is_available():
-        torch.cuda.manual_seed(args.seed)
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
+def load_real(args, device):
+    """Load the real dataset and its trained GCN model, downloading the data and training the model if needed."""
     check_dir(args.data_save_dir)
     data_dir = os.path.join(args.data_save_dir, args.dataset)
     check_dir(data_dir)
     data_filename = f"{data_dir}/processed/data.pt"
     if not os.path.isfile(data_filename):
+        import torch_geometric.datasets
+        from torch_geometric.datasets import Planetoid, WikipediaNetwork, WebKB
+
         if REAL_DATA[args.dataset] == "Planetoid":
             Planetoid(args.data_save_dir, name=PLANETOIDS[args.dataset])
             origin_dir = os.path.join(args.data_save_dir, PLANETOIDS[args.dataset])
@@ -66,7 +64,7 @@ def main_real(args):
                     shutil.move(source, destination)
             shutil.rmtree(origin_dir, ignore_errors=True)
         else:
-            eval(REAL_DATA[args.dataset])(data_dir)
+            getattr(torch_geometric.datasets, REAL_DATA[args.dataset])(data_dir)
 
     data = load_data_real(data_filename)
     if args.dataset == "facebook":
@@ -74,6 +72,7 @@ def main_real(args):
     if data.train_mask.dim() > 1:
         data = get_split(data, args)
     data = data.to(device)
+    args.data_digest = data_digest(data)
 
     args.num_classes = data.y.max().item() + 1
 
@@ -103,28 +102,42 @@ def main_real(args):
     ckpt = load_ckpt(model_filename, device)
     model.load_state_dict(ckpt["model_state"])
     model.eval()
+    args.model_digest = model_digest(model)
     print("__gnn_train_scores: " + json.dumps(ckpt["results_train"]))
     print("__gnn_test_scores: " + json.dumps(ckpt["results_test"]))
+    return data, model
+
+
+def eval_curve(model, data, edge_masks, node_feat_masks, list_test_nodes, device, args, results):
+    """Fidelity of the masks at every sparsity level of args.curve_sparsities, in one pass over the testing nodes."""
+    sparsities = args.curve_sparsities
+    related_preds_curve = eval_related_pred_curve(model, data, edge_masks, node_feat_masks, list_test_nodes, device, args, sparsities)
+    curve, auc = eval_fidelity_curve(related_preds_curve, sparsities, args)
+    for sparsity, fidelity in zip(sparsities, curve):
+        results.add("fidelity", fidelity, args, "sparsity", sparsity)
+    results.add("fidelity_curve_auc", auc, args, "sparsity")
+    results.flush()
+    print("__fidelity_curve:" + json.dumps({"sparsity": sparsities, **{key: [fidelity[key] for fidelity in curve] for key in curve[0]}}))
+    print("__fidelity_curve_auc:" + json.dumps(auc))
+
+
+def main_real(args):
+
+    np.random.seed(args.seed)
+    if torch.cuda.is_available():
+        torch.cuda.manual_seed(args.seed)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+    data, model = load_real(args, device)
 
     ### Explainer ###
     list_test_nodes = get_test_nodes(data, model, args)
 
-    if eval(args.save_mask):
-        mask_filename = create_mask_filename(args)
-        if (os.path.isfile(mask_filename)) & (args.explainer_name not in ["sa", "ig"]):
-            with open(mask_filename, 'rb') as f:
-                w_list = pickle.load(f)
-            edge_masks, node_feat_masks, Time = tuple(w_list)
-        else:
-            edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args)
-            if args.explainer_name not in ["sa", "ig"]:
-                with open(mask_filename, 'wb') as f:
-                    pickle.dump([edge_masks, node_feat_masks, Time], f)
-    else:
-        edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args)
-        
+    mask_cache = get_mask_cache(data, args)
+    edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args, cache=mask_cache)
 
+
+    results = ResultsWriter(create_results_filename(args))
     args.E = False if edge_masks[0] is None else True
     args.NF = False if node_feat_masks[0] is None else True
     if args.NF:
@@ -145,9 +158,11 @@ def main_real(args):
     
     if args.E:
         ### Mask normalisation and cleaning ###
-        edge_masks = [edge_mask.astype("float") for edge_mask in edge_masks]
+        edge_masks = SparseMasks.from_masks(edge_masks, data.edge_index.size(1))
         edge_masks = clean_masks(edge_masks)
-        print("__initial_edge_mask_infos:" + json.dumps(get_mask_info(edge_masks, data.edge_index)))
+        initial_edge_mask_infos = get_mask_info(edge_masks, data.edge_index)
+        print("__initial_edge_mask_infos:" + json.dumps(initial_edge_mask_infos))
+        results.add("initial_edge_mask_infos", initial_edge_mask_infos, args)
 
         infos["edge_mask_sparsity_init"] = get_sparsity(edge_masks)
         infos["edge_mask_size_init"] = get_size(edge_masks)
@@ -161,11 +176,15 @@ def main_real(args):
         #infos["node_feat_mask_sparsity_init"] = get_sparsity(node_feat_masks)
         #infos["node_feat_mask_size_init"] = get_size(node_feat_masks)
         
-        if (eval(args.hard_mask)==False)&(args.seed==10):
+        if (args.hard_mask==False)&(args.seed==10):
             plot_masks_density(node_feat_masks, args, type="node_feat")
             plot_feat_importance(node_feat_masks, args)
 
     print("__infos:" + json.dumps(infos))
+    results.add("infos", infos, args)
+
+    if args.E and args.fidelity_curve:
+        eval_curve(model, data, edge_masks, node_feat_masks, list_test_nodes, device, args, results)
 
 
     if (not args.strategy)|(not args.params_list):
@@ -176,28 +195,34 @@ def main_real(args):
         fidelity = eval_fidelity(related_preds, args)
         fidelity_scores = {key: value for key, value in sorted(fidelity.items() | params_transf.items())}
         print("__fidelity:" + json.dumps(fidelity_scores))
+        results.add("fidelity", fidelity, args)
+        results.flush()
 
 
     else: 
         print("Masks are transformed with strategy: " + args.strategy)
-        params_lst = [eval(i) for i in args.params_list.split(',')]
+        params_lst = args.params_list
     
-        edge_masks_ori = edge_masks.copy()
+        edge_masks_ori = edge_masks
         for param in params_lst:
             params_transf = {args.strategy: param}
 
             ### Mask transformation ###
             edge_masks = transform_mask(edge_masks_ori, data, param, args)
-            if (eval(args.hard_mask)==False)&(args.seed==10):
+            if (args.hard_mask==False)&(args.seed==10):
                 plot_masks_density(edge_masks, args, type="edge")
-            transformed_mask_infos = {key: value for key, value in sorted(get_mask_info(edge_masks, data.edge_index).items() | params_transf.items())}
+            mask_infos = get_mask_info(edge_masks, data.edge_index)
+            transformed_mask_infos = {key: value for key, value in sorted(mask_infos.items() | params_transf.items())}
             print("__transformed_mask_infos:" + json.dumps(transformed_mask_infos))
+            results.add("transformed_mask_infos", mask_infos, args, args.strategy, param)
 
             ### Fidelity ###
             related_preds = eval_related_pred_nc(model, data, edge_masks, node_feat_masks, list_test_nodes, device, args)
             fidelity = eval_fidelity(related_preds, args)
             fidelity_scores = {key: value for key, value in sorted(fidelity.items() | params_transf.items())}
             print("__fidelity:" + json.dumps(fidelity_scores))
+            results.add("fidelity", fidelity, args, args.strategy, param)
+            results.flush()
 
 
 
@@ -207,25 +232,13 @@ def main_real(args):
 
 
 
-def main_syn(args):
-
-    np.random.seed(args.seed)
-    if torch.cuda.is_available():
-        torch.cuda.manual_seed(args.seed)
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
+def load_syn(args, device):
+    """Load the synthetic dataset and its trained GCN model, generating the data and training the model if needed."""
     ### Generate, Save, Load data ###
     check_dir(args.data_save_dir)
     args = get_graph_size_args(args)
-    data_filename = create_data_filename(args)
-    if os.path.isfile(data_filename):
-        data = torch.load(data_filename)
-    else:
-
-        data = build_syndata(args)
-        torch.save(data, data_filename)
-
-    data = data.to(device)
+    data = load_syndata(args).to(device)
+    args.data_digest = data_digest(data)
     args = get_data_args(data, args)
     print("_data_info: ", data.num_nodes, data.num_edges, args.num_classes)
     print("_val_data, test_data: ", data.val_mask.sum().item(), data.test_mask.sum().item())
@@ -265,26 +278,29 @@ def main_syn(args):
     ckpt = load_ckpt(model_filename, device)
     model.load_state_dict(ckpt["model_state"])
     model.eval()
+    args.model_digest = model_digest(model)
     model.to(device)
     print("__gnn_train_scores: " + json.dumps(ckpt["results_train"]))
     print("__gnn_test_scores: " + json.dumps(ckpt["results_test"]))
-    
+    return data, model
+
+
+def main_syn(args):
+
+    np.random.seed(args.seed)
+    if torch.cuda.is_available():
+        torch.cuda.manual_seed(args.seed)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    data, model = load_syn(args, device)
+
     ### Explain ###
     list_test_nodes = get_test_nodes(data, model, args)
 
-    if eval(args.save_mask):
-        mask_filename = create_mask_filename(args)
-        if os.path.isfile(mask_filename):
-            with open(mask_filename, 'rb') as f:
-                w_list = pickle.load(f)
-            edge_masks, node_feat_masks, Time = tuple(w_list)
-        else:
-            edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args)
-            with open(mask_filename, 'wb') as f:
-                pickle.dump([edge_masks, node_feat_masks, Time], f)
-    else:
-        edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args)
-        
+    mask_cache = get_mask_cache(data, args)
+    edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args, cache=mask_cache)
+
+    results = ResultsWriter(create_results_filename(args))
     args.E = False if edge_masks[0] is None else True
     args.NF = False if node_feat_masks[0] is None else True
     if args.NF:
@@ -305,9 +321,11 @@ def main_syn(args):
     
     if args.E:
         ### Mask normalisation and cleaning ###
-        edge_masks = [edge_mask.astype("float") for edge_mask in edge_masks]
+        edge_masks = SparseMasks.from_masks(edge_masks, data.edge_index.size(1))
         edge_masks = clean_masks(edge_masks)
-        print("__initial_edge_mask_infos:" + json.dumps(get_mask_info(edge_masks, data.edge_index)))
+        initial_edge_mask_infos = get_mask_info(edge_masks, data.edge_index)
+        print("__initial_edge_mask_infos:" + json.dumps(initial_edge_mask_infos))
+        results.add("initial_edge_mask_infos", initial_edge_mask_infos, args)
 
         infos["edge_mask_sparsity_init"] = get_sparsity(edge_masks)
         infos["edge_mask_size_init"] = get_size(edge_masks)
@@ -322,80 +340,107 @@ def main_syn(args):
         infos["node_feat_mask_sparsity_init"] = get_sparsity(node_feat_masks)
         infos["node_feat_mask_size_init"] = get_size(node_feat_masks)
         
-        if (eval(args.hard_mask)==False)&(args.seed==10):
+        if (args.hard_mask==False)&(args.seed==10):
             plot_masks_density(node_feat_masks, args, type="node_feat")
             plot_feat_importance(node_feat_masks, args)
 
     print("__infos:" + json.dumps(infos))
+    results.add("infos", infos, args)
+
+    if args.E:
+        ### Ranking scores of the soft masks ###
+        ranking = eval_ranking(data, edge_masks, list_test_nodes, args)
+        print("__ranking:" + json.dumps(ranking))
+        results.add("ranking", ranking, args)
+
+    if args.E and args.fidelity_curve:
+        eval_curve(model, data, edge_masks, node_feat_masks, list_test_nodes, device, args, results)
 
-    if eval(args.top_acc):
+    if args.top_acc:
         ### Accuracy Top ###
         accuracy_top = eval_accuracy(data, edge_masks, list_test_nodes, args, top_acc=True)
         print("__accuracy_top:" + json.dumps(accuracy_top))
+        results.add("accuracy_top", accuracy_top, args)
+        results.flush()
     
     else:
 
-        if (args.strategy not in ["topk", "sparsity", "threshold"])|(eval(args.params_list) is None):
+        if (args.strategy not in ["topk", "sparsity", "threshold"])|(args.params_list is None):
             print("Masks are not transformed")
             args.param = None
-            params_transf = {"strategy": args.strategy, "params_list": args.params_list}
+            params_list = None if args.params_list is None else ",".join(str(param) for param in args.params_list)
+            params_transf = {"strategy": args.strategy, "params_list": params_list}
 
             ### Accuracy ###
             accuracy = eval_accuracy(data, edge_masks, list_test_nodes, args, top_acc=False)
             accuracy_scores = {key: value for key, value in sorted(accuracy.items() | params_transf.items())}
             print("__accuracy:" + json.dumps(accuracy_scores))
+            results.add("accuracy", accuracy, args)
 
             ### Fidelity ###
             related_preds = eval_related_pred_nc(model, data, edge_masks, node_feat_masks, list_test_nodes, device, args)
             fidelity = eval_fidelity(related_preds, args)
             fidelity_scores = {key: value for key, value in sorted(fidelity.items() | params_transf.items())}
             print("__fidelity:" + json.dumps(fidelity_scores))
+            results.add("fidelity", fidelity, args)
+            results.flush()
 
 
         else: 
             print("Masks are transformed with strategy: " + args.strategy)
-            params_lst = [eval(i) for i in args.params_list.split(',')]
+            params_lst = args.params_list
         
-            edge_masks_ori = edge_masks.copy()
+            edge_masks_ori = edge_masks
             for param in params_lst:
                 params_transf = {args.strategy: param}
                 args.param = param
 
                 ### Mask transformation ###
                 edge_masks = transform_mask(edge_masks_ori, data, param, args)
-                if (eval(args.hard_mask)==False)&(args.seed==10):
+                if (args.hard_mask==False)&(args.seed==10):
                     plot_masks_density(edge_masks, args, type="edge")
-                transformed_mask_infos = {key: value for key, value in sorted(get_mask_info(edge_masks, data.edge_index).items() | params_transf.items())}
+                mask_infos = get_mask_info(edge_masks, data.edge_index)
+                transformed_mask_infos = {key: value for key, value in sorted(mask_infos.items() | params_transf.items())}
                 print("__transformed_mask_infos:" + json.dumps(transformed_mask_infos))
+                results.add("transformed_mask_infos", mask_infos, args, args.strategy, param)
 
                 ### Accuracy ###
                 accuracy = eval_accuracy(data, edge_masks, list_test_nodes, args, top_acc=False)
                 accuracy_scores = {key: value for key, value in sorted(accuracy.items() | params_transf.items())}
                 print("__accuracy:" + json.dumps(accuracy_scores))
+                results.add("accuracy", accuracy, args, args.strategy, param)
 
                 ### Fidelity ###
                 related_preds = eval_related_pred_nc(model, data, edge_masks, node_feat_masks, list_test_nodes, device, args)
                 fidelity = eval_fidelity(related_preds, args)
                 fidelity_scores = {key: value for key, value in sorted(fidelity.items() | params_transf.items())}
                 print("__fidelity:" + json.dumps(fidelity_scores))
+                results.add("fidelity", fidelity, args, args.strategy, param)
+                results.flush()
 
     return
 
 
 
-if __name__ == "__main__":
-    args = arg_parse()
+def set_gnn_args(args):
+    """Set the GNN hyperparameters of the dataset. Returns main_syn or main_real, None for an unknown dataset."""
     if args.dataset.startswith(tuple(["ba", "tree"])):
         args.num_gc_layers, args.hidden_dim, args.output_dim, args.num_epochs, args.lr, args.weight_decay, args.dropout = 3, 20, 20, 1000, 0.001, 5e-3, 0.0
-        main_syn(args)
+        return main_syn
     elif args.dataset in REAL_DATA.keys():
         if args.dataset in WEBKB.keys():
             args.num_gc_layers, args.hidden_dim, args.output_dim, args.num_epochs, args.lr, args.weight_decay, args.dropout = 2, 32, 32, 400, 0.001, 5e-3, 0.2
         else: 
             args.num_gc_layers, args.hidden_dim, args.output_dim,  args.num_epochs, args.lr, args.weight_decay, args.dropout = 2, 16, 16, 200, 0.01, 5e-4, 0.5
-        main_real(args)
+        return main_real
     elif args.dataset.startswith("ebay"):
         args.num_gc_layers, args.hidden_dim, args.output_dim, args.num_epochs, args.lr, args.weight_decay, args.dropout = 2, 32, 32, 500, 0.001, 5e-4, 0.5
-        main_real(args)
-    else:
-        pass
+        return main_real
+    return None
+
+
+if __name__ == "__main__":
+    args = arg_parse()
+    main = set_gnn_args(args)
+    if main is not None:
+        main(args)
@@ -0,0 +1,125 @@
+""" sweep.py
+    Evaluate the grid of target modes, hard/soft masks and mask transformations in a single process.
+
+    The data, the GNN model, the testing nodes and the original predictions are loaded once per seed,
+    and the masks are computed (or read from the mask cache) once per seed and target mode. Results of
+    the whole grid are written to one table.
+
+    python3 code/sweep.py --dataset ba_house --explainer_name gnnexplainer --sweep_seeds 0,1,2
+"""
+
+import numpy as np
+import pandas as pd
+import torch
+
+from evaluate.accuracy import eval_accuracy, eval_ranking
+from evaluate.fidelity import eval_fidelity, eval_related_pred_nc
+from evaluate.mask_utils import clean_masks, get_mask_info, get_size, get_sparsity, transform_mask
+from explainer.genmask import compute_edge_masks_nc, get_mask_cache
+from main import load_real, load_syn, main_syn, set_gnn_args
+from utils.gen_utils import get_test_nodes
+from utils.io_utils import create_results_filename, create_sweep_filename
+from utils.mask_store import SparseMasks
+from utils.parser_utils import arg_parse
+from utils.results_store import ResultsWriter
+
+
+def get_clean_masks(model, data, list_test_nodes, device, args):
+    """Cleaned masks of the testing nodes for the current target mode, and their infos."""
+    edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args, cache=get_mask_cache(data, args))
+    args.E = edge_masks[0] is not None
+    args.NF = (node_feat_masks[0] is not None) and (node_feat_masks[0].size > 1)
+    args.num_test_final = len(Time)
+
+    infos = {"num_test_final": args.num_test_final, "time": float(format(np.mean(Time), ".4f"))}
+    if args.E:
+        edge_masks = clean_masks(SparseMasks.from_masks(edge_masks, data.edge_index.size(1)))
+        infos["edge_mask_sparsity_init"] = get_sparsity(edge_masks)
+        infos["edge_mask_size_init"] = get_size(edge_masks)
+    if args.NF:
+        node_feat_masks = clean_masks([node_feat_mask.astype("float") for node_feat_mask in node_feat_masks])
+    return edge_masks, node_feat_masks, infos
+
+
+def sweep_seed(args, device, is_syn, results):
+    """Rows of results of the whole grid for args.seed, also added to the ResultsWriter results"""
+    np.random.seed(args.seed)
+    if torch.cuda.is_available():
+        torch.cuda.manual_seed(args.seed)
+    data, model = load_syn(args, device) if is_syn else load_real(args, device)
+    list_test_nodes = get_test_nodes(data, model, args)
+    with torch.no_grad():
+        ori_ypred = model(data.x, data.edge_index, edge_weight=data.edge_weight).cpu().detach().numpy()
+
+    params = args.sweep_params
+    rows = []
+    for true_label_as_target in args.sweep_true_label_as_target:
+        args.true_label_as_target = true_label_as_target
+        edge_masks, node_feat_masks, infos = get_clean_masks(model, data, list_test_nodes, device, args)
+        results.add("infos", infos, args)
+        ranking = eval_ranking(data, edge_masks, list_test_nodes, args) if is_syn and args.E else {}
+        results.add("ranking", ranking, args)
+        grid = [(strategy, param) for strategy, values in params.items() for param in values] if args.E else [(None, None)]
+
+        for strategy, param in grid:
+            args.strategy, args.param = strategy, param
+            mask_infos, accuracy = {}, {}
+            masks = edge_masks
+            if args.E:
+                # the transformed masks only depend on the strategy: they are shared by hard and soft modes
+                masks = transform_mask(edge_masks, data, param, args)
+                mask_infos = get_mask_info(masks, data.edge_index)
+                if is_syn:
+                    accuracy = eval_accuracy(data, masks, list_test_nodes, args, top_acc=False)
+
+            for hard_mask in args.sweep_hard_mask:
+                args.hard_mask = hard_mask
+                related_preds = eval_related_pred_nc(
+                    model, data, masks, node_feat_masks, list_test_nodes, device, args, ori_ypred=ori_ypred
+                )
+                fidelity = eval_fidelity(related_preds, args)
+                results.add("transformed_mask_infos", mask_infos, args, strategy, param)
+                results.add("accuracy", accuracy, args, strategy, param)
+                results.add("fidelity", fidelity, args, strategy, param)
+                rows.append({
+                    "dataset": args.dataset,
+                    "explainer": args.explainer_name,
+                    "seed": args.seed,
+                    "true_label_as_target": true_label_as_target,
+                    "hard_mask": hard_mask,
+                    "strategy": strategy,
+                    "param": param,
+                    **infos,
+                    **ranking,
+                    **mask_infos,
+                    **accuracy,
+                    **fidelity,
+                })
+            results.flush()
+    return rows
+
+
+def sweep(args):
+    main = set_gnn_args(args)
+    if main is None:
+        raise ValueError(f"Unknown dataset {args.dataset}")
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    seeds = args.sweep_seeds if args.sweep_seeds else [args.seed]
+
+    rows = []
+    results = ResultsWriter(create_results_filename(args))
+    for seed in seeds:
+        args.seed = seed
+        rows += sweep_seed(args, device, main is main_syn, results)
+
+    table = pd.DataFrame(rows)
+    table_filename = create_sweep_filename(args)
+    table.to_csv(table_filename, index=False)
+    print(table.to_string())
+    print("__sweep_results: " + table_filename)
+    return table
+
+
+if __name__ == "__main__":
+    args = arg_parse()
+    sweep(args)
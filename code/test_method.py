@@ -1,24 +1,26 @@
 import json
-import time
 import os
 
 import numpy as np
 import torch
+import torch_geometric.datasets
 from torch_geometric.datasets import Planetoid, WikipediaNetwork, WebKB
 import torch.nn.functional as F
 
-from dataset.gen_syn import build_syndata
+from dataset.gen_syn import load_syndata
 from dataset.gen_real import load_data_real
 from dataset.data_utils import get_split, split_data
 from evaluate.accuracy import eval_accuracy
 from evaluate.fidelity import eval_fidelity, eval_related_pred_nc
 from evaluate.mask_utils import clean_masks, get_mask_info, get_ratio_connected_components, get_size, get_sparsity, normalize_all_masks, transform_mask
 from explainer.genmask import compute_edge_masks_nc
+from explainer.registry import EDGE, NODE_FEAT, register_explainer
 from gnn.eval import gnn_scores_nc, gnn_accuracy
 from gnn.model import GCN, GcnEncoderNode
 from gnn.train import train_real_nc, train_syn_nc
-from utils.gen_utils import get_test_nodes, get_labels
-from utils.io_utils import check_dir, create_data_filename, create_mask_filename, create_model_filename, load_ckpt, save_checkpoint
+from utils.gen_utils import get_test_nodes
+from utils.io_utils import check_dir, create_mask_filename, create_model_filename, load_ckpt, save_checkpoint
+from utils.mask_store import SparseMasks
 from utils.parser_utils import arg_parse, get_data_args, get_graph_size_args
 from utils.plot_utils import plot_feat_importance, plot_masks_density
 
@@ -32,33 +34,8 @@ def test_args():
     return args
 
 
-def test_compute_edge_masks_nc(list_test_nodes, model, data, device, args):
-    Time = []
-    edge_masks, node_feat_masks = [], []
-    if eval(args.true_label_as_target):
-        targets = data.y
-    else:
-        out = model(data.x, data.edge_index, edge_weight=data.edge_weight)
-        targets = torch.LongTensor(get_labels(out.detach().cpu().numpy())).to(device)
-    t0 = time.time()
-    for node_idx in list_test_nodes:
-        start_time = time.time()
-        edge_mask, node_feat_mask = new_method(
-            model, data, node_idx, targets[node_idx], device, args
-        )
-        end_time = time.time()
-        duration_seconds = end_time - start_time
-        Time.append(duration_seconds)
-        edge_masks.append(edge_mask)
-        node_feat_masks.append(node_feat_mask)
-        t1 = time.time()
-        if t1 - t0 > args.time_limit:
-            print("Time limit reached")
-            break
-    args.num_test_final = len(edge_masks)
-    return edge_masks, node_feat_masks, Time
-
-
+# new_method is plugged in the explainer registry, and explained by the same scheduler as the other explainers
+register_explainer("new_method", new_method, deterministic=False, mask_types=(EDGE, NODE_FEAT))
 
 
 REAL_DATA = {"facebook": "FacebookPagePage", "cora": "Planetoid", "citeseer": "Planetoid", "pubmed": "Planetoid",
@@ -103,7 +80,7 @@ def test_real(args):
                     shutil.move(source, destination)
             shutil.rmtree(origin_dir, ignore_errors=True)
         else:
-            eval(REAL_DATA[args.dataset])(data_dir)
+            getattr(torch_geometric.datasets, REAL_DATA[args.dataset])(data_dir)
 
     data = load_data_real(data_filename)
     if args.dataset == "facebook":
@@ -132,7 +109,7 @@ def test_real(args):
 
     ### Explainer ###
     list_test_nodes = get_test_nodes(data, model, args)
-    edge_masks, node_feat_masks, Time = test_compute_edge_masks_nc(list_test_nodes, model, data, device, args)
+    edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args)
         
 
     args.E = False if edge_masks[0] is None else True
@@ -155,7 +132,7 @@ def test_real(args):
     
     if args.E:
         ### Mask normalisation and cleaning ###
-        edge_masks = [edge_mask.astype("float") for edge_mask in edge_masks]
+        edge_masks = SparseMasks.from_masks(edge_masks, data.edge_index.size(1))
         edge_masks = clean_masks(edge_masks)
         print("__initial_edge_mask_infos:" + json.dumps(get_mask_info(edge_masks, data.edge_index)))
 
@@ -171,22 +148,22 @@ def test_real(args):
         #infos["node_feat_mask_sparsity_init"] = get_sparsity(node_feat_masks)
         #infos["node_feat_mask_size_init"] = get_size(node_feat_masks)
         
-        if (eval(args.hard_mask)==False)&(args.seed==10):
+        if (args.hard_mask==False)&(args.seed==10):
             plot_masks_density(node_feat_masks, args, type="node_feat")
             plot_feat_importance(node_feat_masks, args)
 
     print("__infos:" + json.dumps(infos))
 
     print("Masks are transformed with strategy: " + args.strategy)
-    params_lst = [eval(i) for i in args.params_list.split(',')]
+    params_lst = args.params_list
 
-    edge_masks_ori = edge_masks.copy()
+    edge_masks_ori = edge_masks
     for param in params_lst:
         params_transf = {args.strategy: param}
 
         ### Mask transformation ###
         edge_masks = transform_mask(edge_masks_ori, data, param, args)
-        if (eval(args.hard_mask)==False)&(args.seed==10):
+        if (args.hard_mask==False)&(args.seed==10):
             plot_masks_density(edge_masks, args, type="edge")
         transformed_mask_infos = {key: value for key, value in sorted(get_mask_info(edge_masks, data.edge_index).items() | params_transf.items())}
         print("__transformed_mask_infos:" + json.dumps(transformed_mask_infos))
@@ -213,8 +190,7 @@ def test_syn(args):
     ### Generate, Save, Load data ###
     check_dir(args.data_save_dir)
     args = get_graph_size_args(args)
-    data_filename = create_data_filename(args)
-    data = torch.load(data_filename).to(device)
+    data = load_syndata(args).to(device)
     args = get_data_args(data, args)
     print("_data_info: ", data.num_nodes, data.num_edges, args.num_classes)
     print("_val_data, test_data: ", data.val_mask.sum().item(), data.test_mask.sum().item())
@@ -238,7 +214,7 @@ def test_syn(args):
     
     ### Explain ###
     list_test_nodes = get_test_nodes(data, model, args)
-    edge_masks, node_feat_masks, Time = test_compute_edge_masks_nc(list_test_nodes, model, data, device, args)
+    edge_masks, node_feat_masks, Time = compute_edge_masks_nc(list_test_nodes, model, data, device, args)
         
     args.E = False if edge_masks[0] is None else True
     args.NF = False if node_feat_masks[0] is None else True
@@ -260,7 +236,7 @@ def test_syn(args):
     
     if args.E:
         ### Mask normalisation and cleaning ###
-        edge_masks = [edge_mask.astype("float") for edge_mask in edge_masks]
+        edge_masks = SparseMasks.from_masks(edge_masks, data.edge_index.size(1))
         edge_masks = clean_masks(edge_masks)
         print("__initial_edge_mask_infos:" + json.dumps(get_mask_info(edge_masks, data.edge_index)))
 
@@ -281,16 +257,16 @@ def test_syn(args):
 
     
     print("Masks are transformed with strategy: " + args.strategy)
-    params_lst = [eval(i) for i in args.params_list.split(',')]
+    params_lst = args.params_list
 
-    edge_masks_ori = edge_masks.copy()
+    edge_masks_ori = edge_masks
     for param in params_lst:
         params_transf = {args.strategy: param}
         args.param = param
 
         ### Mask transformation ###
         edge_masks = transform_mask(edge_masks_ori, data, param, args)
-        if (eval(args.hard_mask)==False)&(args.seed==10):
+        if (args.hard_mask==False)&(args.seed==10):
             plot_masks_density(edge_masks, args, type="edge")
         transformed_mask_infos = {key: value for key, value in sorted(get_mask_info(edge_masks, data.edge_index).items() | params_transf.items())}
         print("__transformed_mask_infos:" + json.dumps(transformed_mask_infos))
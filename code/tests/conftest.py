@@ -0,0 +1,85 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# the test modules skip themselves when torch, torch_geometric or another library they need is missing,
+# the fixtures import them lazily so that collecting the tests does not need them
+
+NUM_GC_LAYERS = 3
+INPUT_DIM = 10
+# explained nodes: BA basis nodes and house nodes (the houses are attached after the 20 basis nodes)
+NODE_IDS = [0, 7, 19, 22, 31]
+
+
+@pytest.fixture(scope="session")
+def args():
+    # small gradient batches, so that the batched explainers split the nodes over several passes
+    return SimpleNamespace(
+        dataset="ba_house", num_gc_layers=NUM_GC_LAYERS, method="base", grad_batch_size=16, grad_batch_nodes=200
+    )
+
+
+@pytest.fixture(scope="session")
+def ba_house():
+    """Small ba_house sample (20 basis nodes, 4 houses) with random node features"""
+    import random
+
+    import numpy as np
+    import torch
+    from torch_geometric.data import Data
+
+    from dataset.syn_utils import gengraph
+
+    random.seed(0)
+    np.random.seed(0)
+    G, labels, _ = gengraph.gen_ba_house(nb_shapes=4, width_basis=20)
+    edges = np.array(G.edges(), dtype=np.int64)
+    edge_index = np.concatenate([edges, edges[:, ::-1]]).T
+    edge_index = edge_index[:, np.lexsort((edge_index[1], edge_index[0]))]
+    generator = torch.Generator().manual_seed(0)
+    data = Data(
+        x=torch.rand(len(labels), INPUT_DIM, generator=generator),
+        edge_index=torch.from_numpy(np.ascontiguousarray(edge_index)),
+        y=torch.LongTensor(np.array(labels, dtype=np.int64)),
+    )
+    data.edge_weight = torch.ones(data.num_edges)
+    data.num_classes = len(np.unique(labels))
+    return data
+
+
+def eval_model(model, data):
+    """Model in eval mode and its predicted classes on data"""
+    import torch
+
+    model.eval()
+    with torch.no_grad():
+        targets = model(data.x, data.edge_index, edge_weight=data.edge_weight).argmax(dim=1)
+    return model, targets
+
+
+@pytest.fixture(scope="session")
+def gcn_encoder_node(ba_house, args):
+    """Untrained 3-layer GcnEncoderNode and its predicted classes on ba_house"""
+    import torch
+
+    from gnn.model import GcnEncoderNode
+
+    torch.manual_seed(0)
+    model = GcnEncoderNode(INPUT_DIM, 16, 16, ba_house.num_classes, NUM_GC_LAYERS, args=args, device="cpu")
+    return eval_model(model, ba_house)
+
+
+@pytest.fixture(scope="session")
+def gcn(ba_house):
+    """Untrained 3-layer GCN and its predicted classes on ba_house"""
+    import torch
+
+    from gnn.model import GCN
+
+    torch.manual_seed(0)
+    model = GCN(INPUT_DIM, 16, ba_house.num_classes, dropout=0.0, num_layers=NUM_GC_LAYERS)
+    return eval_model(model, ba_house)
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+nx = pytest.importorskip("networkx")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+pytest.importorskip("scipy")
+
+from conftest import NODE_IDS
+
+from dataset.syn_utils.gengroundtruth import add_motif_index, get_ground_truth
+from evaluate import accuracy
+from utils.mask_store import SparseMasks
+
+
+def get_scores_networkx(G1, G2):
+    """Recall, precision and f1 score before the array version: networkx intersection of the
+    explanation graph G1 and the ground-truth graph G2"""
+    G1, G2 = G1.to_undirected(), G2.to_undirected()
+    g_int = nx.intersection(G1, G2)
+    g_int.remove_nodes_from(list(nx.isolates(g_int)))
+
+    n_tp = g_int.number_of_edges()
+    n_fp = len(G1.edges() - g_int.edges())
+    n_fn = len(G2.edges() - g_int.edges())
+
+    if n_tp == 0:
+        return 0, 0, 0
+    precision = n_tp / (n_tp + n_fp)
+    recall = n_tp / (n_tp + n_fn)
+    return recall, precision, 2 * (precision * recall) / (precision + recall)
+
+
+def eval_accuracy_networkx(data, edge_masks, list_node_idx, args, top_acc):
+    scores = []
+    for edge_mask, node_idx in zip(edge_masks, list_node_idx):
+        G_true, _, _ = get_ground_truth(node_idx, data, args)
+        G_expl = accuracy.get_explanation(data, torch.Tensor(edge_mask), args, top_acc)
+        scores.append(get_scores_networkx(G_expl, G_true))
+    recall, precision, f1_score = np.mean(scores, axis=0)
+    return {"recall": recall, "precision": precision, "f1_score": f1_score}
+
+
+@pytest.fixture(scope="module")
+def ba_house_motifs(ba_house):
+    return add_motif_index(ba_house.clone(), SimpleNamespace(dataset="ba_house", width_basis=20))
+
+
+def random_masks(data, list_node_idx, seed):
+    """Masks with ties (values on a coarse grid) and mostly zeros, larger on the motif of the explained node"""
+    rng = np.random.default_rng(seed)
+    masks = np.round(rng.random((len(list_node_idx), data.num_edges)), 1)
+    masks[rng.random(masks.shape) < 0.6] = 0
+    for mask, node_idx in zip(masks, list_node_idx):
+        mask[data.edge_motif_id.numpy() == data.motif_id[node_idx].item()] += 0.5
+    return masks
+
+
+@pytest.mark.parametrize("top_acc", [False, True])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_accuracy_matches_networkx(ba_house_motifs, top_acc, seed):
+    data = ba_house_motifs
+    list_node_idx = NODE_IDS + [24, 27]
+    args = SimpleNamespace(dataset="ba_house", num_test_final=len(list_node_idx), num_top_edges=6, draw_graph=False)
+    masks = random_masks(data, list_node_idx, seed)
+    masks[-1] = 0
+    expected = eval_accuracy_networkx(data, masks, list_node_idx, args, top_acc)
+    for edge_masks in [list(masks), SparseMasks.from_masks(masks, data.num_edges)]:
+        scores = accuracy.eval_accuracy(data, edge_masks, list_node_idx, args, top_acc)
+        assert scores == pytest.approx(expected)
+
+
+def precision_at_k_ties(y_true, y_score):
+    """Precision@k with k the number of positives; the edges tied at the cut-off share the remaining slots"""
+    k = int(y_true.sum())
+    hits, taken = 0.0, 0
+    for score in np.unique(y_score)[::-1]:
+        tied = y_score == score
+        slots = min(k - taken, tied.sum())
+        hits += y_true[tied].sum() * slots / tied.sum()
+        taken += slots
+    return hits / k
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_ranking_matches_sklearn(ba_house_motifs, seed):
+    metrics = pytest.importorskip("sklearn.metrics")
+    data = ba_house_motifs
+    list_node_idx = [22, 24, 27, 31, 35]
+    masks = random_masks(data, list_node_idx, seed)
+    masks[-1] = 0
+    num_masks = len(list_node_idx)
+
+    entries = accuracy.get_ranking_entries(data, list(masks), list_node_idx, num_masks)
+    auroc, average_precision, precision_at_k = accuracy.get_ranking_scores(*entries, num_masks)
+    for i, node_idx in enumerate(list_node_idx):
+        y_true = (data.edge_motif_id.numpy() == data.motif_id[node_idx].item()).astype(int)
+        assert auroc[i] == pytest.approx(metrics.roc_auc_score(y_true, masks[i]))
+        assert average_precision[i] == pytest.approx(metrics.average_precision_score(y_true, masks[i]))
+        assert precision_at_k[i] == pytest.approx(precision_at_k_ties(y_true, masks[i]))
+    # the all-zero mask ranks every edge alike
+    assert auroc[-1] == pytest.approx(0.5)
+
+
+def test_ranking_undefined_without_ground_truth(ba_house_motifs):
+    data = ba_house_motifs
+    list_node_idx = [0, 22]
+    masks = random_masks(data, list_node_idx, 0)
+    args = SimpleNamespace(num_test_final=len(list_node_idx))
+    auroc, average_precision, precision_at_k = accuracy.get_ranking_scores(
+        *accuracy.get_ranking_entries(data, list(masks), list_node_idx, len(list_node_idx)), len(list_node_idx)
+    )
+    assert np.isnan([auroc[0], average_precision[0], precision_at_k[0]]).all()
+    scores = accuracy.eval_ranking(data, SparseMasks.from_masks(masks, data.num_edges), list_node_idx, args)
+    expected = {"auroc": auroc[1], "average_precision": average_precision[1], "precision_at_k": precision_at_k[1]}
+    assert scores == pytest.approx(expected)
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("torch")
+
+from utils.cache_utils import digest, mask_inputs
+
+
+def mask_key(**kwargs):
+    args = dict(
+        dataset="ba_house", explain_graph=False, explainer_name="gnnexplainer", seed=0, num_test=5,
+        testing_pred="mix", true_label_as_target=True, edge_size=0.005, edge_ent=1.0, num_epochs=200,
+        hard_mask=True, strategy="topk", grad_batch_nodes=5000, data_digest="d", model_digest="m",
+    )
+    args.update(kwargs)
+    return digest(mask_inputs(SimpleNamespace(**args)))
+
+
+def test_mask_key_ignores_evaluation_arguments():
+    key = mask_key()
+    # arguments of the evaluation or of the batching, and arguments unknown to the cache
+    assert mask_key(hard_mask=False, strategy="sparsity", grad_batch_nodes=100) == key
+    assert mask_key(new_evaluation_flag=True) == key
+    # the hyperparameters of other explainers
+    assert mask_key(pgexplainer_full_emb=True) == key
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"seed": 1}, {"true_label_as_target": False}, {"num_test": 10}, {"explainer_name": "pgexplainer"},
+        {"edge_size": 0.01}, {"data_digest": "d2"}, {"model_digest": "m2"},
+    ],
+)
+def test_mask_key_depends_on_mask_inputs(change):
+    assert mask_key(**change) != mask_key()
+
+
+def test_mask_key_of_explainer_hyperparameters():
+    assert mask_key(explainer_name="pgexplainer", pgexplainer_full_emb=True) != mask_key(
+        explainer_name="pgexplainer", pgexplainer_full_emb=False
+    )
+    # gnnexplainer hyperparameters do not key the pgexplainer masks
+    assert mask_key(explainer_name="pgexplainer", edge_size=0.01) == mask_key(explainer_name="pgexplainer")
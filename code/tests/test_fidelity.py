@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+
+from conftest import NODE_IDS, NUM_GC_LAYERS
+
+from evaluate import fidelity
+from evaluate.mask_utils import control_sparsity
+from utils.gen_utils import get_proba
+
+
+def fidelity_per_score(related_preds):
+    """Fidelity scores before the vectorized pass, one function per score"""
+    origin, masked, maskout = related_preds["origin"], related_preds["masked"], related_preds["maskout"]
+    scores = {}
+    for name, labels in [("fidelity", related_preds["true_label"]), ("fidelity_gnn", related_preds["pred_label"])]:
+        ori_correct = (np.argmax(origin, axis=1) == labels).astype(int)
+        ori_probs = np.choose(labels, origin.T)
+        # acc+/prob+ remove the important edges (maskout), acc-/prob- keep them (masked)
+        for sign, probs in [("+", maskout), ("-", masked)]:
+            scores[name + "_acc" + sign] = np.abs(ori_correct - (np.argmax(probs, axis=1) == labels)).mean().item()
+            drop = ori_probs - np.choose(labels, probs.T)
+            # only the scores for the model labels take the absolute probability drop
+            scores[name + "_prob" + sign] = (np.abs(drop) if name == "fidelity_gnn" else drop).mean().item()
+    return scores
+
+
+def random_related_preds(num_test=50, num_classes=4, seed=0):
+    rng = np.random.default_rng(seed)
+    probs = [get_proba(rng.normal(size=(num_test, num_classes))) for _ in range(3)]
+    return {
+        "node_idx": np.arange(num_test),
+        "origin": probs[0],
+        "masked": probs[1],
+        "maskout": probs[2],
+        "true_label": rng.integers(num_classes, size=num_test),
+        # model labels that are not always those of origin, so that prob drops of both signs occur
+        "pred_label": rng.integers(num_classes, size=num_test),
+    }
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_fidelity_all_matches_per_score(seed):
+    related_preds = random_related_preds(seed=seed)
+    scores = fidelity.fidelity_all(related_preds)
+    expected = fidelity_per_score(related_preds)
+    assert scores.keys() == expected.keys()
+    assert scores == pytest.approx(expected)
+    for true_label_as_target, prefix in [(True, "fidelity_"), (False, "fidelity_gnn_")]:
+        args = SimpleNamespace(true_label_as_target=true_label_as_target)
+        assert fidelity.eval_fidelity(related_preds, args) == {
+            prefix + key: scores[prefix + key] for key in ["acc+", "acc-", "prob+", "prob-"]
+        }
+
+
+def related_pred_per_node(model, data, edge_masks, node_feat_masks, list_node_idx, args):
+    """Related predictions before preallocation: one full-graph softmax per masked and maskout forward"""
+    ori_yprob = get_proba(model(data.x, data.edge_index, edge_weight=data.edge_weight).detach().numpy())
+    masked, maskout = [], []
+    for i, node_idx in enumerate(list_node_idx):
+        x_masked, x_maskout = data.x, data.x
+        if args.NF:
+            node_feat_mask = torch.Tensor(node_feat_masks[i])
+            x_masked, x_maskout = data.x * node_feat_mask, data.x * (1 - node_feat_mask)
+        edge_mask = torch.Tensor(edge_masks[i])
+        if args.hard_mask:
+            masked_ypred = model(x_masked, data.edge_index[:, edge_mask > 0])
+            maskout_ypred = model(x_maskout, data.edge_index[:, edge_mask <= 0])
+        else:
+            masked_ypred = model(x_masked, data.edge_index, edge_weight=data.edge_weight * edge_mask)
+            maskout_ypred = model(x_maskout, data.edge_index, edge_weight=data.edge_weight * (1 - edge_mask))
+        masked.append(get_proba(masked_ypred.detach().numpy())[node_idx])
+        maskout.append(get_proba(maskout_ypred.detach().numpy())[node_idx])
+    return {
+        "origin": ori_yprob[list_node_idx],
+        "masked": np.array(masked),
+        "maskout": np.array(maskout),
+        "true_label": data.y[list_node_idx].numpy(),
+        "pred_label": np.argmax(ori_yprob[list_node_idx], axis=1),
+    }
+
+
+@pytest.mark.parametrize("hard_mask", [False, True])
+@pytest.mark.parametrize("NF", [False, True])
+def test_related_pred_matches_per_node(gcn_encoder_node, ba_house, hard_mask, NF):
+    model, _ = gcn_encoder_node
+    rng = np.random.default_rng(0)
+    edge_masks = rng.random((len(NODE_IDS), ba_house.num_edges))
+    edge_masks[rng.random(edge_masks.shape) < 0.5] = 0
+    node_feat_masks = rng.random((len(NODE_IDS), ba_house.num_features))
+    args = SimpleNamespace(E=True, NF=NF, hard_mask=hard_mask, num_test=len(NODE_IDS), num_test_final=len(NODE_IDS))
+    with torch.no_grad():
+        related_preds = fidelity.eval_related_pred_nc(
+            model, ba_house, list(edge_masks), list(node_feat_masks), NODE_IDS, "cpu", args
+        )
+        expected = related_pred_per_node(model, ba_house, edge_masks, node_feat_masks, NODE_IDS, args)
+    np.testing.assert_array_equal(related_preds["node_idx"], NODE_IDS)
+    for key in ["origin", "masked", "maskout"]:
+        np.testing.assert_allclose(related_preds[key], expected[key], rtol=1e-5, atol=1e-7)
+    for key in ["true_label", "pred_label"]:
+        np.testing.assert_array_equal(related_preds[key], expected[key])
+
+
+@pytest.mark.parametrize("hard_mask", [False, True])
+@pytest.mark.parametrize("curve_batch_nodes", [5000, 50])
+def test_related_pred_curve_matches_control_sparsity(gcn_encoder_node, ba_house, hard_mask, curve_batch_nodes):
+    model, _ = gcn_encoder_node
+    sparsities = [0.0, 0.5, 0.9]
+    rng = np.random.default_rng(0)
+    edge_masks = rng.random((len(NODE_IDS), ba_house.num_edges))
+    edge_masks[rng.random(edge_masks.shape) < 0.3] = 0
+    args = SimpleNamespace(
+        E=True, NF=False, hard_mask=hard_mask, num_test=len(NODE_IDS), num_test_final=len(NODE_IDS),
+        num_gc_layers=NUM_GC_LAYERS, curve_batch_nodes=curve_batch_nodes,
+    )
+    with torch.no_grad():
+        curve = fidelity.eval_related_pred_curve(
+            model, ba_house, list(edge_masks), [None] * len(NODE_IDS), NODE_IDS, "cpu", args, sparsities
+        )
+        for sparsity, related_preds in zip(sparsities, curve):
+            masks = [control_sparsity(mask.copy(), sparsity) for mask in edge_masks]
+            expected = fidelity.eval_related_pred_nc(model, ba_house, masks, None, NODE_IDS, "cpu", args)
+            for key in ["origin", "masked", "maskout"]:
+                np.testing.assert_allclose(related_preds[key], expected[key], rtol=1e-4, atol=1e-6)
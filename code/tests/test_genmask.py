@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+pytest.importorskip("scipy")
+
+from conftest import NODE_IDS
+
+from explainer.genmask import compute_edge_masks_nc
+from utils.mask_store import MaskCache
+
+
+def explain(model, data, args, cache=None):
+    edge_masks, node_feat_masks, Time = compute_edge_masks_nc(NODE_IDS, model, data, "cpu", args, cache)
+    return np.array(list(edge_masks)), node_feat_masks, Time
+
+
+@pytest.fixture
+def batch_args(args):
+    return SimpleNamespace(
+        **vars(args), explainer_name="distance", true_label_as_target=True, explain_chunk_size=2, time_limit=30000
+    )
+
+
+def test_batch_explainer_in_chunks(gcn_encoder_node, ba_house, batch_args, tmp_path):
+    model, _ = gcn_encoder_node
+    edge_masks, node_feat_masks, Time = explain(model, ba_house, batch_args)
+    assert batch_args.num_test_final == len(NODE_IDS) and node_feat_masks == [None] * len(NODE_IDS)
+    # each node is timed as the average of its chunk
+    assert len(Time) == len(NODE_IDS) and Time[0] == Time[1] and Time[2] == Time[3]
+
+    batch_args.explain_chunk_size = len(NODE_IDS)
+    np.testing.assert_array_equal(explain(model, ba_house, batch_args)[0], edge_masks)
+
+    batch_args.explain_chunk_size = 2
+    cache = MaskCache(str(tmp_path / "cache"), ba_house.num_edges)
+    np.testing.assert_array_equal(explain(model, ba_house, batch_args, cache)[0], edge_masks)
+    assert cache.nodes == NODE_IDS
+
+
+def test_batch_explainer_time_limit(gcn_encoder_node, ba_house, batch_args, tmp_path):
+    model, _ = gcn_encoder_node
+    expected = explain(model, ba_house, batch_args)[0]
+    # the time limit is checked after each chunk: only the first chunk is explained
+    batch_args.time_limit = -1
+    edge_masks, _, Time = explain(model, ba_house, batch_args)
+    assert batch_args.num_test_final == 2 and len(Time) == 2
+    np.testing.assert_array_equal(edge_masks, expected[:2])
+
+    # a cached run resumes from the next chunk
+    cache = MaskCache(str(tmp_path / "cache"), ba_house.num_edges)
+    explain(model, ba_house, batch_args, cache)
+    explain(model, ba_house, batch_args, cache)
+    assert cache.nodes == NODE_IDS[:4]
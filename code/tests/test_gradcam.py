@@ -0,0 +1,36 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+pytest.importorskip("captum")
+
+from captum.attr import LayerGradCam
+from conftest import NODE_IDS
+
+from explainer import node_explainer
+
+
+def gradcam_captum(model, data, node_idx, target, args):
+    """Grad-CAM before batching: captum's LayerGradCam of each convolution layer on the full graph,
+    averaged over layers"""
+    input_mask = data.x.clone().requires_grad_(True)
+    node_attrs = []
+    for layer in node_explainer.get_all_convolution_layers(model, args):
+        layer_gc = LayerGradCam(node_explainer.model_forward_node, layer)
+        node_attr = layer_gc.attribute(
+            input_mask, target=target, additional_forward_args=(model, data.edge_index, data.edge_weight, node_idx)
+        )
+        node_attrs.append(node_attr.cpu().detach().numpy().ravel())
+    node_attr = np.array(node_attrs).mean(axis=0)
+    return node_explainer.node_attr_to_edge(data.edge_index, node_attr)
+
+
+# captum's LayerGradCam only attributes node x channel layer outputs, as those of the GraphConvolution
+# layers of GCN (GraphConv returns an (output, adjacency) tuple)
+def test_batched_gradcam_matches_captum(gcn, ba_house, args):
+    model, targets = gcn
+    edge_masks, _ = node_explainer.explain_gradcam_nodes(model, ba_house, NODE_IDS, targets[NODE_IDS], "cpu", args)
+    for node_idx, edge_mask in zip(NODE_IDS, edge_masks):
+        expected = gradcam_captum(model, ba_house, node_idx, targets[node_idx], args)
+        np.testing.assert_allclose(edge_mask, expected, rtol=1e-4, atol=1e-6)
@@ -0,0 +1,24 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+pytest.importorskip("captum")
+
+from conftest import NODE_IDS
+
+from explainer import node_explainer
+
+
+@pytest.mark.parametrize("method", ["sa", "ig"])
+def test_batched_gradients_match_captum(gcn_encoder_node, ba_house, args, method):
+    explain_nodes = getattr(node_explainer, "explain_%s_nodes" % method)
+    explain_node = getattr(node_explainer, "explain_%s_node" % method)
+    model, targets = gcn_encoder_node
+    edge_masks, node_feat_masks = explain_nodes(model, ba_house, NODE_IDS, targets[NODE_IDS], "cpu", args)
+    for node_idx, edge_mask, node_feat_mask in zip(NODE_IDS, edge_masks, node_feat_masks):
+        expected_edge_mask, expected_node_feat_mask = explain_node(
+            model, ba_house, node_idx, targets[node_idx], "cpu", args
+        )
+        np.testing.assert_allclose(node_feat_mask, expected_node_feat_mask, rtol=1e-4, atol=1e-6)
+        np.testing.assert_allclose(edge_mask, expected_edge_mask, rtol=1e-4, atol=1e-5)
@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+nx = pytest.importorskip("networkx")
+pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+pytest.importorskip("scipy")
+
+from conftest import NODE_IDS
+from torch_geometric.data import Data
+from torch_geometric.utils import to_networkx
+
+from explainer import node_explainer
+from utils.graph_utils import get_csr_adjacency
+
+
+def distance_networkx(data, node_idx):
+    """Distance baseline before the sparse version: networkx shortest path lengths to node_idx"""
+    length = nx.shortest_path_length(to_networkx(Data(x=data.x, edge_index=data.edge_index)), target=node_idx)
+    edge_sources = data.edge_index[1].cpu().numpy()
+    return np.array([1 / (length[node] + 1) if node in length else 0 for node in edge_sources])
+
+
+def pagerank_networkx(data, node_idx):
+    """PageRank baseline before the sparse version: networkx personalized PageRank of node_idx"""
+    pagerank = nx.pagerank(to_networkx(Data(x=data.x, edge_index=data.edge_index)), personalization={node_idx: 1})
+    node_attr = np.zeros(data.x.shape[0])
+    for node, value in pagerank.items():
+        node_attr[node] = value
+    return node_explainer.node_attr_to_edge(data.edge_index, node_attr)
+
+
+def test_distance_matches_networkx(ba_house, args):
+    csr = get_csr_adjacency(ba_house.edge_index, ba_house.num_nodes)
+    edge_masks, _ = node_explainer.explain_distance_nodes(None, ba_house, NODE_IDS, None, "cpu", args, csr=csr)
+    for node_idx, edge_mask in zip(NODE_IDS, edge_masks):
+        np.testing.assert_allclose(edge_mask, distance_networkx(ba_house, node_idx))
+
+
+def test_pagerank_matches_networkx(ba_house, args):
+    csr = get_csr_adjacency(ba_house.edge_index, ba_house.num_nodes)
+    edge_masks, _ = node_explainer.explain_pagerank_nodes(None, ba_house, NODE_IDS, None, "cpu", args, csr=csr)
+    for node_idx, edge_mask in zip(NODE_IDS, edge_masks):
+        # both stop iterating at the same tolerance, but sum in a different order
+        np.testing.assert_allclose(edge_mask, pagerank_networkx(ba_house, node_idx), rtol=1e-6, atol=1e-9)
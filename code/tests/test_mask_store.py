@@ -0,0 +1,146 @@
+import os
+import pickle
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sp = pytest.importorskip("scipy.sparse")
+torch = pytest.importorskip("torch")
+
+from utils.mask_store import MaskCache, SparseMasks
+
+NUM_EDGES = 30
+
+
+def random_masks(num_masks=7, seed=0):
+    """Dense float32 masks, mostly zero, one of them all zero"""
+    rng = np.random.default_rng(seed)
+    masks = rng.random((num_masks, NUM_EDGES)).astype(np.float32)
+    masks[rng.random(masks.shape) < 0.7] = 0
+    masks[2] = 0
+    return masks
+
+
+@pytest.mark.parametrize("kind", ["array", "tensor", "sparse_tensor", "csr"])
+def test_round_trip_on_disk(tmp_path, kind):
+    masks = random_masks()
+    inputs = {
+        "array": masks,
+        "tensor": torch.from_numpy(masks),
+        "sparse_tensor": torch.from_numpy(masks).to_sparse(),
+        "csr": sp.csr_matrix(masks),
+    }[kind]
+    store = SparseMasks.from_masks(inputs, NUM_EDGES, path=str(tmp_path / "masks"))
+    assert len(store) == len(masks)
+    assert [store.nnz(i) for i in range(len(masks))] == list(np.count_nonzero(masks, axis=1))
+    np.testing.assert_array_equal(store.to_csr().toarray(), masks)
+    np.testing.assert_array_equal(np.array(list(store)), masks)
+    np.testing.assert_array_equal(store[-1], masks[-1])
+    assert store[0].dtype == np.float64
+    # only the non-zero entries are written
+    nnz = np.count_nonzero(masks)
+    assert (tmp_path / "masks" / "indices.bin").stat().st_size == 8 * nnz
+    assert (tmp_path / "masks" / "values.bin").stat().st_size == 4 * nnz
+
+
+def test_chunks_and_map(tmp_path):
+    masks = random_masks(num_masks=10)
+    store = SparseMasks(NUM_EDGES, str(tmp_path / "masks"), chunk_size=4)
+    for mask in masks:
+        store.append(mask)
+    starts = [start for start, _ in store.chunks()]
+    assert starts == [0, 4, 8]
+    np.testing.assert_array_equal(np.concatenate([chunk for _, chunk in store.chunks()]), masks)
+    np.testing.assert_allclose(np.array(list(store.map(lambda mask: 2 * mask))), 2 * masks.astype(np.float64))
+
+
+@pytest.mark.parametrize("on_disk", [False, True])
+def test_pickle(tmp_path, on_disk):
+    masks = random_masks()
+    store = SparseMasks.from_masks(masks, NUM_EDGES, path=str(tmp_path / "masks") if on_disk else None)
+    unpickled = pickle.loads(pickle.dumps(store))
+    assert len(unpickled) == len(store) and unpickled.num_edges == NUM_EDGES
+    np.testing.assert_array_equal(np.array(list(unpickled)), masks)
+    # the unpickled store is independent of the files of the original one
+    unpickled.append(masks[0])
+    assert len(unpickled) == len(store) + 1
+
+
+def test_in_memory_store():
+    masks = random_masks(num_masks=10)
+    store = SparseMasks(NUM_EDGES, chunk_size=4)
+    store.extend(masks[:6])
+    np.testing.assert_array_equal(store[5], masks[5])
+    # rows appended after a read are buffered until the next read
+    store.extend(masks[6:])
+    np.testing.assert_array_equal(np.array(list(store)), masks)
+    store.truncate(3)
+    store.append(masks[9])
+    np.testing.assert_array_equal(store.to_csr().toarray(), masks[[0, 1, 2, 9]])
+    assert store.path is None
+
+
+def test_resume_after_truncated_write(tmp_path):
+    masks = random_masks()
+    path = str(tmp_path / "masks")
+    store = SparseMasks.from_masks(masks[:5], NUM_EDGES, path=path)
+    del store
+    # an interrupted append: part of a row reached indices.bin and values.bin, but not indptr.bin
+    with open(tmp_path / "masks" / "indices.bin", "ab") as f:
+        f.write(np.arange(3, dtype=np.int64).tobytes()[:20])
+    with open(tmp_path / "masks" / "values.bin", "ab") as f:
+        f.write(np.ones(2, dtype=np.float32).tobytes())
+
+    store = SparseMasks(NUM_EDGES, path)
+    assert len(store) == 5
+    store.extend(masks[5:])
+    np.testing.assert_array_equal(np.array(list(SparseMasks(NUM_EDGES, path))), masks)
+
+
+def test_row_shape_and_header(tmp_path):
+    masks = random_masks().reshape(-1, 5, 6)
+    path = str(tmp_path / "masks")
+    store = SparseMasks(NUM_EDGES, path, row_shape=(5, 6))
+    store.extend(masks.reshape(len(masks), -1))
+    assert store[0].shape == (5, 6)
+    np.testing.assert_array_equal(np.array(list(store)), masks)
+    with pytest.raises(ValueError):
+        SparseMasks(NUM_EDGES + 1, path)
+
+
+def test_mask_cache_resume(tmp_path):
+    masks = random_masks()
+    feat_masks = np.arange(len(masks) * 4, dtype=np.float32).reshape(len(masks), 4)
+    nodes = [11, 3, 5, 8, 1, 13, 2]
+    path = str(tmp_path / "cache")
+    cache = MaskCache(path, NUM_EDGES)
+    for i in range(4):
+        cache.append(nodes[i], masks[i], feat_masks[i], 0.5 * i)
+    assert cache.remaining(nodes) == nodes[4:]
+    with pytest.raises(ValueError):
+        cache.remaining(nodes[::-1])
+    del cache
+
+    # a crash after the masks of the fifth node were written, before its node id was
+    with open(tmp_path / "cache" / "time.bin", "ab") as f:
+        f.write(np.array([9.0]).tobytes())
+    SparseMasks(NUM_EDGES, os.path.join(path, "edge_masks")).append(masks[4])
+
+    cache = MaskCache(path, NUM_EDGES)
+    assert len(cache) == 4 and cache.remaining(nodes) == nodes[4:]
+    for i in range(4, len(nodes)):
+        cache.append(nodes[i], masks[i], feat_masks[i], 0.5 * i)
+
+    edge_masks, node_feat_masks, Time = MaskCache(path, NUM_EDGES).masks()
+    np.testing.assert_array_equal(np.array(list(edge_masks)), masks)
+    np.testing.assert_array_equal(np.array(list(node_feat_masks)), feat_masks)
+    assert Time == [0.5 * i for i in range(len(nodes))]
+
+
+def test_mask_cache_without_masks(tmp_path):
+    cache = MaskCache(str(tmp_path / "cache"), NUM_EDGES)
+    cache.append(4, random_masks()[0], None, 1.0)
+    with pytest.raises(ValueError):
+        cache.append(5, random_masks()[1], np.ones(3), 1.0)
+    edge_masks, node_feat_masks, _ = MaskCache(str(tmp_path / "cache"), NUM_EDGES).masks()
+    assert len(edge_masks) == 1 and node_feat_masks == [None]
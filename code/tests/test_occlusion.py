@@ -0,0 +1,39 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+nx = pytest.importorskip("networkx")
+pytest.importorskip("torch_geometric")
+
+from conftest import NODE_IDS
+from torch_geometric.data import Data
+from torch_geometric.utils import to_networkx
+
+from explainer import node_explainer
+
+
+def occlusion_full_graph(model, data, node_idx, target, args):
+    """Occlusion before batching: each edge between nodes within num_gc_layers hops of node_idx is
+    removed from the full graph, one forward per edge"""
+    g = to_networkx(Data(x=data.x, edge_index=data.edge_index))
+    length = nx.shortest_path_length(g, target=node_idx)
+    subgraph = g.subgraph([k for k, v in length.items() if v < args.num_gc_layers + 1])
+    edge_occlusion_mask = np.ones(data.num_edges, dtype=bool)
+    edge_mask = np.zeros(data.num_edges)
+    for i, (u, v) in enumerate(data.edge_index.t().tolist()):
+        if (u, v) in subgraph.edges():
+            edge_occlusion_mask[i] = False
+            with torch.no_grad():
+                out = model(data.x, data.edge_index[:, edge_occlusion_mask], data.edge_weight[edge_occlusion_mask])
+            edge_mask[i] = 1 - out[node_idx][target].item()
+            edge_occlusion_mask[i] = True
+    return edge_mask
+
+
+@pytest.mark.parametrize("node_idx", NODE_IDS)
+def test_occlusion_matches_full_graph(gcn_encoder_node, ba_house, args, node_idx):
+    model, targets = gcn_encoder_node
+    target = targets[node_idx]
+    edge_mask, _ = node_explainer.explain_occlusion_node(model, ba_house, node_idx, target, "cpu", args)
+    expected = occlusion_full_graph(model, ba_house, node_idx, target, args)
+    np.testing.assert_allclose(edge_mask, expected, rtol=1e-4, atol=1e-5)
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dataset.syn_utils import arraygen
+from dataset.syn_utils.gengroundtruth import MOTIF_SIZES, get_motif_ids
+from utils.parser_utils import get_graph_size_args
+
+
+def graph_size_args(dataset, syn_scale):
+    return get_graph_size_args(SimpleNamespace(dataset=dataset, explain_graph=False, syn_scale=syn_scale))
+
+
+def test_syn_scale_of_ba_graphs():
+    args = graph_size_args("ba_house", 10)
+    assert (args.num_shapes, args.width_basis, args.num_basis) == (800, 3000, 3000)
+
+
+@pytest.mark.parametrize("dataset, num_shapes", [("tree_cycle", 60), ("tree_grid", 80)])
+@pytest.mark.parametrize("syn_scale, height", [(1, 8), (2, 9), (10, 12)])
+def test_syn_scale_of_trees(dataset, num_shapes, syn_scale, height):
+    args = graph_size_args(dataset, syn_scale)
+    # the tree height grows by ceil(log2(syn_scale)) levels, so the basis grows at least as much as the motifs
+    assert (args.num_shapes, args.width_basis) == (num_shapes * syn_scale, height)
+    assert args.num_basis == 2 ** (height + 1) - 1
+
+    generate = getattr(arraygen, "gen_" + dataset)
+    edge_index, labels, _, _ = generate(args.num_shapes, args.width_basis, rng=np.random.default_rng(0))
+    assert len(labels) == args.num_basis + args.num_shapes * MOTIF_SIZES[dataset]
+    motif_ids = get_motif_ids(len(labels), args)
+    assert (motif_ids < 0).sum() == args.num_basis and motif_ids.max() == args.num_shapes - 1
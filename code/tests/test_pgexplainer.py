@@ -0,0 +1,119 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+
+import torch.nn.functional as F
+from conftest import INPUT_DIM, NODE_IDS
+
+from explainer.pgexplainer import PGExplainer, reverse_edge_perm, symmetric_edge_values
+
+HIDDEN_DIM = 8
+
+
+class SumGCN(torch.nn.Module):
+    """Two sum-aggregation graph convolutions and a linear classifier, with the
+    model(x, edge_index) and get_emb(x, edge_index) interface PGExplainer explains"""
+
+    def __init__(self, input_dim, hidden_dim, num_classes):
+        super().__init__()
+        self.conv1 = torch.nn.Linear(input_dim, hidden_dim)
+        self.conv2 = torch.nn.Linear(hidden_dim, hidden_dim)
+        self.lin = torch.nn.Linear(hidden_dim, num_classes)
+
+    @staticmethod
+    def aggregate(x, edge_index):
+        return torch.zeros_like(x).index_add_(0, edge_index[1], x[edge_index[0]])
+
+    def get_emb(self, x, edge_index):
+        h = F.relu(self.conv1(self.aggregate(x, edge_index)))
+        return F.relu(self.conv2(self.aggregate(h, edge_index)))
+
+    def forward(self, x, edge_index):
+        return self.lin(self.get_emb(x, edge_index))
+
+
+@pytest.fixture
+def pgexplainer(ba_house):
+    torch.manual_seed(0)
+    model = SumGCN(INPUT_DIM, HIDDEN_DIM, ba_house.num_classes).eval()
+    return PGExplainer(model, in_channels=3 * HIDDEN_DIM, device="cpu", explain_graph=False, num_hops=2)
+
+
+def test_batch_loss_matches_per_node_losses(pgexplainer, ba_house):
+    model, params = pgexplainer.model, list(pgexplainer.elayers.parameters())
+    with torch.no_grad():
+        ori_preds = model(ba_house.x, ba_house.edge_index).argmax(-1)
+
+    # one disjoint-union batch of the cached subgraphs
+    subgraphs = pgexplainer.prepare_subgraphs(ba_house, NODE_IDS)
+    x, edge_index, emb, node_idx, edge_batch = pgexplainer.collate_subgraphs(subgraphs)
+    probs, _ = pgexplainer.explain(x, edge_index, emb, 2.0, training=False, node_idx=node_idx, edge_batch=edge_batch)
+    batch_loss = pgexplainer.__batch_loss__(probs, node_idx, ori_preds[NODE_IDS], edge_batch)
+    batch_grads = torch.autograd.grad(batch_loss, params)
+
+    # one subgraph per node, as the training loop did before batching
+    loss = 0.0
+    for node in NODE_IDS:
+        x, edge_index, _, subset, _, _ = pgexplainer.get_subgraph(node_idx=node, x=ba_house.x, edge_index=ba_house.edge_index)
+        emb = model.get_emb(x, edge_index)
+        new_node_index = int(torch.where(subset == node)[0])
+        pred, _ = pgexplainer.explain(x, edge_index, emb, 2.0, training=False, node_idx=new_node_index)
+        loss = loss + pgexplainer.__loss__(pred[new_node_index], int(ori_preds[node]))
+    grads = torch.autograd.grad(loss, params)
+
+    assert batch_loss.item() == pytest.approx(loss.item(), rel=1e-5)
+    for batch_grad, grad in zip(batch_grads, grads):
+        np.testing.assert_allclose(batch_grad.numpy(), grad.numpy(), rtol=1e-4, atol=1e-7)
+
+
+def dense_symmetric_edge_values(values, edge_index, num_nodes):
+    """Symmetrization before the reverse-edge gather: (M + M^T) / 2 of the dense mask matrix, at the edges"""
+    mask = torch.sparse_coo_tensor(edge_index, values, (num_nodes, num_nodes)).to_dense()
+    return ((mask + mask.t()) / 2)[edge_index[0], edge_index[1]]
+
+
+def test_symmetrization_matches_dense(ba_house):
+    generator = torch.Generator().manual_seed(0)
+    edge_index = ba_house.edge_index
+    # drop some reverse edges, add self-loops and shuffle the edges
+    keep = torch.rand(edge_index.size(1), generator=generator) > 0.2
+    self_loops = torch.tensor([[3, 8, 25], [3, 8, 25]])
+    edge_index = torch.cat([edge_index[:, keep], self_loops], dim=1)
+    edge_index = edge_index[:, torch.randperm(edge_index.size(1), generator=generator)]
+    values = torch.rand(edge_index.size(1), generator=generator)
+
+    rev_perm = reverse_edge_perm(edge_index, ba_house.num_nodes)
+    expected = dense_symmetric_edge_values(values, edge_index, ba_house.num_nodes)
+    np.testing.assert_allclose(symmetric_edge_values(values, rev_perm).numpy(), expected.numpy(), rtol=1e-6)
+    is_self_loop = edge_index[0] == edge_index[1]
+    assert (rev_perm[is_self_loop] == torch.where(is_self_loop)[0]).all()
+
+
+def test_symmetrization_of_duplicated_edges(ba_house):
+    generator = torch.Generator().manual_seed(0)
+    unique_edge_index = torch.cat([ba_house.edge_index, torch.tensor([[3], [3]])], dim=1)
+    unique_values = torch.rand(unique_edge_index.size(1), generator=generator)
+    # duplicate some edges, a self-loop among them; copies are scored alike
+    copies = torch.tensor([0, 1, 5, 5, unique_edge_index.size(1) - 1])
+    index = torch.cat([torch.arange(unique_edge_index.size(1)), copies])
+    index = index[torch.randperm(index.numel(), generator=generator)]
+    edge_index, values = unique_edge_index[:, index], unique_values[index]
+
+    rev_perm = reverse_edge_perm(edge_index, ba_house.num_nodes)
+    # the dense version sums the copies; the gather gives the value of the deduplicated graph
+    expected = dense_symmetric_edge_values(unique_values, unique_edge_index, ba_house.num_nodes)[index]
+    np.testing.assert_allclose(symmetric_edge_values(values, rev_perm).numpy(), expected.numpy(), rtol=1e-6)
+
+
+# at most 30 nodes per union: the subgraphs (28, 23, 20, 5 and 6 nodes) are scored in four unions
+@pytest.mark.parametrize("max_batch_nodes", [None, 30])
+@pytest.mark.parametrize("full_graph_emb", [False, True])
+def test_explain_nodes_matches_explain_node(pgexplainer, ba_house, full_graph_emb, max_batch_nodes):
+    pgexplainer.full_graph_emb = full_graph_emb
+    edge_masks = pgexplainer.explain_nodes(NODE_IDS, ba_house.x, ba_house.edge_index, max_batch_nodes=max_batch_nodes)
+    assert edge_masks.is_sparse and edge_masks.shape == (len(NODE_IDS), ba_house.num_edges)
+    for node, edge_mask in zip(NODE_IDS, edge_masks.to_dense()):
+        expected = pgexplainer.explain_node(pgexplainer.model, node, ba_house.x, ba_house.edge_index)
+        np.testing.assert_allclose(edge_mask.numpy(), expected.detach().numpy(), rtol=1e-5, atol=1e-7)
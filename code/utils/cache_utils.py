@@ -0,0 +1,124 @@
+""" cache_utils.py
+    Content-addressed keys of the cached data, models and masks, and the manifest of cached files.
+
+    Every cached file is keyed by a hash of exactly the inputs it is computed from: the generation
+    arguments for synthetic data, the data bytes and training arguments for a GNN model, and the data
+    bytes, model weights and explainer arguments for explanation masks. The manifest of each saving
+    directory maps keys to files together with the inputs they were built from.
+"""
+from datetime import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+import torch
+
+KEY_LENGTH = 16
+
+# arguments from which synthetic datasets are generated
+SYN_DATA_ARGS = ["dataset", "num_shapes", "width_basis", "seed", "syn_backend"]
+
+# arguments from which a GNN model is trained, on top of the data
+MODEL_ARGS = [
+    "hidden_dim", "output_dim", "num_gc_layers", "bn", "dropout", "num_epochs", "lr", "weight_decay",
+    "optimizer", "lr_decay", "train_ratio", "val_ratio", "test_ratio", "seed",
+]
+
+# arguments the masks of every explainer depend on, on top of the data and the model: the explained
+# nodes (drawn from the dataset with seed, num_test and testing_pred), the target mode and the explainer
+MASK_ARGS = ["dataset", "explain_graph", "explainer_name", "seed", "num_test", "testing_pred", "true_label_as_target"]
+
+# hyperparameters each explainer reads from the arguments
+EXPLAINER_ARGS = {
+    "basic_gnnexplainer": ["edge_size", "edge_ent"],
+    "gnnexplainer": ["edge_size", "edge_ent", "num_epochs"],
+    "pgexplainer": ["pgexplainer_full_emb"],
+    "subgraphx": ["num_top_edges"],
+}
+
+
+def digest(obj):
+    """sha256 of a json-serializable object"""
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def tensor_digest(tensors):
+    """sha256 of the dtype, shape and bytes of each (name, tensor) pair"""
+    h = hashlib.sha256()
+    for name, tensor in tensors:
+        array = np.ascontiguousarray(tensor.detach().cpu().numpy())
+        h.update(f"{name}:{array.dtype}:{array.shape}".encode())
+        h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def data_digest(data):
+    """sha256 of the tensors of a Data object"""
+    return tensor_digest(sorted(((key, value) for key, value in data if torch.is_tensor(value)), key=lambda item: item[0]))
+
+
+def model_digest(model):
+    """sha256 of the weights of a model"""
+    return tensor_digest(model.state_dict().items())
+
+
+def args_inputs(args, names):
+    return {name: getattr(args, name, None) for name in names}
+
+
+def mask_inputs(args):
+    """Inputs of the explanation masks: data, model, and the arguments the masks are computed from."""
+    names = MASK_ARGS + EXPLAINER_ARGS.get(getattr(args, "explainer_name", None), [])
+    inputs = args_inputs(args, names)
+    inputs.update({"data": getattr(args, "data_digest", None), "model": getattr(args, "model_digest", None)})
+    return inputs
+
+
+class Manifest:
+    """manifest.json of a saving directory: cache key -> {path, kind, inputs, created}
+
+    Args:
+        root: saving directory
+    """
+
+    def __init__(self, root):
+        os.makedirs(root, exist_ok=True)
+        self.filename = os.path.join(root, "manifest.json")
+
+    def load(self):
+        if not os.path.isfile(self.filename):
+            return {}
+        with open(self.filename) as f:
+            return json.load(f)
+
+    def lookup(self, key):
+        """Path recorded for key if it still exists, else None"""
+        entry = self.load().get(key)
+        if entry is not None and os.path.exists(entry["path"]):
+            return entry["path"]
+        return None
+
+    def record(self, key, path, kind, inputs):
+        # reload right before writing so that entries recorded by concurrent runs are kept
+        entries = self.load()
+        entries[key] = {"path": path, "kind": kind, "inputs": inputs, "created": datetime.now().isoformat()}
+        tmp_filename = f"{self.filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "w") as f:
+            json.dump(entries, f, indent=1, sort_keys=True, default=str)
+        os.replace(tmp_filename, self.filename)
+
+
+def cache_path(root, kind, inputs, name, ext=""):
+    """Path of the artifact built from inputs in the root saving directory.
+
+    The path recorded in the manifest is reused if there is one; otherwise the artifact is named
+    name + "_" + key + ext and recorded.
+    """
+    key = digest({"kind": kind, "inputs": inputs})[:KEY_LENGTH]
+    manifest = Manifest(root)
+    path = manifest.lookup(key)
+    if path is None:
+        path = name + "_" + key + ext
+        manifest.record(key, path, kind, inputs)
+    return path
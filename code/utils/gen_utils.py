@@ -1,10 +1,8 @@
 import random
 
 import numpy as np
-import pandas as pd
 import torch
 from torch_geometric.utils.num_nodes import maybe_num_nodes
-from dataset.mutag_utils import GraphSampler, data_to_graph
 from scipy.sparse import csr_matrix
 import scipy.sparse as sp
 from scipy.special import softmax
@@ -12,10 +10,7 @@ from torch_geometric.utils import from_scipy_sparse_matrix, k_hop_subgraph, to_s
 
 
 def list_to_dict(preds):
-    preds_dict = pd.DataFrame(preds).to_dict("list")
-    for key in preds_dict.keys():
-        preds_dict[key] = np.array(preds_dict[key])
-    return preds_dict
+    return {key: np.array([pred[key] for pred in preds]) for key in (preds[0] if preds else [])}
 
 def sample_large_graph(data):
     if data.num_edges > 50000:
@@ -1,5 +1,7 @@
 import numpy as np
+import scipy.sparse as sp
 import torch
+from scipy.sparse.csgraph import shortest_path
 from torch.autograd import Variable
 
 from utils.gen_utils import from_adj_to_edge_index
@@ -82,3 +84,52 @@ def compute_masked_edges_batch(edge_masks_set, edge_index_set, device):
         maskout_edge_index_set.append(maskout_edge_index)
 
     return masked_edge_index_set, maskout_edge_index_set
+
+
+def get_csr_adjacency(edge_index, num_nodes):
+    """Binary CSR adjacency of edge_index (row = source node); duplicated edges are merged as in a networkx DiGraph."""
+    edge_index = edge_index.cpu().numpy()
+    adj = sp.csr_matrix(
+        (np.ones(edge_index.shape[1]), (edge_index[0], edge_index[1])), shape=(num_nodes, num_nodes)
+    )
+    adj.data[:] = 1.0
+    return adj
+
+
+def bfs_distances_to(adj, targets):
+    """Hop distance from every node to each target node along the edge direction, np.inf if unreachable.
+
+    Returns:
+        (len(targets), num_nodes) array
+    """
+    return shortest_path(adj.T.tocsr(), directed=True, unweighted=True, indices=targets)
+
+
+def personalized_pagerank(adj, targets, alpha=0.85, max_iter=100, tol=1.0e-6):
+    """Personalized PageRank of every target node by sparse power iteration, one column per target.
+
+    Follows networkx.pagerank with personalization={target: 1}: dangling nodes jump to the
+    target, and each column stops iterating once its l1 change falls below num_nodes * tol.
+
+    Returns:
+        (num_nodes, len(targets)) array
+    """
+    num_nodes = adj.shape[0]
+    out_degree = np.asarray(adj.sum(axis=1)).ravel()
+    inv_degree = np.divide(1.0, out_degree, out=np.zeros(num_nodes), where=out_degree != 0)
+    transition_t = (sp.diags(inv_degree) @ adj).T.tocsr()
+    dangling = out_degree == 0
+
+    personalization = np.zeros((num_nodes, len(targets)))
+    personalization[targets, np.arange(len(targets))] = 1.0
+    x = np.full((num_nodes, len(targets)), 1.0 / num_nodes)
+    active = np.ones(len(targets), dtype=bool)
+    for _ in range(max_iter):
+        x_active, p_active = x[:, active], personalization[:, active]
+        x_new = alpha * (transition_t @ x_active + x_active[dangling].sum(axis=0) * p_active) + (1 - alpha) * p_active
+        err = np.abs(x_new - x_active).sum(axis=0)
+        x[:, active] = x_new
+        active[np.where(active)[0][err < num_nodes * tol]] = False
+        if not active.any():
+            break
+    return x
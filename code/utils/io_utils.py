@@ -6,6 +6,8 @@ import os
 
 import torch
 
+from utils.cache_utils import MODEL_ARGS, SYN_DATA_ARGS, args_inputs, cache_path, mask_inputs
+
 # Only necessary to rebuild the Chemistry example
 # from rdkit import Chem
 
@@ -23,7 +25,7 @@ def check_dir(save_dirs):
 def gen_prefix(args, **kwargs):
     """Generate label prefix for a graph model."""
     name = args.dataset
-    if eval(args.explain_graph):
+    if args.explain_graph:
         name += "_gc"
     else:
         name += "_nc"
@@ -45,8 +47,8 @@ def gen_explainer_prefix(args):
 def create_data_filename(args):
     subdir = os.path.join(args.data_save_dir, args.dataset)
     os.makedirs(subdir, exist_ok=True)
-    filename = os.path.join(subdir, f"{args.dataset}_{args.num_shapes}_{args.width_basis}.pt")
-    return filename
+    name = os.path.join(subdir, f"{args.dataset}_{args.num_shapes}_{args.width_basis}_seed{args.seed}")
+    return cache_path(args.data_save_dir, "syn_data", args_inputs(args, SYN_DATA_ARGS), name)
 
 
 def create_model_filename(args, isbest=False, num_epochs=-1, **kwargs):
@@ -62,12 +64,23 @@ def create_model_filename(args, isbest=False, num_epochs=-1, **kwargs):
 
     if isbest:
         filename = os.path.join(filename, "best")
-    return filename + ".pth.tar"
+    inputs = {"data": getattr(args, "data_digest", None), "explain_graph": str(args.explain_graph), **args_inputs(args, MODEL_ARGS)}
+    return cache_path(args.model_save_dir, "model", inputs, filename, ".pth.tar")
+
+
+def create_explainer_model_filename(args, name, settings=None):
+    """Trained explainer (e.g. PGExplainer) of the GNN model, keyed by the data, the model, the seed and the
+    settings the explainer is built and trained with."""
+    subdir = os.path.join(args.model_save_dir, args.dataset)
+    os.makedirs(subdir, exist_ok=True)
+    inputs = {"data": getattr(args, "data_digest", None), "model": getattr(args, "model_digest", None), "seed": args.seed}
+    inputs.update(settings or {})
+    return cache_path(args.model_save_dir, name, inputs, os.path.join(subdir, f"{name}_{args.dataset}"), ".pth")
 
 def create_mask_filename(args):
-    dir = "/cluster/work/zhang/kamara/mask"
-    os.makedirs(dir, exist_ok=True)
-    subdir = os.path.join(dir, args.dataset)
+    """Directory of the mask cache (see utils.mask_store.MaskCache) of the explainer run,
+    keyed by the data, the model weights and every argument that can change the masks."""
+    subdir = os.path.join(args.mask_save_dir, args.dataset)
     os.makedirs(subdir, exist_ok=True)
 
     name = args.dataset + "_" + args.explainer_name 
@@ -75,10 +88,22 @@ def create_mask_filename(args):
     name += "_seed" + str(args.seed)
     
     filename = os.path.join(subdir, name)
-    return filename + ".pkl"
+    return cache_path(args.mask_save_dir, "mask", mask_inputs(args), filename)
 
 
 
+def create_results_filename(args):
+    """SQLite database of the results (see utils.results_store)"""
+    os.makedirs(args.results_save_dir, exist_ok=True)
+    return os.path.join(args.results_save_dir, "results.sqlite")
+
+
+def create_sweep_filename(args):
+    subdir = os.path.join(args.results_save_dir, args.dataset)
+    os.makedirs(subdir, exist_ok=True)
+    return os.path.join(subdir, f"sweep_{args.dataset}_{args.explainer_name}.csv")
+
+
 def save_checkpoint(filename, model, args, results_train, results_test, isbest=False, cg_dict=None):
     """Save pytorch model checkpoint.
     Args:
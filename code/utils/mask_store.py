@@ -0,0 +1,335 @@
+""" mask_store.py
+    Sparse, disk-backed storage of the masks of many explained nodes.
+"""
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+import torch
+
+FORMAT_VERSION = 1
+INDEX_DTYPE = np.int64
+VALUE_DTYPE = np.float32
+
+
+def read_header(path):
+    filename = os.path.join(path, "header.json")
+    if not os.path.isfile(filename):
+        return None
+    with open(filename) as f:
+        return json.load(f)
+
+
+def write_header(path, header):
+    filename = os.path.join(path, "header.json")
+    with open(filename + ".tmp", "w") as f:
+        json.dump(header, f)
+    os.replace(filename + ".tmp", filename)
+
+
+def check_header(path, header, expected):
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path}: mask store version {header.get('version')}, expected {FORMAT_VERSION}")
+    for key, value in expected.items():
+        if header.get(key) != value:
+            raise ValueError(f"{path}: {key} is {header.get(key)}, expected {value}")
+
+
+def open_append_file(filename, dtype, length):
+    """Open a raw array file for appending, dropping anything written past length items (partial write)."""
+    size = length * np.dtype(dtype).itemsize
+    if os.path.isfile(filename) and os.path.getsize(filename) != size:
+        os.truncate(filename, size)
+    return open(filename, "ab")
+
+
+def read_array_file(filename, dtype):
+    """Whole items of a raw array file, an empty array if it does not exist."""
+    if not os.path.isfile(filename):
+        return np.zeros(0, dtype=dtype)
+    itemsize = np.dtype(dtype).itemsize
+    count = os.path.getsize(filename) // itemsize
+    return np.fromfile(filename, dtype=dtype, count=count)
+
+
+class SparseMasks:
+    """Masks stored as CSR rows of (index, float32 value), one row per explained node.
+
+    Explanations are mostly zero outside the k-hop neighbourhood of the explained node, so only
+    the non-zero entries are kept. With a path, rows are appended to files in `path` as they are
+    produced (each row is on disk when append returns) and read back lazily through memory maps, so
+    that the whole (num_masks x num_edges) matrix never has to be held in memory. Without a path,
+    as for the transient stores of mask transformations, rows are kept in memory as CSR arrays.
+    Indexing or iterating yields dense float64 rows, as the previous list of numpy masks did.
+
+    The directory holds a versioned header.json and three raw arrays: indices.bin, values.bin and
+    indptr.bin (end offset of each row). Opening an existing directory resumes it: rows whose write
+    was interrupted are dropped and new rows are appended after the complete ones.
+
+    Args:
+        num_edges: length of each (flattened) mask
+        path: directory where the rows are streamed, in memory if None
+        chunk_size: number of rows read at once when iterating
+        row_shape: shape rows are returned with, (num_edges,) if None
+    """
+
+    def __init__(self, num_edges, path=None, chunk_size=64, row_shape=None):
+        self.num_edges = int(num_edges)
+        self.chunk_size = chunk_size
+        self.row_shape = (self.num_edges,) if row_shape is None else tuple(row_shape)
+        self.path = path
+        self._maps = None
+        if path is None:
+            self.indptr = [0]
+            self._rows = []
+            self._arrays = (np.zeros(0, dtype=INDEX_DTYPE), np.zeros(0, dtype=VALUE_DTYPE))
+            return
+        os.makedirs(path, exist_ok=True)
+
+        header = read_header(path)
+        expected = {"num_edges": self.num_edges, "row_shape": list(self.row_shape)}
+        if header is None:
+            write_header(path, {"version": FORMAT_VERSION, "index_dtype": np.dtype(INDEX_DTYPE).name,
+                                "value_dtype": np.dtype(VALUE_DTYPE).name, **expected})
+        else:
+            check_header(path, header, expected)
+
+        row_ends = read_array_file(os.path.join(path, "indptr.bin"), INDEX_DTYPE)
+        nnz = min(os.path.getsize(f) // np.dtype(d).itemsize if os.path.isfile(f) else 0
+                  for f, d in [(os.path.join(path, "indices.bin"), INDEX_DTYPE), (os.path.join(path, "values.bin"), VALUE_DTYPE)])
+        row_ends = row_ends[: np.searchsorted(row_ends, nnz, side="right")]
+        self.indptr = [0] + row_ends.tolist()
+        self._open_files()
+
+    def _open_files(self):
+        self._indices_file = open_append_file(os.path.join(self.path, "indices.bin"), INDEX_DTYPE, self.indptr[-1])
+        self._values_file = open_append_file(os.path.join(self.path, "values.bin"), VALUE_DTYPE, self.indptr[-1])
+        self._indptr_file = open_append_file(os.path.join(self.path, "indptr.bin"), INDEX_DTYPE, len(self))
+        self._maps = None
+
+    def truncate(self, length):
+        """Drop the rows after the first length ones."""
+        if self.path is None:
+            indices, values = self._entries()
+            self.indptr = self.indptr[: length + 1]
+            self._arrays = (indices[: self.indptr[-1]], values[: self.indptr[-1]])
+            self._maps = None
+            return
+        for f in [self._indices_file, self._values_file, self._indptr_file]:
+            f.close()
+        self.indptr = self.indptr[: length + 1]
+        self._open_files()
+
+    @classmethod
+    def from_masks(cls, masks, num_edges, path=None):
+        """Store a sequence of dense masks, a (num_masks x num_edges) array or sparse matrix/tensor."""
+        if isinstance(masks, SparseMasks):
+            return masks
+        store = cls(num_edges, path)
+        store.extend(masks)
+        return store
+
+    def extend(self, masks):
+        """Append a sequence of dense masks, a (num_masks x num_edges) array or sparse matrix/tensor."""
+        if torch.is_tensor(masks) and masks.is_sparse:
+            masks = masks.coalesce().cpu()
+            indices = masks.indices().numpy()
+            masks = sp.csr_matrix((masks.values().numpy(), (indices[0], indices[1])), shape=tuple(masks.shape))
+        elif torch.is_tensor(masks):
+            masks = masks.detach().cpu().numpy()
+        if sp.issparse(masks):
+            masks = masks.tocsr()
+            for i in range(masks.shape[0]):
+                row = slice(masks.indptr[i], masks.indptr[i + 1])
+                self.append_sparse(masks.indices[row], masks.data[row])
+        else:
+            for mask in masks:
+                self.append(mask)
+
+    def append(self, mask):
+        """Append a dense mask with num_edges entries."""
+        mask = np.asarray(mask).reshape(-1)
+        indices = np.flatnonzero(mask)
+        self.append_sparse(indices, mask[indices])
+
+    def append_sparse(self, indices, values):
+        """Append a mask given by its non-zero indices and values. With a path, the row is on disk when
+        this returns."""
+        order = np.argsort(indices, kind="stable")
+        indices = np.asarray(indices, dtype=INDEX_DTYPE)[order]
+        values = np.asarray(values, dtype=VALUE_DTYPE)[order]
+        self.indptr.append(self.indptr[-1] + len(order))
+        self._maps = None
+        if self.path is None:
+            self._rows.append((indices, values))
+            return
+        self._indices_file.write(indices.tobytes())
+        self._values_file.write(values.tobytes())
+        self._indices_file.flush()
+        self._values_file.flush()
+        self._indptr_file.write(np.array(self.indptr[-1:], dtype=INDEX_DTYPE).tobytes())
+        self._indptr_file.flush()
+
+    def _entries(self):
+        """Indices and values of all rows: the in-memory arrays, or memory maps of the files"""
+        if self._maps is None and self.path is None:
+            if self._rows:
+                indices, values = self._arrays
+                self._arrays = (
+                    np.concatenate([indices] + [row[0] for row in self._rows]),
+                    np.concatenate([values] + [row[1] for row in self._rows]),
+                )
+                self._rows = []
+            self._maps = self._arrays
+        elif self._maps is None:
+            nnz = self.indptr[-1]
+            if nnz == 0:
+                self._maps = (np.zeros(0, dtype=INDEX_DTYPE), np.zeros(0, dtype=VALUE_DTYPE))
+            else:
+                self._maps = (
+                    np.memmap(self._indices_file.name, dtype=INDEX_DTYPE, mode="r", shape=(nnz,)),
+                    np.memmap(self._values_file.name, dtype=VALUE_DTYPE, mode="r", shape=(nnz,)),
+                )
+        return self._maps
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def row(self, i):
+        """Non-zero indices and values of mask i."""
+        indices, values = self._entries()
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return np.array(indices[start:end]), np.array(values[start:end])
+
+    def nnz(self, i):
+        return self.indptr[i + 1] - self.indptr[i]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("mask index out of range")
+        return self.to_csr(i, i + 1).toarray()[0].astype(np.float64).reshape(self.row_shape)
+
+    def to_csr(self, start=0, end=None):
+        """Rows start:end as a scipy CSR matrix (the data stays in the memory map until sliced)."""
+        end = len(self) if end is None else min(end, len(self))
+        indices, values = self._entries()
+        first, last = self.indptr[start], self.indptr[end]
+        indptr = np.asarray(self.indptr[start : end + 1], dtype=INDEX_DTYPE) - first
+        return sp.csr_matrix(
+            (np.array(values[first:last]), np.array(indices[first:last]), indptr),
+            shape=(end - start, self.num_edges),
+        )
+
+    def chunks(self):
+        """Yield (start, dense chunk) blocks of at most chunk_size masks."""
+        for start in range(0, len(self), self.chunk_size):
+            yield start, self.to_csr(start, start + self.chunk_size).toarray().astype(np.float64)
+
+    def __iter__(self):
+        for _, chunk in self.chunks():
+            for mask in chunk:
+                yield mask.reshape(self.row_shape)
+
+    def map(self, fn, path=None):
+        """New store with fn applied to every dense mask, streamed chunk by chunk."""
+        store = SparseMasks(self.num_edges, path, self.chunk_size, self.row_shape)
+        for mask in self:
+            store.append(fn(mask))
+        return store
+
+    def copy(self):
+        return self.map(lambda mask: mask)
+
+    def __getstate__(self):
+        csr = self.to_csr()
+        return {"num_edges": self.num_edges, "chunk_size": self.chunk_size, "row_shape": self.row_shape,
+                "indptr": csr.indptr, "indices": csr.indices, "values": csr.data}
+
+    def __setstate__(self, state):
+        self.__init__(state["num_edges"], chunk_size=state["chunk_size"], row_shape=state["row_shape"])
+        self.extend(sp.csr_matrix((state["values"], state["indices"], state["indptr"]), shape=(len(state["indptr"]) - 1, state["num_edges"])))
+
+
+class MaskCache:
+    """On-disk cache of an explainer run: for each explained node, its id, its edge mask, its node
+    feature mask and the time it took. Entries are appended as nodes are explained, so that a run
+    stopped by a crash or the time limit resumes from the last explained node.
+
+    Layout of `path`: header.json, nodes.bin, time.bin, and the SparseMasks directories edge_masks/
+    and node_feat_masks/ (created with the first mask that is not None).
+
+    Args:
+        path: cache directory
+        num_edges: number of edges of the explained graph
+    """
+
+    def __init__(self, path, num_edges):
+        self.path = path
+        self.num_edges = int(num_edges)
+        os.makedirs(path, exist_ok=True)
+        header = read_header(path)
+        if header is None:
+            header = {"version": FORMAT_VERSION, "num_edges": self.num_edges, "edge_masks": None, "node_feat_shape": None}
+            write_header(path, header)
+        else:
+            check_header(path, header, {"num_edges": self.num_edges})
+        self.header = header
+
+        nodes = read_array_file(os.path.join(path, "nodes.bin"), INDEX_DTYPE)
+        times = read_array_file(os.path.join(path, "time.bin"), np.float64)
+        self.edge_masks = self._open_masks("edge_masks", self.header["edge_masks"] and [self.num_edges])
+        self.node_feat_masks = self._open_masks("node_feat_masks", self.header["node_feat_shape"])
+        length = min([len(nodes), len(times)] + [len(m) for m in [self.edge_masks, self.node_feat_masks] if m is not None])
+        for masks in [self.edge_masks, self.node_feat_masks]:
+            if masks is not None:
+                masks.truncate(length)
+        self.nodes = nodes[:length].tolist()
+        self.times = times[:length].tolist()
+        self._nodes_file = open_append_file(os.path.join(path, "nodes.bin"), INDEX_DTYPE, length)
+        self._times_file = open_append_file(os.path.join(path, "time.bin"), np.float64, length)
+
+    def _open_masks(self, name, shape):
+        if shape is None:
+            return None
+        return SparseMasks(int(np.prod(shape)), os.path.join(self.path, name), row_shape=shape)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def append(self, node_idx, edge_mask, node_feat_mask, duration):
+        if len(self) == 0 and self.edge_masks is None and self.node_feat_masks is None:
+            if edge_mask is not None:
+                self.header["edge_masks"] = True
+                self.edge_masks = self._open_masks("edge_masks", [self.num_edges])
+            if node_feat_mask is not None:
+                self.header["node_feat_shape"] = list(np.shape(node_feat_mask))
+                self.node_feat_masks = self._open_masks("node_feat_masks", self.header["node_feat_shape"])
+            write_header(self.path, self.header)
+        if (edge_mask is None) != (self.edge_masks is None) or (node_feat_mask is None) != (self.node_feat_masks is None):
+            raise ValueError("all cached nodes must have the same kinds of masks")
+        if edge_mask is not None:
+            self.edge_masks.append(edge_mask)
+        if node_feat_mask is not None:
+            self.node_feat_masks.append(node_feat_mask)
+        # the node id is written last: it marks the entry as complete
+        self._times_file.write(np.array([duration], dtype=np.float64).tobytes())
+        self._times_file.flush()
+        self._nodes_file.write(np.array([node_idx], dtype=INDEX_DTYPE).tobytes())
+        self._nodes_file.flush()
+        self.nodes.append(int(node_idx))
+        self.times.append(float(duration))
+
+    def remaining(self, list_node_idx):
+        """Nodes of list_node_idx still to explain. The cached nodes must be a prefix of list_node_idx."""
+        if list(list_node_idx[: len(self)]) != self.nodes:
+            raise ValueError(f"{self.path}: cached nodes do not match the testing nodes")
+        return list_node_idx[len(self) :]
+
+    def masks(self):
+        """(edge_masks, node_feat_masks, Time) as returned by compute_edge_masks_nc"""
+        edge_masks = self.edge_masks if self.edge_masks is not None else [None] * len(self)
+        node_feat_masks = self.node_feat_masks if self.node_feat_masks is not None else [None] * len(self)
+        return edge_masks, node_feat_masks, list(self.times)
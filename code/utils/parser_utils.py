@@ -1,9 +1,41 @@
 import argparse
+import json
+import math
+
 import numpy as np
 
 
+def str2bool(value):
+    """Boolean of a "True"/"False" command-line value"""
+    if isinstance(value, bool):
+        return value
+    if value.lower() in ["true", "1"]:
+        return True
+    if value.lower() in ["false", "0"]:
+        return False
+    raise argparse.ArgumentTypeError(f"expected True or False, got {value}")
+
+
+def str2number(value):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def comma_list(item_type):
+    """Parser of a comma-separated list of item_type values ("None" for None, "" for an empty list)"""
+
+    def parse(value):
+        if value == "None":
+            return None
+        return [item_type(item) for item in value.split(",") if item != ""]
+
+    return parse
+
+
 def get_graph_size_args(args):
-    if not eval(args.explain_graph):
+    if not args.explain_graph:
         if args.dataset == "ba_house":
             args.num_top_edges = 6
             args.num_shapes = 80
@@ -23,22 +55,30 @@ def get_graph_size_args(args):
             args.num_top_edges = 6
             args.num_shapes = 60
             args.width_basis = 8
-            args.num_basis = 2 ^ (args.width_basis + 1) - 1
         elif args.dataset == "tree_grid":
             args.num_top_edges = 12
             args.num_shapes = 80
             args.width_basis = 8
-            args.num_basis = 2 ^ (args.width_basis + 1) - 1
         elif args.dataset == "ba_bottle":
             args.num_top_edges = 5
             args.num_shapes = 80
             args.width_basis = 300
             args.num_basis = args.width_basis
+        if args.syn_scale > 1:
+            args.num_shapes *= args.syn_scale
+            if args.dataset.startswith("tree"):
+                # width_basis is the height of the balanced binary tree: one more level doubles its nodes
+                args.width_basis += math.ceil(math.log2(args.syn_scale))
+            else:
+                args.width_basis *= args.syn_scale
+                args.num_basis *= args.syn_scale
+        if args.dataset.startswith("tree"):
+            args.num_basis = 2 ** (args.width_basis + 1) - 1
     return args
 
 
 def get_data_args(data, args):
-    if eval(args.explain_graph):
+    if args.explain_graph:
         if args.dataset == "mutag":
             args.num_classes = 2
             args.input_dim = 7
@@ -59,15 +99,17 @@ def arg_parse():
     parser.add_argument("--seed", help="random seed", type=int, default=0)
 
     # saving data, model, figures
-    parser.add_argument("--save_mask", help="If we save the masks", type=str, default="False")
+    parser.add_argument("--save_mask", help="If we save the masks", type=str2bool, default="False")
     
     parser.add_argument("--data_save_dir", help="Directory where benchmark is located", type=str, default="data")
     parser.add_argument("--model_save_dir", help="saving directory for gnn model", type=str, default="model")
     parser.add_argument("--fig_save_dir", help="Directory where figures are saved", type=str, default="figures")
+    parser.add_argument("--mask_save_dir", help="Directory where explanation masks are cached", type=str, default="mask")
+    parser.add_argument("--results_save_dir", help="Directory where sweep results are saved", type=str, default="results")
     parser.add_argument(
         "--draw_graph",
         help="Draw explanations (subgraph for NC and graph for GC) after training",
-        type=str,
+        type=str2bool,
         default="False",
     )
 
@@ -76,6 +118,8 @@ def arg_parse():
     # build ba-shape graphs
     parser.add_argument("--width_basis", help="width of base graph", type=int)
     parser.add_argument("--num_shapes", help="number of houses", type=int)
+    parser.add_argument("--syn_backend", help="networkx generator, or array (NumPy) generator for large graphs", type=str, default="networkx")
+    parser.add_argument("--syn_scale", help="multiplies num_shapes and width_basis (adds ceil(log2) levels to the tree of tree_*), e.g. 1430 for a 1M-node ba_house", type=int, default=1)
 
     # sampling - if dataset is too large, we sample it
     parser.add_argument(
@@ -119,7 +163,7 @@ def arg_parse():
     )
 
     parser.add_argument(
-        "--num_workers", dest="num_workers", type=int, help="Number of workers to load data.", default=4
+        "--num_workers", dest="num_workers", type=int, help="Number of workers to load data and to explain nodes with CPU-heavy explainers.", default=4
     )
 
     # gnn achitecture parameters
@@ -146,22 +190,55 @@ def arg_parse():
     parser.add_argument("--method", dest="method", help="Method for aggregating in GNN model. Possible values: base, att, soft-assign")
     
     # explainer params
-    parser.add_argument("--explain_graph", help="graph classification or node classification", type=str, default="False")
-    parser.add_argument("--true_label_as_target", help="target is groudtruth label or GNN initial prediction", type=str)
-    parser.add_argument("--hard_mask", help="Soft or hard mask", type=str)
+    parser.add_argument("--explain_graph", help="graph classification or node classification", type=str2bool, default="False")
+    parser.add_argument("--true_label_as_target", help="target is groudtruth label or GNN initial prediction", type=str2bool)
+    parser.add_argument("--hard_mask", help="Soft or hard mask", type=str2bool)
     parser.add_argument("--testing_pred", help="True if all testing nodes are correct; False if all testing nodes labels are wrong; None otherwise", type=str, default="mix") # ["correct", "wrong", "mix"]
-    parser.add_argument("--top_acc", help="Top accuracy for synthetic dataset only", type=str, default="False")
+    parser.add_argument("--top_acc", help="Top accuracy for synthetic dataset only", type=str2bool, default="False")
     
     parser.add_argument("--num_test", help="number of testing entities (graphs or nodes)", type=int)
     parser.add_argument("--num_test_final", help="number of testing entities (graphs or nodes) in the final set", type=int)
     parser.add_argument("--time_limit", help="max time for a method to run on testing set", type=int, default=30000)
     
     parser.add_argument("--strategy", help="strategy for mask transformation", type=str, default="topk") # ["topk", "sparsity", "threshold"]
-    parser.add_argument("--params_list", help="list of transformation degrees", type=str, default="5,10")
-    parser.add_argument("--directed", help="if directed, choose the topk directed edges; otherwise topk undirected (no double counting)", type=str, default="True")
+    parser.add_argument("--params_list", help="list of transformation degrees", type=comma_list(str2number), default="5,10")
+    parser.add_argument("--directed", help="if directed, choose the topk directed edges; otherwise topk undirected (no double counting)", type=str2bool, default="True")
     parser.add_argument("--num_top_edges", help="number of edges to keep in explanation", type=int, default=-1)
+    parser.add_argument("--fidelity_curve", help="if True, also evaluate the fidelity of the masks at every level of curve_sparsities", type=str2bool, default="False")
+    parser.add_argument("--curve_sparsities", help="comma-separated sparsity levels of the fidelity curve", type=comma_list(float), default="0.0,0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9")
+    parser.add_argument("--curve_batch_nodes", help="max number of nodes in the batched graph of a fidelity curve forward pass", type=int, default=5000)
     parser.add_argument("--explainer_name", help="explainer", type=str)
 
+    # sweep.py: grid evaluated in-process on the same data, model and masks
+    parser.add_argument("--sweep_seeds", help="comma-separated seeds, only --seed if empty", type=comma_list(int), default="")
+    parser.add_argument("--sweep_true_label_as_target", help="comma-separated target modes", type=comma_list(str2bool), default="True,False")
+    parser.add_argument("--sweep_hard_mask", help="comma-separated hard/soft mask modes", type=comma_list(str2bool), default="True,False")
+    parser.add_argument(
+        "--sweep_params",
+        help="json dict of transformation strategy -> list of transformation degrees",
+        type=json.loads,
+        default='{"topk": [5, 10], "sparsity": [0.5, 0.7, 0.9], "threshold": [0.1, 0.3, 0.5]}',
+    )
+
+    # gen_datasets.py: synthetic datasets generated in parallel processes (--num_workers)
+    parser.add_argument("--gen_seeds", help="comma-separated seeds of the generated datasets", type=comma_list(int), default="0")
+    parser.add_argument("--gen_scales", help="comma-separated --syn_scale values of the generated datasets", type=comma_list(int), default="1")
+
+    # batched gradient explainers (sa, ig)
+    parser.add_argument("--grad_batch_size", help="max number of (node, integration step) subgraph copies per backward pass", type=int, default=256)
+    parser.add_argument("--grad_batch_nodes", help="max number of nodes in the batched graph of a backward pass, or of a PGExplainer inference pass", type=int, default=5000)
+
+    # batchable explainers (distance, pagerank, gradcam, sa, ig, pgexplainer)
+    parser.add_argument("--explain_chunk_size", help="number of testing nodes per call of the batch function; the time limit is checked between calls", type=int, default=1024)
+
+    # hyperparameters for PGExplainer
+    parser.add_argument(
+        "--pgexplainer_full_emb",
+        help="PGExplainer scores edges from embeddings computed once on the full graph instead of per subgraph",
+        type=str2bool,
+        default="False",
+    )
+
     # hyperparameters for GNNExplainer
     parser.add_argument(
         "--edge_size",
@@ -1,16 +1,14 @@
 from datetime import datetime
 import os
 import torch
-import matplotlib
-import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
-import seaborn as sns
 from torch_geometric.utils.convert import to_networkx
-import pandas as pd
 
 from utils.io_utils import check_dir, gen_feat_importance_plt_name, gen_mask_density_plt_name
 
+# matplotlib, seaborn and pandas are imported by the plotting functions, which only run when figures are drawn.
+
 def k_hop_subgraph(node_idx, num_hops, edge_index, relabel_nodes=False,
                    num_nodes=None, flow='source_to_target'):
     r"""Computes the :math:`k`-hop subgraph of :obj:`edge_index` around node
@@ -137,6 +135,9 @@ def custom_to_networkx(data, node_attrs=None, edge_attrs=None, to_undirected=Fal
 
 
 def plot_avg_density(edge_masks, args):
+    import matplotlib
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     rank_masks = [np.sort(edge_mask) for edge_mask in edge_masks]
     avg_mask = np.mean(rank_masks, axis=0)
 
@@ -154,6 +155,9 @@ def plot_avg_density(edge_masks, args):
 
 
 def plot_mask_density(mask, args, type="edge"):
+    import matplotlib
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     matplotlib.style.use("seaborn")
     plt.switch_backend("agg")
     fig, ax = plt.subplots()
@@ -172,6 +176,9 @@ def plot_mask_density(mask, args, type="edge"):
     matplotlib.style.use("default")
 
 def plot_masks_density(masks, args, type="edge"):
+    import matplotlib
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     pal = sns.color_palette("tab10")
     matplotlib.style.use("seaborn")
     plt.switch_backend("agg")
@@ -199,6 +206,9 @@ def plot_masks_density(masks, args, type="edge"):
     matplotlib.style.use("default")
 
 def plot_feat_importance(node_feat_mask, args):
+    import matplotlib
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     matplotlib.style.use("seaborn")
     plt.switch_backend("agg")
     fig, ax = plt.subplots()
@@ -213,6 +223,9 @@ def plot_feat_importance(node_feat_mask, args):
     matplotlib.style.use("default")
 
 def plot_feat_importance(node_feat_masks, args):
+    import matplotlib
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     pal = sns.color_palette("tab10")
     matplotlib.style.use("seaborn")
     plt.switch_backend("agg")
@@ -235,6 +248,8 @@ def plot_feat_importance(node_feat_masks, args):
 
 
 def plot_expl_nc(G, G_true, role, node_idx, args, top_acc):
+    import matplotlib.pyplot as plt
+    import pandas as pd
     G = G.to_undirected()
     if node_idx not in G.nodes():
         G.add_node(node_idx)
@@ -301,6 +316,7 @@ def plot_expl_nc(G, G_true, role, node_idx, args, top_acc):
 
 
 def plot_expl_gc(data_list, edge_masks, args, num_plots=5):
+    import matplotlib.pyplot as plt
     if args.num_test < num_plots:
         num_plots = args.num_test
     fig, axs = plt.subplots(num_plots, 2, figsize=(15, 10 * num_plots), sharey=True)
@@ -0,0 +1,101 @@
+""" results_store.py
+    SQLite sink of the evaluation results, and aggregation of the results across seeds.
+
+    Each result is one row of the `results` table: the run (run key, dataset, explainer, seed, target
+    and hard/soft mask modes), the mask transformation (strategy, param), the kind of result (infos,
+    mask_infos, accuracy, fidelity...), the metric name and its value. The run key is the cache key of
+    the masks (see utils.cache_utils), so that rows of the same masks can be matched across runs.
+"""
+from datetime import datetime
+import numbers
+import sqlite3
+
+from utils.cache_utils import KEY_LENGTH, digest, mask_inputs
+
+RESULTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    run_key TEXT,
+    dataset TEXT,
+    explainer TEXT,
+    seed INTEGER,
+    true_label_as_target TEXT,
+    hard_mask TEXT,
+    strategy TEXT,
+    param REAL,
+    kind TEXT,
+    metric TEXT,
+    value REAL,
+    created TEXT
+)
+"""
+
+RESULTS_COLUMNS = [
+    "run_key", "dataset", "explainer", "seed", "true_label_as_target", "hard_mask",
+    "strategy", "param", "kind", "metric", "value", "created",
+]
+
+RUN_COLUMNS = ["dataset", "explainer", "true_label_as_target", "hard_mask", "strategy", "param", "kind", "metric"]
+
+
+def connect(filename):
+    connection = sqlite3.connect(filename, timeout=60)
+    connection.execute(RESULTS_SCHEMA)
+    return connection
+
+
+class ResultsWriter:
+    """Buffers result rows and appends them to the SQLite database in one transaction per flush.
+
+    Args:
+        filename: SQLite database
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.rows = []
+
+    def add(self, kind, values, args, strategy=None, param=None):
+        """Buffer the numerical entries of the dictionary values for the current run of args."""
+        run = (digest(mask_inputs(args))[:KEY_LENGTH], args.dataset, args.explainer_name, args.seed,
+               str(args.true_label_as_target), str(args.hard_mask), strategy, param)
+        created = datetime.now().isoformat()
+        for metric, value in values.items():
+            if value is None or isinstance(value, numbers.Number):
+                self.rows.append(run + (kind, metric, None if value is None else float(value), created))
+
+    def flush(self):
+        if len(self.rows) == 0:
+            return
+        connection = connect(self.filename)
+        with connection:
+            connection.executemany(
+                f"INSERT INTO results ({', '.join(RESULTS_COLUMNS)}) VALUES ({', '.join('?' * len(RESULTS_COLUMNS))})",
+                self.rows,
+            )
+        connection.close()
+        self.rows = []
+
+
+def load_results(filename, **filters):
+    """Rows of the results table as a DataFrame, e.g. load_results(filename, dataset="cora", kind="fidelity")"""
+    import pandas as pd
+
+    query = "SELECT * FROM results"
+    if filters:
+        query += " WHERE " + " AND ".join(f"{column} = ?" for column in filters)
+    connection = connect(filename)
+    results = pd.read_sql_query(query, connection, params=list(filters.values()))
+    connection.close()
+    return results
+
+
+def aggregate_results(filename, group_by=RUN_COLUMNS, **filters):
+    """Mean, standard deviation and number of seeds of each metric, across seeds.
+
+    When a run was evaluated several times for the same seed, only its latest value is kept.
+    """
+    results = load_results(filename, **filters)
+    results = results.sort_values("created").drop_duplicates(
+        subset=["run_key", "seed", "hard_mask", "strategy", "param", "kind", "metric"], keep="last"
+    )
+    return results.groupby(list(group_by), dropna=False)["value"].agg(["mean", "std", "count"]).reset_index()